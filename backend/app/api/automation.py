@@ -0,0 +1,94 @@
+# app/api/automation.py
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import List
+from ..database import SessionLocal
+from ..models.database import Task, Workflow
+from ..models.dto import AutomationRunDTO, AutomationRunRequest, WorkflowRunRequest
+from ..pulseway.client import PulsewayClient
+from ..security import get_current_active_api_key
+from ..services.automation_runs import (
+    has_target_filter, resolve_target_devices, run_task_on_devices, run_workflow_on_devices, summarize_run
+)
+from ..services.execution_webhooks import default_webhook_url
+
+router = APIRouter(dependencies=[Depends(get_current_active_api_key)])
+
+# Dependency to get database session
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency to get Pulseway client
+def get_pulseway_client(request: Request) -> PulsewayClient:
+    return request.app.state.pulseway_client
+
+def _resolve_targets(db: Session, run_request: AutomationRunRequest) -> List[str]:
+    """Resolves the request's targets, refusing requests that would hit the whole fleet or nothing."""
+    if not has_target_filter(run_request.targets) and not run_request.device_identifiers:
+        raise HTTPException(
+            status_code=400,
+            detail="Specify at least one target filter or device identifier"
+        )
+
+    device_ids = resolve_target_devices(db, run_request.targets, run_request.device_identifiers)
+    if run_request.device_identifiers and not has_target_filter(run_request.targets):
+        missing_devices = set(run_request.device_identifiers) - set(device_ids)
+        if missing_devices:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Devices not found: {', '.join(sorted(missing_devices))}"
+            )
+    # Pulseway falls back to the task's own scope when no DeviceIdentifiers are sent
+    if not device_ids:
+        raise HTTPException(status_code=404, detail="No devices match the given targets")
+    return device_ids
+
+@router.post("/tasks/{task_id}/run", response_model=AutomationRunDTO, summary="Run task on devices", description="Run an automation task on every device matching the target filters (organization, site, group, online-only, has-alerts). Targets are resolved server-side and submitted to Pulseway in chunks.", response_description="The targeted devices and the outcome of each chunk.")
+async def run_task(
+    task_id: int,
+    run_request: AutomationRunRequest,
+    db: Session = Depends(get_db),
+    pulseway_client: PulsewayClient = Depends(get_pulseway_client)
+):
+    """Run a task on a filtered set of devices"""
+
+    if not db.query(Task.id).filter(Task.id == task_id).first():
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    device_ids = _resolve_targets(db, run_request)
+    if run_request.dry_run:
+        return summarize_run("task", str(task_id), device_ids, [], dry_run=True)
+
+    chunks = await run_in_threadpool(
+        run_task_on_devices, pulseway_client, str(task_id), device_ids,
+        webhook_url=run_request.webhook_url or default_webhook_url()
+    )
+    return summarize_run("task", str(task_id), device_ids, chunks)
+
+@router.post("/workflows/{workflow_id}/run", response_model=AutomationRunDTO, summary="Run workflow on devices", description="Run a workflow on every device matching the target filters (organization, site, group, online-only, has-alerts). Targets are resolved server-side and submitted to Pulseway in chunks.", response_description="The targeted devices and the outcome of each chunk.")
+async def run_workflow(
+    workflow_id: int,
+    run_request: WorkflowRunRequest,
+    db: Session = Depends(get_db),
+    pulseway_client: PulsewayClient = Depends(get_pulseway_client)
+):
+    """Run a workflow on a filtered set of devices"""
+
+    if not db.query(Workflow.id).filter(Workflow.id == workflow_id).first():
+        raise HTTPException(status_code=404, detail="Workflow not found")
+
+    device_ids = _resolve_targets(db, run_request)
+    if run_request.dry_run:
+        return summarize_run("workflow", str(workflow_id), device_ids, [], dry_run=True)
+
+    chunks = await run_in_threadpool(
+        run_workflow_on_devices, pulseway_client, str(workflow_id), device_ids,
+        webhook_url=run_request.webhook_url or default_webhook_url(),
+        variable_overrides=run_request.variable_overrides
+    )
+    return summarize_run("workflow", str(workflow_id), device_ids, chunks)
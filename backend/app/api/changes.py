@@ -0,0 +1,60 @@
+# app/api/changes.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from ..database import SessionLocal
+from ..models.dto import ChangeFeedDTO, EntityChangesDTO, DeviceDTO, NotificationDTO, ScriptSummary
+from ..security import get_current_active_api_key
+from ..services.change_feed import ChangeFeedService, parse_change_token
+
+router = APIRouter(dependencies=[Depends(get_current_active_api_key)])
+
+# Feed section name -> entity type stored in the change log
+FEED_SECTIONS = {"devices": "device", "notifications": "notification", "scripts": "script"}
+
+# Dependency to get database session
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@router.get("", response_model=ChangeFeedDTO, summary="Get changes since a token", description="Retrieve devices, notifications and scripts created, updated or deleted since a change token.", response_description="Changed entities and the token to use for the next call.")
+async def get_changes(
+    since: Optional[str] = Query(None, description="Change token from a previous call. Omit to obtain the current token."),
+    types: Optional[str] = Query(None, description="Comma-separated sections to include (devices, notifications, scripts). Defaults to all."),
+    limit: int = Query(5000, ge=1, le=20000, description="Maximum number of change log entries to read"),
+    db: Session = Depends(get_db)
+):
+    """Get the delta feed used by the PWA offline stores"""
+    sections = [t.strip() for t in types.split(",") if t.strip()] if types else list(FEED_SECTIONS)
+    unknown = [t for t in sections if t not in FEED_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown change types: {', '.join(unknown)}")
+
+    feed = ChangeFeedService(db).get_changes_since(
+        parse_change_token(since), limit=limit, entity_types=[FEED_SECTIONS[t] for t in sections]
+    )
+
+    devices, deleted_devices = feed["changes"].get("device", ([], []))
+    notifications, deleted_notifications = feed["changes"].get("notification", ([], []))
+    scripts, deleted_scripts = feed["changes"].get("script", ([], []))
+
+    return ChangeFeedDTO(
+        token=str(feed["token"]),
+        reset=feed["reset"],
+        has_more=feed["has_more"],
+        devices=EntityChangesDTO(
+            upserted=[DeviceDTO.from_entity(d).model_dump(mode="json") for d in devices],
+            deleted=deleted_devices
+        ),
+        notifications=EntityChangesDTO(
+            upserted=[NotificationDTO.from_entity(n).model_dump(mode="json") for n in notifications],
+            deleted=deleted_notifications
+        ),
+        scripts=EntityChangesDTO(
+            upserted=[ScriptSummary.model_validate(s).model_dump(mode="json") for s in scripts],
+            deleted=deleted_scripts
+        )
+    )
@@ -1,5 +1,6 @@
 # app/api/devices.py
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session # removed joinedload, not used after refactor
 from typing import List, Optional, Dict, Any
 from ..database import SessionLocal
@@ -8,8 +9,10 @@ from ..pulseway.client import PulsewayClient
 # BaseModel import removed as DeviceDetail is now a DTO
 from datetime import datetime # Keep for DeviceDetail and other parts
 from ..security import get_current_active_api_key
-from ..models.dto import DeviceDTO, DeviceFilters, DeviceStatsDTO, DeviceDetailDTO, NotificationDTO, DeviceAssetDTO # Added NotificationDTO, DeviceAssetDTO
+from ..models.dto import DeviceDTO, DeviceFilterCriteria, DeviceFilters, DeviceStatsDTO, DeviceDetailDTO, NotificationDTO, DeviceAssetDTO, DeviceBatchRequest, DeviceBatchResponse # Added NotificationDTO, DeviceAssetDTO
 from ..services.device_service import DeviceService # Added
+from ..responses import FastJSONResponse
+from ..services.device_export import stream_device_export, EXPORT_FORMATS
 
 router = APIRouter(dependencies=[Depends(get_current_active_api_key)])
 
@@ -41,8 +44,8 @@ async def get_devices(
     service: DeviceService = Depends(get_device_service)
 ):
     """Get list of devices with optional filtering"""
-    devices_db = service.get_devices_with_filters(filters)
-    return [DeviceDTO.from_entity(device) for device in devices_db]
+    rows = service.get_device_rows_with_filters(filters)
+    return FastJSONResponse([DeviceDTO.row_to_dict(row) for row in rows])
 
 @router.get("/stats", response_model=DeviceStatsDTO, summary="Get device statistics", description="Retrieve statistics about the devices, such as counts by status.", response_description="Device statistics.") # Updated response_model
 async def get_device_stats(service: DeviceService = Depends(get_device_service)): # Inject service
@@ -50,6 +53,31 @@ async def get_device_stats(service: DeviceService = Depends(get_device_service))
     stats_data = service.get_device_statistics()
     return DeviceStatsDTO(**stats_data)
 
+@router.get("/export", summary="Export device inventory", description="Stream every device matching the filters, with its asset data, as NDJSON (default) or CSV.", response_description="A streamed NDJSON or CSV document.", response_class=StreamingResponse)
+async def export_devices(
+    filters: DeviceFilterCriteria = Depends(),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Export format: ndjson or csv"),
+    include_assets: bool = Query(True, description="Include asset data (tags, disks, installed software...)")
+):
+    """Stream the full device inventory without paging"""
+    return StreamingResponse(
+        stream_device_export(filters, export_format=format, include_assets=include_assets),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="devices.{format}"'}
+    )
+
+@router.post("/batch", response_model=DeviceBatchResponse, summary="Get many devices", description="Retrieve details for up to 500 devices in one request, optionally restricted to some fields. Unknown identifiers are listed in `missing`.", response_description="The devices found, in request order, and the identifiers that were not found.")
+async def get_devices_batch(
+    batch: DeviceBatchRequest,
+    service: DeviceService = Depends(get_device_service)
+):
+    """Get details for several devices with a single query"""
+    rows, missing = service.get_device_rows_by_identifiers(batch.identifiers, batch.fields)
+    return FastJSONResponse({
+        "devices": [DeviceDetailDTO.row_to_dict(row, batch.fields) for row in rows],
+        "missing": missing
+    })
+
 @router.get("/{device_id}", response_model=DeviceDetailDTO, summary="Get device details", description="Retrieve detailed information about a specific device by its ID.", response_description="Detailed information about the device.") # Updated response_model
 async def get_device(
     device_id: str,
@@ -117,8 +145,8 @@ async def search_devices(
     limit: int = Query(20, le=100, description="Maximum number of devices to return") # Keep Query for parameter validation if needed
 ):
     """Search devices by name, description, or IP address"""
-    devices_db = service.search_devices_by_term(search_term=search_term, limit=limit)
-    return [DeviceDTO.from_entity(device) for device in devices_db]
+    rows = service.search_devices_by_term(search_term=search_term, limit=limit)
+    return FastJSONResponse([DeviceDTO.row_to_dict(row) for row in rows])
 
 @router.get("/organization/{org_name}", response_model=List[DeviceDTO], summary="Get devices by organization", description="Retrieve all devices belonging to a specific organization.", response_description="A list of devices for the specified organization.")
 async def get_devices_by_organization(
@@ -128,8 +156,8 @@ async def get_devices_by_organization(
     offset: int = Query(0, ge=0, description="Offset for pagination")
 ):
     """Get all devices for a specific organization"""
-    devices_db = service.get_devices_by_organization_name(org_name=org_name, limit=limit, offset=offset)
-    return [DeviceDTO.from_entity(device) for device in devices_db]
+    rows = service.get_devices_by_organization_name(org_name=org_name, limit=limit, offset=offset)
+    return FastJSONResponse([DeviceDTO.row_to_dict(row) for row in rows])
 
 @router.get("/site/{site_name}", response_model=List[DeviceDTO], summary="Get devices by site", description="Retrieve all devices belonging to a specific site.", response_description="A list of devices for the specified site.")
 async def get_devices_by_site(
@@ -139,8 +167,8 @@ async def get_devices_by_site(
     offset: int = Query(0, ge=0, description="Offset for pagination")
 ):
     """Get all devices for a specific site"""
-    devices_db = service.get_devices_by_site_name(site_name=site_name, limit=limit, offset=offset)
-    return [DeviceDTO.from_entity(device) for device in devices_db]
+    rows = service.get_devices_by_site_name(site_name=site_name, limit=limit, offset=offset)
+    return FastJSONResponse([DeviceDTO.row_to_dict(row) for row in rows])
 
 @router.get("/alerts/critical", response_model=List[DeviceDTO], summary="Get devices with critical alerts", description="Retrieve devices that currently have critical alerts.", response_description="A list of devices with critical alerts.")
 async def get_devices_with_critical_alerts(
@@ -148,8 +176,8 @@ async def get_devices_with_critical_alerts(
     limit: int = Query(50, le=200, description="Maximum number of devices to return")
 ):
     """Get devices with critical alerts"""
-    devices_db = service.get_devices_with_critical_alerts(limit=limit)
-    return [DeviceDTO.from_entity(device) for device in devices_db]
+    rows = service.get_devices_with_critical_alerts(limit=limit)
+    return FastJSONResponse([DeviceDTO.row_to_dict(row) for row in rows])
 
 @router.get("/alerts/elevated", response_model=List[DeviceDTO], summary="Get devices with elevated alerts", description="Retrieve devices that currently have elevated alerts.", response_description="A list of devices with elevated alerts.")
 async def get_devices_with_elevated_alerts(
@@ -157,8 +185,8 @@ async def get_devices_with_elevated_alerts(
     limit: int = Query(50, le=200, description="Maximum number of devices to return")
 ):
     """Get devices with elevated alerts"""
-    devices_db = service.get_devices_with_elevated_alerts(limit=limit)
-    return [DeviceDTO.from_entity(device) for device in devices_db]
+    rows = service.get_devices_with_elevated_alerts(limit=limit)
+    return FastJSONResponse([DeviceDTO.row_to_dict(row) for row in rows])
 
 @router.get("/status/offline", response_model=List[DeviceDTO], summary="Get offline devices", description="Retrieve all devices that are currently offline.", response_description="A list of offline devices.")
 async def get_offline_devices( # Original name is fine as it's distinct in API
@@ -167,5 +195,5 @@ async def get_offline_devices( # Original name is fine as it's distinct in API
     offset: int = Query(0, ge=0, description="Offset for pagination")
 ):
     """Get all offline devices"""
-    devices_db = service.get_offline_devices_list(limit=limit, offset=offset)
-    return [DeviceDTO.from_entity(device) for device in devices_db]
\ No newline at end of file
+    rows = service.get_offline_devices_list(limit=limit, offset=offset)
+    return FastJSONResponse([DeviceDTO.row_to_dict(row) for row in rows])
\ No newline at end of file
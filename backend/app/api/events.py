@@ -0,0 +1,35 @@
+# app/api/events.py
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from ..database import SessionLocal
+from ..security import api_key_header_scheme, get_current_active_api_key
+from ..services.event_stream import event_stream_hub
+
+router = APIRouter()
+
+async def verify_stream_api_key(api_key: Optional[str] = Depends(api_key_header_scheme)):
+    """Same check as get_current_active_api_key, but releases the session before streaming starts.
+
+    A yield dependency's session would otherwise stay open for the lifetime of the stream.
+    """
+    db = SessionLocal()
+    try:
+        return await get_current_active_api_key(api_key, db)
+    finally:
+        db.close()
+
+@router.get("/stream", dependencies=[Depends(verify_stream_api_key)], summary="Real-time event stream", description="Server-Sent Events carrying the same messages as the /ws WebSocket (STATS_UPDATE, DEVICE_UPDATE, execution updates, ...). Reconnecting with Last-Event-ID replays missed events from a bounded buffer; a 'reset' event means the client missed too much and should reload.", response_description="A text/event-stream.")
+async def stream_events(
+    topics: Optional[str] = Query(None, description="Comma-separated topics to receive, e.g. stats,device:*,org:5. Defaults to everything."),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID", description="Id of the last event received, sent by EventSource on reconnect"),
+    since: Optional[str] = Query(None, description="Same as Last-Event-ID, for clients that cannot set headers")
+):
+    """Stream real-time events over SSE"""
+    wanted = {t.strip() for t in topics.split(",") if t.strip()} if topics else None
+
+    return StreamingResponse(
+        event_stream_hub.stream(wanted, last_event_id or since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,13 +1,17 @@
 # app/api/monitoring.py
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_, or_
+from sqlalchemy import String, cast, func, desc, and_, or_
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from ..database import SessionLocal
-from ..models.database import Device, Notification, Organization, Site, Group
+from ..models.database import ChangeLogEntry, Device, Notification, Organization, Site, Group
+from ..models.dto import NotificationFeedItemDTO
+from ..responses import FastJSONResponse
+from ..tracing import traced
 from pydantic import BaseModel
 from ..security import get_current_active_api_key
+from ..services.change_feed import current_change_token, record_change, record_changes
 
 router = APIRouter(dependencies=[Depends(get_current_active_api_key)])
 
@@ -41,14 +45,6 @@ class SystemHealth(BaseModel):
     antivirus_status: Dict[str, int]
     firewall_status: Dict[str, int]
 
-class RecentActivity(BaseModel):
-    id: int
-    message: str
-    priority: str
-    datetime: datetime
-    device_name: Optional[str]
-    device_identifier: Optional[str]
-
 class LocationStats(BaseModel):
     name: str
     total_devices: int
@@ -72,7 +68,55 @@ def get_db():
     finally:
         db.close()
 
+@traced("db.query", "monitoring.notification_feed")
+def _notification_feed(db: Session, limit: int, priority_filter: Optional[str], since: Optional[datetime],
+                       after_token: Optional[int] = None, unread_only: bool = False) -> FastJSONResponse:
+    """Notifications with their device name, in one query projected straight into feed rows.
+
+    Without ``after_token`` the newest come first. With it the feed pages forward through
+    the change log: notifications created or updated after that token, in the order they
+    were stored locally. Notification.datetime is Pulseway's event time and a sync can store
+    an older event after a newer one, so it is only displayed and filtered on (``since``),
+    never used as a cursor. The X-Change-Token header is the token to poll with next.
+    """
+    latest = current_change_token(db)
+    query = db.query(
+        Notification.id, Notification.message, Notification.datetime, Notification.priority,
+        Notification.read, Notification.device_identifier, Device.name
+    ).outerjoin(Device, Notification.device_identifier == Device.identifier)
+
+    if unread_only:
+        query = query.filter(Notification.read == False)
+    if priority_filter:
+        query = query.filter(Notification.priority.ilike(priority_filter))
+    if since is not None:
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)  # Stored as UTC
+        query = query.filter(Notification.datetime >= since)
+
+    if after_token is None:
+        rows = query.order_by(desc(Notification.datetime), desc(Notification.id)).limit(limit).all()
+        token = latest
+    else:
+        # Latest change log entry of each notification changed after the token
+        changed = db.query(
+            ChangeLogEntry.entity_id, func.max(ChangeLogEntry.id).label("token")
+        ).filter(
+            ChangeLogEntry.entity_type == "notification",
+            ChangeLogEntry.id > after_token,
+            ChangeLogEntry.id <= latest
+        ).group_by(ChangeLogEntry.entity_id).subquery()
+        rows = query.add_columns(changed.c.token).join(
+            changed, changed.c.entity_id == cast(Notification.id, String)
+        ).order_by(changed.c.token).limit(limit).all()
+        # A short page has everything up to the latest token
+        token = rows[-1].token if len(rows) == limit else max(after_token, latest)
+
+    return FastJSONResponse([NotificationFeedItemDTO.row_to_dict(row) for row in rows],
+                            headers={"X-Change-Token": str(token)})
+
 @router.get("/dashboard", response_model=DashboardSummary, summary="Get dashboard summary", description="Retrieve main dashboard summary statistics.", response_description="Dashboard summary statistics.")
+@traced("db.query", "monitoring.dashboard_summary")
 async def get_dashboard_summary(db: Session = Depends(get_db)):
     """Get main dashboard summary statistics"""
     
@@ -130,6 +174,7 @@ async def get_alert_summary(db: Session = Depends(get_db)):
     )
 
 @router.get("/health", response_model=SystemHealth, summary="Get system health", description="Retrieve overall system health metrics.", response_description="System health metrics.")
+@traced("db.query", "monitoring.system_health")
 async def get_system_health(db: Session = Depends(get_db)):
     """Get overall system health metrics"""
     
@@ -188,41 +233,19 @@ async def get_system_health(db: Session = Depends(get_db)):
         }
     )
 
-@router.get("/activity/recent", response_model=List[RecentActivity], summary="Get recent activity", description="Retrieve recent system activity and notifications.", response_description="List of recent activities.")
+@router.get("/activity/recent", response_model=List[NotificationFeedItemDTO], summary="Get recent activity", description="Retrieve recent system activity and notifications.", response_description="List of recent activities.")
 async def get_recent_activity(
     db: Session = Depends(get_db),
     limit: int = Query(50, le=200, description="Maximum number of activities to return"),
-    priority_filter: Optional[str] = Query(None, description="Filter activities by priority (critical, elevated, normal, low)")
+    priority_filter: Optional[str] = Query(None, description="Filter activities by priority (critical, elevated, normal, low)"),
+    since: Optional[datetime] = Query(None, description="Only activities that happened at or after this time"),
+    after_token: Optional[int] = Query(None, ge=0, description="Page forward, in the order activities were stored, from the X-Change-Token of the previous response; pass it when polling")
 ):
     """Get recent system activity and notifications"""
-    
-    query = db.query(Notification).join(
-        Device, Notification.device_identifier == Device.identifier, isouter=True
-    )
-    
-    if priority_filter:
-        query = query.filter(Notification.priority.ilike(priority_filter))
-    
-    notifications = query.order_by(desc(Notification.datetime)).limit(limit).all()
-    
-    activity = []
-    for notif in notifications:
-        device_name = None
-        if notif.device:
-            device_name = notif.device.name
-        
-        activity.append(RecentActivity(
-            id=notif.id,
-            message=notif.message,
-            priority=notif.priority,
-            datetime=notif.datetime,
-            device_name=device_name,
-            device_identifier=notif.device_identifier
-        ))
-    
-    return activity
+    return _notification_feed(db, limit, priority_filter, since, after_token)
 
 @router.get("/locations/organizations", response_model=List[LocationStats], summary="Get organization statistics", description="Retrieve statistics grouped by organization.", response_description="List of organization statistics.")
+@traced("db.query", "monitoring.organization_stats")
 async def get_organization_stats(db: Session = Depends(get_db)):
     """Get statistics by organization"""
     
@@ -251,6 +274,7 @@ async def get_organization_stats(db: Session = Depends(get_db)):
     return sorted(stats, key=lambda x: x.total_devices, reverse=True)
 
 @router.get("/locations/sites", response_model=List[LocationStats], summary="Get site statistics", description="Retrieve statistics grouped by site.", response_description="List of site statistics.")
+@traced("db.query", "monitoring.site_stats")
 async def get_site_stats(db: Session = Depends(get_db)):
     """Get statistics by site"""
     
@@ -279,6 +303,7 @@ async def get_site_stats(db: Session = Depends(get_db)):
     return sorted(stats, key=lambda x: x.total_devices, reverse=True)
 
 @router.get("/performance", response_model=PerformanceMetrics, summary="Get performance metrics", description="Retrieve system performance metrics.", response_description="System performance metrics.")
+@traced("db.query", "monitoring.performance_metrics")
 async def get_performance_metrics(db: Session = Depends(get_db)):
     """Get system performance metrics"""
     
@@ -316,6 +341,7 @@ async def get_performance_metrics(db: Session = Depends(get_db)):
     )
 
 @router.get("/trends/hourly", summary="Get hourly trends", description="Retrieve hourly trends for devices and alerts.", response_description="Hourly trend data.")
+@traced("db.query", "monitoring.hourly_trends")
 async def get_hourly_trends(
     db: Session = Depends(get_db),
     hours: int = Query(24, le=168, description="Number of hours to look back for trends")
@@ -346,22 +372,16 @@ async def get_hourly_trends(
     
     return {"trends": hourly_data}
 
-@router.get("/notifications/unread", summary="Get unread notifications", description="Retrieve unread notifications.", response_description="List of unread notifications.")
+@router.get("/notifications/unread", response_model=List[NotificationFeedItemDTO], summary="Get unread notifications", description="Retrieve unread notifications.", response_description="List of unread notifications.")
 async def get_unread_notifications(
     db: Session = Depends(get_db),
     limit: int = Query(50, le=200, description="Maximum number of notifications to return"),
-    priority_filter: Optional[str] = Query(None, description="Filter notifications by priority")
+    priority_filter: Optional[str] = Query(None, description="Filter notifications by priority"),
+    since: Optional[datetime] = Query(None, description="Only notifications that happened at or after this time"),
+    after_token: Optional[int] = Query(None, ge=0, description="Page forward, in the order notifications were stored, from the X-Change-Token of the previous response; pass it when polling")
 ):
     """Get unread notifications"""
-    
-    query = db.query(Notification).filter(Notification.read == False)
-    
-    if priority_filter:
-        query = query.filter(Notification.priority.ilike(priority_filter))
-    
-    notifications = query.order_by(desc(Notification.datetime)).limit(limit).all()
-    
-    return notifications
+    return _notification_feed(db, limit, priority_filter, since, after_token, unread_only=True)
 
 @router.post("/notifications/{notification_id}/mark-read", summary="Mark notification as read", description="Mark a specific notification as read.", response_description="Status of the operation.")
 async def mark_notification_read(notification_id: int, db: Session = Depends(get_db)):
@@ -373,6 +393,7 @@ async def mark_notification_read(notification_id: int, db: Session = Depends(get
         raise HTTPException(status_code=404, detail="Notification not found")
     
     notification.read = True
+    record_change(db, "notification", notification.id)
     db.commit()
     
     return {"status": "success", "message": "Notification marked as read"}
@@ -381,9 +402,11 @@ async def mark_notification_read(notification_id: int, db: Session = Depends(get
 async def mark_all_notifications_read(db: Session = Depends(get_db)):
     """Mark all notifications as read"""
     
+    unread_ids = [row[0] for row in db.query(Notification.id).filter(Notification.read == False).all()]
     updated_count = db.query(Notification).filter(Notification.read == False).update(
         {Notification.read: True}
     )
+    record_changes(db, "notification", unread_ids)
     db.commit()
     
     return {
@@ -0,0 +1,22 @@
+# app/api/profiling.py
+import asyncio
+from fastapi import APIRouter, Depends, Query
+from ..sampling_profiler import MAX_PROFILE_SECONDS, PROFILE_FORMATS, SamplingProfiler, profile_response
+from ..security import verify_admin_key
+
+router = APIRouter(dependencies=[Depends(verify_admin_key)])
+
+@router.get("/profile", summary="Sample the running worker", description="Samples the stacks of every thread in this worker for `seconds` and returns a flamegraph-compatible profile: speedscope JSON (open at https://www.speedscope.app) or collapsed stacks (flamegraph.pl, inferno). Scheduled syncs and requests served meanwhile are included. Needs the X-Admin-Key header. A single request, or a manual sync, can be profiled instead by adding `?profile=1` to it.", response_description="The profile, in the requested format.")
+async def capture_profile(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS, description="How long to sample for"),
+    output_format: str = Query("speedscope", alias="format", pattern=f"^({'|'.join(PROFILE_FORMATS)})$", description="speedscope or collapsed"),
+    idle: bool = Query(False, description="Include threads that are only waiting for work")
+):
+    """Capture a sampling profile of this worker"""
+    profiler = SamplingProfiler(include_idle=idle)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile = profiler.stop()
+    return profile_response(profile, output_format, name=f"worker profile ({seconds:g}s)")
@@ -1,38 +1,29 @@
 # app/api/scripts.py
 from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
+from collections import Counter
 from ..database import SessionLocal
-from ..models.database import Script, Device
+from ..models.database import Script, Device, BulkExecutionJob
 from ..pulseway.client import PulsewayClient, PulsewayNotFoundError, PulsewayAPIError, PulsewayClientError # Import specific exceptions
 from ..exceptions import ExternalAPIError # Base for some Pulseway errors
 from pydantic import BaseModel
 from datetime import datetime
 from ..security import get_current_active_api_key
+from ..models.dto import ScriptSummary, ScriptDetail, BulkExecutionJobDTO, JobExecutionsDTO
+from ..services.bulk_execution import (
+    ITEM_STATUSES, bulk_execution_runner, create_bulk_job, get_job_executions, get_job_status,
+    refresh_job_executions
+)
+from ..services.execution_cache import execution_cache, record_started_executions
+from ..services.execution_webhooks import default_webhook_url
+from ..services.script_facets import CATEGORY, PLATFORM, list_facet_values, scripts_with_facet
 
 router = APIRouter(dependencies=[Depends(get_current_active_api_key)])
 
 # Pydantic models for API requests/responses
-class ScriptSummary(BaseModel):
-    id: str
-    name: str
-    description: Optional[str]
-    category_name: Optional[str]
-    platforms: Optional[List[str]]
-    created_by: Optional[str]
-    is_built_in: bool
-    
-    class Config:
-        from_attributes = True
-
-class ScriptDetail(ScriptSummary):
-    category_id: Optional[int]
-    input_variables: Optional[List[Dict]]
-    output_variables: Optional[List[Dict]]
-    script_items: Optional[List[Dict]]
-    
-    class Config:
-        from_attributes = True
+# ScriptSummary and ScriptDetail moved to dto.py
 
 class ScriptExecution(BaseModel):
     device_identifier: str
@@ -70,7 +61,7 @@ def get_pulseway_client(request: Request) -> PulsewayClient:
 async def get_scripts(
     db: Session = Depends(get_db),
     platform: Optional[str] = Query(None, description="Filter by platform (Windows, Linux, Mac OS)"),
-    category: Optional[str] = Query(None, description="Filter by category name"),
+    category: Optional[str] = Query(None, description="Filter by category name (case-insensitive exact match)"),
     built_in_only: Optional[bool] = Query(None, description="Show only built-in scripts"),
     custom_only: Optional[bool] = Query(None, description="Show only custom scripts"),
     search: Optional[str] = Query(None, description="Search in script name or description"),
@@ -83,24 +74,10 @@ async def get_scripts(
     
     # Apply filters
     if platform:
-        # Filter by platform in JSON array
-        # The method to query JSON varies by database.
-        # For PostgreSQL, using has_key for string elements in a JSON array is common.
-        # For SQLite, a LIKE query on the text representation is a common fallback.
-        if db.bind.dialect.name == "sqlite":
-            # Using LIKE for SQLite. Ensure platform string is quoted inside the JSON array.
-            # e.g., searching for "Windows" in '["Windows", "Linux"]'
-            # This is somewhat fragile but a common workaround for SQLite JSON arrays.
-            query = query.filter(Script.platforms.astext.like(f'%"{platform}"%'))
-        else:
-            # For PostgreSQL and potentially other DBs with good JSON support
-            # This checks if the platform string is an element in the JSON array.
-            query = query.filter(Script.platforms.has_key(platform))
-            # An alternative for some backends might be func.json_contains(Script.platforms, f'"{platform}"')
-            # or specific array functions. has_key is generally for presence of a key or an element.
+        query = query.filter(Script.id.in_(scripts_with_facet(PLATFORM, platform)))
 
     if category:
-        query = query.filter(Script.category_name.ilike(f"%{category}%"))
+        query = query.filter(Script.id.in_(scripts_with_facet(CATEGORY, category)))
     
     if built_in_only is not None:
         query = query.filter(Script.is_built_in == built_in_only)
@@ -195,18 +172,20 @@ async def execute_script(
         raise HTTPException(status_code=400, detail="Device is offline")
     
     try:
-        # Execute script via Pulseway API
+        # Execute script via Pulseway API; completion is reported to our webhook receiver when configured
         response = pulseway_client.run_script(
             script_id=script_id,
             device_id=execution_request.device_identifier,
             variables=execution_request.variables,
-            webhook_url=execution_request.webhook_url
+            webhook_url=execution_request.webhook_url or default_webhook_url()
         )
         
         execution_data = response.get('Data', {})
         execution_id = execution_data.get('ExecutionId')
         
         if execution_id:
+            record_started_executions(db, script_id, [(execution_request.device_identifier, execution_id)])
+            db.commit()
             return ScriptExecutionResponse(
                 execution_id=execution_id,
                 status="success",
@@ -222,10 +201,11 @@ async def execute_script(
         # logger.error(f"Unexpected error during script execution for {script_id} on {execution_request.device_identifier}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Script execution failed unexpectedly: {str(e)}")
 
-@router.get("/{script_id}/executions/{device_id}", summary="Get script executions for a device", description="Retrieve execution history for a script on a specific device.", response_description="List of script executions.")
+@router.get("/{script_id}/executions/{device_id}", summary="Get script executions for a device", description="Retrieve execution history for a script on a specific device. Pages are cached locally for a short TTL.", response_description="List of script executions.")
 async def get_script_executions(
     script_id: str,
     device_id: str,
+    db: Session = Depends(get_db),
     pulseway_client: PulsewayClient = Depends(get_pulseway_client),
     limit: int = Query(20, le=100, description="Maximum number of executions to return"),
     offset: int = Query(0, ge=0, description="Offset for pagination")
@@ -233,20 +213,19 @@ async def get_script_executions(
     """Get execution history for a script on a specific device"""
     
     try:
-        response = pulseway_client.get_script_executions(
+        executions_data, total_count = execution_cache.list_script_executions(
+            db, pulseway_client,
             script_id=script_id,
             device_id=device_id,
             top=limit,
             skip=offset
         )
         
-        executions_data = response.get('Data', [])
-        
         return {
             "script_id": script_id,
             "device_id": device_id,
             "executions": executions_data,
-            "total_count": response.get('Meta', {}).get('TotalCount', len(executions_data))
+            "total_count": total_count
         }
         
     except PulsewayClientError as e:
@@ -256,55 +235,30 @@ async def get_script_executions(
         # logger.error(f"Unexpected error getting executions for script {script_id} on {device_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to get script executions unexpectedly: {str(e)}")
 
-@router.get("/{script_id}/executions/{device_id}/{execution_id}", response_model=ScriptExecutionDetail, summary="Get script execution details", description="Retrieve detailed information about a specific script execution.", response_description="Detailed information about the script execution.")
+@router.get("/{script_id}/executions/{device_id}/{execution_id}", response_model=ScriptExecutionDetail, summary="Get script execution details", description="Retrieve detailed information about a specific script execution. Finished executions are served from the local cache.", response_description="Detailed information about the script execution.")
 async def get_script_execution_details(
     script_id: str,
     device_id: str,
     execution_id: str,
+    db: Session = Depends(get_db),
     pulseway_client: PulsewayClient = Depends(get_pulseway_client)
 ):
     """Get detailed information about a specific script execution"""
     
     try:
-        response = pulseway_client.get_script_execution_details(
+        execution_data = execution_cache.get_script_execution_details(
+            db, pulseway_client,
             script_id=script_id,
             device_id=device_id,
             execution_id=execution_id
         )
         
-        execution_data = response.get('Data', {})
-        
         if not execution_data:
             raise HTTPException(status_code=404, detail="Script execution not found")
         
-        # Parse timestamps
-        start_time = None
-        end_time = None
-        
-        if execution_data.get('StartTime'):
-            try:
-                start_time = datetime.fromisoformat(execution_data['StartTime'].replace('Z', '+00:00'))
-            except ValueError: # Log parsing error if needed
-                # logger.warning(f"Could not parse StartTime for script execution {execution_id}: {execution_data.get('StartTime')}")
-                pass
-        
-        if execution_data.get('EndTime'):
-            try:
-                end_time = datetime.fromisoformat(execution_data['EndTime'].replace('Z', '+00:00'))
-            except ValueError: # Log parsing error if needed
-                # logger.warning(f"Could not parse EndTime for script execution {execution_id}: {execution_data.get('EndTime')}")
-                pass
-        
-        return ScriptExecutionDetail(
-            id=execution_data['Id'],
-            start_time=start_time,
-            duration_in_seconds=execution_data.get('DurationInSeconds'),
-            state=execution_data['State'],
-            end_time=end_time,
-            output=execution_data.get('Output'),
-            exit_code=execution_data.get('ExitCode'),
-            variable_outputs=execution_data.get('VariableOutputs')
-        )
+        return ScriptExecutionDetail(**execution_data)
+    except HTTPException:
+        raise
     except PulsewayNotFoundError as e:
         # logger.info(f"Script execution details not found for script {script_id}, device {device_id}, exec {execution_id}: {e.detail}")
         raise HTTPException(status_code=e.status_code, detail=e.detail) from e
@@ -319,39 +273,35 @@ async def get_script_execution_details(
 async def get_script_categories(db: Session = Depends(get_db)):
     """Get list of script categories"""
     
-    categories = db.query(Script.category_name).distinct().filter(
-        Script.category_name.isnot(None)
-    ).all()
-    
-    return {"categories": [cat[0] for cat in categories if cat[0]]}
+    return {"categories": list_facet_values(db, CATEGORY)}
 
 @router.get("/platforms/list", summary="List script platforms", description="Retrieve a list of supported script platforms.", response_description="A list of script platforms.")
 async def get_script_platforms(db: Session = Depends(get_db)):
     """Get list of supported platforms"""
     
-    # This is a bit complex due to JSON storage, so we'll return common platforms
+    # Until the first scripts sync, fall back to the platforms Pulseway supports
     return {
-        "platforms": ["Windows", "Linux", "Mac OS"]
+        "platforms": list_facet_values(db, PLATFORM) or ["Windows", "Linux", "Mac OS"]
     }
 
-@router.post("/bulk-execute", summary="Bulk execute script", description="Execute a script on multiple devices simultaneously.", response_description="Results of the bulk script execution.")
+@router.post("/bulk-execute", status_code=202, response_model=BulkExecutionJobDTO, summary="Bulk execute script", description="Queue a script for execution on multiple devices. Runs are dispatched in the background; poll GET /scripts/jobs/{job_id} for progress.", response_description="The queued bulk execution job.")
 async def bulk_execute_script(
     script_id: str = Body(...),
-    device_identifiers: List[str] = Body(...),
+    device_identifiers: List[str] = Body(..., min_length=1),
     variables: Optional[List[Dict[str, Any]]] = Body(None),
     webhook_url: Optional[str] = Body(None),
     db: Session = Depends(get_db),
     pulseway_client: PulsewayClient = Depends(get_pulseway_client)
 ):
-    """Execute a script on multiple devices"""
+    """Queue a script for execution on multiple devices"""
     
     # Verify script exists
-    script = db.query(Script).filter(Script.id == script_id).first()
+    script = db.query(Script.id).filter(Script.id == script_id).first()
     if not script:
         raise HTTPException(status_code=404, detail="Script not found")
     
     # Verify devices exist and are online
-    devices = db.query(Device).filter(Device.identifier.in_(device_identifiers)).all()
+    devices = db.query(Device.identifier, Device.is_online).filter(Device.identifier.in_(set(device_identifiers))).all()
     found_device_ids = {device.identifier for device in devices}
     missing_devices = set(device_identifiers) - found_device_ids
     
@@ -368,54 +318,46 @@ async def bulk_execute_script(
             detail=f"Some devices are offline: {', '.join(offline_devices)}"
         )
     
-    # Execute script on each device
-    execution_results = []
-    failed_executions = []
+    job = create_bulk_job(db, script_id, device_identifiers, variables=variables,
+                          webhook_url=webhook_url or default_webhook_url(), owner=bulk_execution_runner.worker_id)
+    bulk_execution_runner.submit(job.id, pulseway_client)
+    return get_job_status(db, job.id)
+
+@router.get("/jobs/{job_id}", response_model=BulkExecutionJobDTO, summary="Get bulk execution job", description="Report progress of a bulk script execution job, optionally with per-device results.", response_description="The job status and counters.")
+async def get_bulk_execution_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    include_items: bool = Query(False, description="Include per-device results"),
+    item_status: Optional[str] = Query(None, pattern=f"^({'|'.join(ITEM_STATUSES)})$", description="Only include items in this state")
+):
+    """Get the progress of a bulk execution job"""
     
-    for device_id in device_identifiers:
-        try:
-            response = pulseway_client.run_script(
-                script_id=script_id,
-                device_id=device_id,
-                variables=variables,
-                webhook_url=webhook_url
-            )
-            
-            execution_data = response.get('Data', {})
-            execution_id = execution_data.get('ExecutionId')
-            
-            if execution_id:
-                execution_results.append({
-                    "device_id": device_id,
-                    "execution_id": execution_id,
-                    "status": "success"
-                })
-            else:
-                failed_executions.append({
-                    "device_id": device_id,
-                    "error": "No execution ID returned"
-                })
-        except PulsewayClientError as e: # Catch specific errors from client
-            # logger.warning(f"Pulseway client error during bulk execution for device {device_id}, script {script_id}: {e.detail}")
-            failed_executions.append({
-                "device_id": device_id,
-                "error": e.detail, # Provide the error detail from the custom exception
-                "status_code": e.status_code
-            })
-        except Exception as e: # Catch any other unexpected error for this specific device
-            # logger.error(f"Unexpected error during bulk execution for device {device_id}, script {script_id}: {str(e)}", exc_info=True)
-            failed_executions.append({
-                "device_id": device_id,
-                "error": f"Unexpected error: {str(e)}"
-            })
+    status = get_job_status(db, job_id, include_items=include_items, item_status=item_status)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Bulk execution job not found")
+    return status
+
+@router.get("/jobs/{job_id}/executions", response_model=JobExecutionsDTO, summary="Get bulk job executions", description="Execution state of every device in a bulk execution job, read from the local execution history. Running executions not re-read within the cache TTL are refreshed from Pulseway first, a bounded number per request; the rest are flagged stale.", response_description="Per-device execution states and a count per state.")
+async def get_bulk_execution_job_executions(
+    job_id: str,
+    refresh: bool = Query(True, description="Re-read stale Running executions from Pulseway before answering"),
+    db: Session = Depends(get_db),
+    pulseway_client: PulsewayClient = Depends(get_pulseway_client)
+):
+    """Get the execution state of every device in a bulk execution job"""
+    
+    job = db.query(BulkExecutionJob.id, BulkExecutionJob.script_id).filter(BulkExecutionJob.id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Bulk execution job not found")
     
+    if refresh:
+        await run_in_threadpool(refresh_job_executions, db, pulseway_client, job_id)
+    executions = get_job_executions(db, job_id)
     return {
-        "script_id": script_id,
-        "successful_executions": execution_results,
-        "failed_executions": failed_executions,
-        "total_requested": len(device_identifiers),
-        "total_successful": len(execution_results),
-        "total_failed": len(failed_executions)
+        "job_id": job.id,
+        "script_id": job.script_id,
+        "states": dict(Counter(execution["state"] for execution in executions)),
+        "executions": executions
     }
 
 @router.get("/search/{search_term}", summary="Search scripts", description="Search for scripts by name or description.", response_description="A list of scripts matching the search term.")
@@ -0,0 +1,23 @@
+# app/api/suggest.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from ..models.dto import SuggestionDTO
+from ..responses import FastJSONResponse
+from ..security import get_current_active_api_key
+from ..services.suggest_index import suggest_index, SUGGEST_TYPES
+
+router = APIRouter(dependencies=[Depends(get_current_active_api_key)])
+
+@router.get("", response_model=List[SuggestionDTO], summary="Typeahead suggestions", description="Suggest devices, scripts, organizations, sites, groups and IP addresses whose name (or any word of it) starts with the query. Served from memory; no database access.", response_description="Matching items, shortest match first.")
+async def get_suggestions(
+    q: str = Query(..., min_length=1, max_length=100, description="Prefix typed by the user"),
+    types: Optional[str] = Query(None, description=f"Comma-separated types to include ({', '.join(SUGGEST_TYPES)}). Defaults to all."),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions to return")
+):
+    """Get typeahead suggestions for the PWA pickers"""
+    wanted = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    unknown = [t for t in wanted or [] if t not in SUGGEST_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown suggestion types: {', '.join(unknown)}")
+
+    return FastJSONResponse(suggest_index.suggest(q, types=wanted, limit=limit))
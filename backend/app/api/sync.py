@@ -0,0 +1,51 @@
+# app/api/sync.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+from ..database import SessionLocal
+from ..models.database import SyncRun
+from ..models.dto import SyncRunDTO, SyncRunStageDTO
+from ..security import get_current_active_api_key
+from ..services.sync_journal import RUN_STATUSES, RUN_TRIGGERS
+
+router = APIRouter(dependencies=[Depends(get_current_active_api_key)])
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _run_dto(run: SyncRun, include_stages: bool) -> SyncRunDTO:
+    # Built column by column so that runs listed without stages never load them
+    columns = {column.name: getattr(run, column.name) for column in SyncRun.__table__.columns}
+    stages = [SyncRunStageDTO.model_validate(stage) for stage in run.stages] if include_stages else None
+    return SyncRunDTO(**columns, stages=stages)
+
+@router.get("/runs", response_model=List[SyncRunDTO], summary="List sync runs", description="The sync run journal, newest first: per run the trigger, status, duration, rows fetched/created/updated/unchanged/deleted, Pulseway API calls, bytes received and rate limiter wait. Compare runs over time to spot sync throughput regressions.", response_description="Sync runs, newest first.")
+async def list_sync_runs(
+    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=500, description="Number of runs to return"),
+    status: Optional[str] = Query(None, pattern=f"^({'|'.join(RUN_STATUSES)})$", description="Only runs in this state"),
+    trigger: Optional[str] = Query(None, pattern=f"^({'|'.join(RUN_TRIGGERS)})$", description="Only runs started this way"),
+    include_stages: bool = Query(False, description="Include the per-stage breakdown")
+):
+    """List recent sync runs"""
+    query = db.query(SyncRun)
+    if status:
+        query = query.filter(SyncRun.status == status)
+    if trigger:
+        query = query.filter(SyncRun.trigger == trigger)
+    if include_stages:
+        query = query.options(selectinload(SyncRun.stages))
+    runs = query.order_by(SyncRun.id.desc()).limit(limit).all()
+    return [_run_dto(run, include_stages) for run in runs]
+
+@router.get("/runs/{run_id}", response_model=SyncRunDTO, summary="Get sync run", description="One sync run with its per-stage timing, row counts and Pulseway API usage.", response_description="The sync run and its stages.")
+async def get_sync_run(run_id: int, db: Session = Depends(get_db)):
+    """Get a sync run with its stages"""
+    run = db.query(SyncRun).options(selectinload(SyncRun.stages)).filter(SyncRun.id == run_id).first()
+    if run is None:
+        raise HTTPException(status_code=404, detail="Sync run not found")
+    return _run_dto(run, include_stages=True)
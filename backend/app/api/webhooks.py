@@ -0,0 +1,53 @@
+# app/api/webhooks.py
+"""
+Inbound webhooks. These are called by Pulseway, not by API clients, so they are
+exempt from the X-API-Key check (see verify_api_key in main.py) and authenticate
+with the token embedded in the webhook URL instead.
+"""
+import logging
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..services.execution_webhooks import (
+    BROADCAST_EVENTS, InvalidWebhookPayload, execution_message, parse_execution_webhook,
+    record_execution, verify_webhook_token, webhook_token
+)
+from ..services.realtime import manager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Dependency to get database session
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def require_webhook_token(token: Optional[str] = Query(None, description="Shared secret from the webhook URL")):
+    if webhook_token() is None:
+        raise HTTPException(status_code=503, detail="Webhook receiver is not configured (PULSEWAY_WEBHOOK_TOKEN)")
+    if not verify_webhook_token(token):
+        raise HTTPException(status_code=401, detail="Invalid webhook token")
+
+@router.post("/pulseway/executions", dependencies=[Depends(require_webhook_token)], summary="Receive execution webhook", description="Receives Pulseway's ScriptExecutionFinished, TaskExecutionFinished and WorkflowExecutionFinished callbacks, stores them and pushes them to WebSocket subscribers.", response_description="Acknowledgement.")
+async def receive_execution_webhook(
+    payload: Dict[str, Any] = Body(...),
+    db: Session = Depends(get_db)
+):
+    """Record a finished script, task or workflow execution"""
+
+    try:
+        values = parse_execution_webhook(payload)
+    except InvalidWebhookPayload as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+
+    execution = record_execution(db, values)
+    _, event_type = BROADCAST_EVENTS[execution.kind]
+    await manager.broadcast(execution_message(execution), event_type)
+
+    logger.info(f"Recorded {execution.kind} execution {execution.execution_id} ({execution.state}) for device {execution.device_identifier or '-'}")
+    return {"status": "recorded"}
@@ -18,9 +18,12 @@ from rich.text import Text
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
 
 from app.database import SessionLocal
-from app.models.database import Device, Notification, Script, Task, Workflow, Organization, Site, Group
+from app.models.database import Device, Notification, Script, Task, Workflow, Organization, Site, Group, SyncRun
 from app.pulseway.client import PulsewayClient
 from app.services.data_sync import DataSyncService
+from app.services.execution_webhooks import build_test_payload, send_test_webhook
+from app.services.leadership import create_leader_lock
+from app.services.sync_journal import RUN_STATUSES, RUN_SUCCEEDED, TRIGGER_MANUAL
 
 console = Console()
 
@@ -455,6 +458,12 @@ def now():
     """Trigger immediate data synchronization"""
     
     client = get_pulseway_client()
+
+    # Never sync next to the server's sync leader; ask the server instead
+    sync_lock = create_leader_lock()
+    if not sync_lock.try_acquire():
+        console.print("[red]✗ The server is running the sync schedule; trigger a sync with POST /api/sync instead[/red]")
+        sys.exit(1)
     
     with Progress(
         SpinnerColumn(),
@@ -466,12 +475,14 @@ def now():
         
         try:
             sync_service = DataSyncService(client)
-            asyncio.run(sync_service.sync_all_data())
+            asyncio.run(sync_service.sync_all_data(trigger=TRIGGER_MANUAL))
             console.print("[green]✓ Data synchronization completed successfully[/green]")
             
         except Exception as e:
             console.print(f"[red]✗ Data synchronization failed: {str(e)}[/red]")
             sys.exit(1)
+        finally:
+            sync_lock.release()
 
 @sync.command()
 def status():
@@ -479,14 +490,22 @@ def status():
     
     db = get_db()
     
-    # Get last update times
-    last_device_update = db.query(Device.updated_at).order_by(Device.updated_at.desc()).first()
-    last_notification_update = db.query(Notification.created_at).order_by(Notification.created_at.desc()).first()
+    # The sync run journal records when each run started and finished
+    last_run = db.query(SyncRun).order_by(SyncRun.id.desc()).first()
+    last_success = db.query(SyncRun).filter(SyncRun.status == RUN_SUCCEEDED).order_by(SyncRun.id.desc()).first()
     
     device_count = db.query(Device).count()
     notification_count = db.query(Notification).count()
     script_count = db.query(Script).count()
     
+    if last_run:
+        last_run_text = f"{last_run.started_at} ({last_run.trigger}, {last_run.status}"
+        last_run_text += f", {last_run.duration_seconds:.1f}s)" if last_run.duration_seconds is not None else ")"
+        if last_run.error:
+            last_run_text += f"\n  Error: {last_run.error}"
+    else:
+        last_run_text = "Never"
+    
     status_text = f"""
 [bold]Synchronization Status[/bold]
 
@@ -495,14 +514,104 @@ def status():
   Notifications: {notification_count}
   Scripts: {script_count}
 
-[cyan]Last Updates:[/cyan]
-  Devices: {last_device_update[0] if last_device_update else 'Never'}
-  Notifications: {last_notification_update[0] if last_notification_update else 'Never'}
+[cyan]Sync Runs:[/cyan]
+  Last run: {last_run_text}
+  Last successful run: {last_success.finished_at if last_success else 'Never'}
 """
     
     console.print(Panel(status_text, title="Sync Status", border_style="blue"))
     db.close()
 
+def _format_bytes(count: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if count < 1024:
+            return f"{count:.0f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+@sync.command()
+@click.option('--limit', '-l', default=20, help='Maximum number of runs to show')
+@click.option('--status', type=click.Choice(RUN_STATUSES), help='Only runs in this state')
+@click.option('--run', 'run_id', type=int, help='Show the per-stage breakdown of one run')
+def runs(limit, status, run_id):
+    """Show the sync run journal"""
+    
+    db = get_db()
+    
+    try:
+        if run_id is not None:
+            run = db.query(SyncRun).filter(SyncRun.id == run_id).first()
+            if not run:
+                console.print(f"[red]Sync run {run_id} not found[/red]")
+                sys.exit(1)
+            table = Table(title=f"Sync run {run.id} ({run.trigger}, {run.status}, started {run.started_at})")
+            columns = ["Stage", "Status", "Seconds", "Fetched", "Created", "Updated", "Unchanged", "Deleted",
+                       "API calls", "API errors", "Received", "Rate limit wait"]
+            rows = [
+                [stage.stage, stage.status, f"{stage.duration_seconds:.2f}", stage.rows_fetched, stage.rows_created,
+                 stage.rows_updated, stage.rows_unchanged, stage.rows_deleted, stage.api_calls, stage.api_errors,
+                 _format_bytes(stage.bytes_received), f"{stage.rate_limit_wait_seconds:.2f}s"]
+                for stage in run.stages
+            ]
+        else:
+            query = db.query(SyncRun)
+            if status:
+                query = query.filter(SyncRun.status == status)
+            table = Table(title="Sync Runs")
+            columns = ["ID", "Started", "Trigger", "Status", "Seconds", "Fetched", "Created", "Updated",
+                       "API calls", "API errors", "Received", "Rows/s"]
+            rows = [
+                [run.id, run.started_at.strftime("%Y-%m-%d %H:%M:%S"), run.trigger, run.status,
+                 f"{run.duration_seconds:.1f}" if run.duration_seconds is not None else "-",
+                 run.rows_fetched, run.rows_created, run.rows_updated, run.api_calls, run.api_errors,
+                 _format_bytes(run.bytes_received),
+                 f"{run.rows_fetched / run.duration_seconds:.0f}" if run.duration_seconds else "-"]
+                for run in query.order_by(SyncRun.id.desc()).limit(limit).all()
+            ]
+        
+        if not rows:
+            console.print("[yellow]No sync runs recorded[/yellow]")
+            return
+        for column in columns:
+            table.add_column(column)
+        for row in rows:
+            table.add_row(*[str(value) for value in row])
+        console.print(table)
+    finally:
+        db.close()
+
+# Webhook commands
+@cli.group()
+def webhooks():
+    """Execution webhook commands"""
+    pass
+
+@webhooks.command()
+@click.argument('kind', type=click.Choice(['script', 'task', 'workflow']))
+@click.argument('entity_id')
+@click.argument('device_id')
+@click.option('--state', type=click.Choice(['Successful', 'Failed', 'Stopped']), default='Successful', help='Reported execution state')
+@click.option('--execution-id', help='Execution ID (random when omitted)')
+@click.option('--url', default='http://localhost:8000', help='Base URL of the backend receiving the webhook')
+@click.option('--token', help='Webhook token (defaults to PULSEWAY_WEBHOOK_TOKEN)')
+def send(kind, entity_id, device_id, state, execution_id, url, token):
+    """Send a Pulseway-style execution webhook to a running backend"""
+    
+    payload = build_test_payload(kind, entity_id, device_id, execution_id=execution_id, state=state)
+    
+    try:
+        response = send_test_webhook(url, payload, token=token)
+    except Exception as e:
+        console.print(f"[red]✗ Webhook delivery failed: {str(e)}[/red]")
+        sys.exit(1)
+    
+    if response.ok:
+        console.print(f"[green]✓ Webhook accepted ({response.status_code})[/green]")
+        console.print(f"Execution ID: {payload['ExecutionId']}")
+    else:
+        console.print(f"[red]✗ Webhook rejected ({response.status_code}): {response.text}[/red]")
+        sys.exit(1)
+
 # Main entry point
 if __name__ == '__main__':
     cli()
\ No newline at end of file
@@ -1,5 +1,5 @@
 # app/main.py - Enhanced main file with PWA support
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, BackgroundTasks
+from fastapi import FastAPI, WebSocket, HTTPException, BackgroundTasks
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -16,6 +16,10 @@ from .database import engine, SessionLocal
 from .models.database import Base
 from .pulseway.client import PulsewayClient
 from .services.data_sync import DataSyncService
+from .services.realtime import handle_websocket, manager
+from .services.stats_push import stats_publisher
+from .services.event_bus import event_bus
+from .services.leadership import create_leader_lock, wait_for_leadership
 from .api import devices, scripts, notifications, organizations
 
 # Configure logging
@@ -41,57 +45,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# WebSocket connection manager for real-time updates
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.subscriptions: Dict[WebSocket, List[str]] = {}
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        self.subscriptions[websocket] = []
-        logger.info(f"Client connected. Total connections: {len(self.active_connections)}")
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if websocket in self.subscriptions:
-            del self.subscriptions[websocket]
-        logger.info(f"Client disconnected. Total connections: {len(self.active_connections)}")
-
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        try:
-            await websocket.send_text(json.dumps(message))
-        except Exception as e:
-            logger.error(f"Error sending message to client: {e}")
-            self.disconnect(websocket)
-
-    async def broadcast(self, message: dict, event_type: str = None):
-        """Broadcast message to all connected clients or filtered by subscription"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                # Check if client is subscribed to this event type
-                if event_type and event_type not in self.subscriptions.get(connection, []):
-                    continue
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Error broadcasting to client: {e}")
-                disconnected.append(connection)
-        
-        # Clean up disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
-
-    async def subscribe(self, websocket: WebSocket, event_types: List[str]):
-        """Subscribe client to specific event types"""
-        if websocket in self.subscriptions:
-            self.subscriptions[websocket].extend(event_types)
-        else:
-            self.subscriptions[websocket] = event_types
-
-manager = ConnectionManager()
 
 # Startup event
 @app.on_event("startup")
@@ -101,6 +54,9 @@ async def startup_event():
     
     # Create database tables
     Base.metadata.create_all(bind=engine)
+
+    # Connect to the other workers so broadcasts reach all their clients
+    await event_bus.start()
     
     # Initialize Pulseway client
     token_id = os.getenv("PULSEWAY_TOKEN_ID")
@@ -115,15 +71,25 @@ async def startup_event():
         if pulseway_client.health_check():
             logger.info("✅ Pulseway API connection successful")
             
-            # Start background sync
-            asyncio.create_task(background_sync_task())
+            # Start background sync; with several workers only the holder of the sync lock runs it
+            sync_leader = app.state.sync_leader = create_leader_lock()
+            if sync_leader.try_acquire():
+                asyncio.create_task(background_sync_task())
+            else:
+                asyncio.create_task(wait_for_leadership(sync_leader, background_sync_task))
         else:
             logger.error("❌ Pulseway API connection failed")
     else:
         logger.warning("⚠️ Pulseway credentials not provided")
 
-    # Start real-time update task
-    asyncio.create_task(real_time_updates_task())
+    # New "stats" subscribers start from the last pushed counters
+    stats_publisher.register()
+
+def create_sync_service() -> DataSyncService:
+    """Sync service that pushes stats and device changes as each stage commits"""
+    sync_service = DataSyncService(app.state.pulseway_client)
+    sync_service.add_listener(stats_publisher.publish)
+    return sync_service
 
 # Background sync task
 async def background_sync_task():
@@ -134,7 +100,7 @@ async def background_sync_task():
         try:
             if hasattr(app.state, 'pulseway_client'):
                 logger.info("🔄 Starting background sync...")
-                sync_service = DataSyncService(app.state.pulseway_client)
+                sync_service = create_sync_service()
                 await sync_service.sync_all_data()
                 
                 # Broadcast update to connected clients
@@ -156,88 +122,10 @@ async def background_sync_task():
         
         await asyncio.sleep(sync_interval)
 
-# Real-time updates task
-async def real_time_updates_task():
-    """Send periodic updates to connected clients"""
-    update_interval = int(os.getenv("UPDATE_INTERVAL_SECONDS", "30"))  # 30 seconds default
-    
-    while True:
-        try:
-            if len(manager.active_connections) > 0:
-                # Get fresh stats
-                db = SessionLocal()
-                try:
-                    from .models.database import Device, Notification
-                    
-                    total_devices = db.query(Device).count()
-                    online_devices = db.query(Device).filter(Device.is_online == True).count()
-                    critical_alerts = db.query(Device).filter(Device.critical_notifications > 0).count()
-                    
-                    # Get recent notifications
-                    recent_notifications = db.query(Notification).order_by(
-                        Notification.datetime.desc()
-                    ).limit(5).all()
-                    
-                    update_data = {
-                        "type": "STATS_UPDATE",
-                        "timestamp": datetime.now().isoformat(),
-                        "data": {
-                            "total_devices": total_devices,
-                            "online_devices": online_devices,
-                            "offline_devices": total_devices - online_devices,
-                            "critical_alerts": critical_alerts,
-                            "recent_notifications": [
-                                {
-                                    "id": n.id,
-                                    "message": n.message,
-                                    "priority": n.priority,
-                                    "datetime": n.datetime.isoformat() if n.datetime else None
-                                } for n in recent_notifications
-                            ]
-                        }
-                    }
-                    
-                    await manager.broadcast(update_data, "stats")
-                    
-                finally:
-                    db.close()
-        
-        except Exception as e:
-            logger.error(f"Real-time update failed: {e}")
-        
-        await asyncio.sleep(update_interval)
-
 # WebSocket endpoint for real-time updates
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
-    try:
-        while True:
-            # Receive client messages
-            data = await websocket.receive_text()
-            message = json.loads(data)
-            
-            # Handle subscription requests
-            if message.get("type") == "SUBSCRIBE":
-                event_types = message.get("events", [])
-                await manager.subscribe(websocket, event_types)
-                await manager.send_personal_message({
-                    "type": "SUBSCRIPTION_CONFIRMED",
-                    "events": event_types
-                }, websocket)
-            
-            # Handle ping/pong for connection health
-            elif message.get("type") == "PING":
-                await manager.send_personal_message({
-                    "type": "PONG",
-                    "timestamp": datetime.now().isoformat()
-                }, websocket)
-    
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
-    except Exception as e:
-        logger.error(f"WebSocket error: {e}")
-        manager.disconnect(websocket)
+    await handle_websocket(websocket)
 
 # Push notification endpoint
 @app.post("/api/notifications/push")
@@ -277,7 +165,7 @@ async def trigger_sync(background_tasks: BackgroundTasks):
     
     async def sync_task():
         try:
-            sync_service = DataSyncService(app.state.pulseway_client)
+            sync_service = create_sync_service()
             await sync_service.sync_all_data()
             
             await manager.broadcast({
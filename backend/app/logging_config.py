@@ -1,15 +1,96 @@
 """
 Logging configuration for Pulseway Backend using structlog
+
+Log calls only put the record on a bounded queue; a background QueueListener
+thread does the console and file writes (and file rotation), so request
+handlers and the sync never wait on disk I/O. When the queue is full,
+LOG_QUEUE_OVERFLOW decides: ``drop`` (default) discards the new record, except
+ERROR and above, which wait briefly for room; ``block`` always waits. Dropped
+records are counted per level (log_records_dropped_total in /metrics) and
+reported with a warning once the queue has room again.
 """
 
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
+from collections import Counter as CounterDict
 from pathlib import Path
+from typing import Optional
 import structlog
+from .metrics import Counter
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Log records discarded because the logging queue was full.", ("level",))
+
+OVERFLOW_DROP = "drop"
+OVERFLOW_BLOCK = "block"
+ERROR_PUT_TIMEOUT_SECONDS = 1.0
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler for a bounded queue that counts, rather than raises on, overflow."""
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = OVERFLOW_DROP):
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = CounterDict()  # level name -> records dropped since the last report
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.overflow == OVERFLOW_BLOCK:
+                self.queue.put(record)
+            elif record.levelno >= logging.ERROR:
+                self.queue.put(record, timeout=ERROR_PUT_TIMEOUT_SECONDS)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped[record.levelname] += 1
+            LOG_RECORDS_DROPPED.labels(record.levelname).inc()
+            return
+        if self.dropped:
+            self._report_dropped()
+
+    def _report_dropped(self) -> None:
+        counts, self.dropped = dict(self.dropped), CounterDict()
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "Logging queue was full; dropped %d records (%s)",
+            (sum(counts.values()), ", ".join(f"{level}: {n}" for level, n in sorted(counts.items()))), None
+        )
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped.update(counts)  # Report them next time
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_log_queue: Optional[queue.Queue] = None
+
+
+def stop_logging() -> None:
+    """Writes out the queued records and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def flush_logging() -> None:
+    """Waits until every queued record has been written."""
+    if _listener is not None and _log_queue is not None:
+        _log_queue.join()
+
+
+atexit.register(stop_logging)
+
 
 def setup_logging(log_level: str = "INFO"):
     """Setup application logging with structlog"""
+    global _listener, _log_queue
 
     # Create logs directory
     log_dir = Path("logs")
@@ -54,7 +135,6 @@ def setup_logging(log_level: str = "INFO"):
         defaults={"request_id": None}
     )
     console_handler.setFormatter(console_format)
-    stdlib_root_logger.addHandler(console_handler)
 
     # File handler with rotation
     file_handler = logging.handlers.RotatingFileHandler(
@@ -69,7 +149,6 @@ def setup_logging(log_level: str = "INFO"):
         defaults={"request_id": None}
     )
     file_handler.setFormatter(file_format)
-    stdlib_root_logger.addHandler(file_handler)
 
     # Error file handler
     error_handler = logging.handlers.RotatingFileHandler(
@@ -80,7 +159,16 @@ def setup_logging(log_level: str = "INFO"):
     error_handler.setLevel(logging.ERROR) # Set level on handler
     # Re-use file_format for errors, or define a specific one if needed
     error_handler.setFormatter(file_format)
-    stdlib_root_logger.addHandler(error_handler)
+
+    # The handlers above run on the listener thread; the root logger only enqueues
+    stop_logging()  # Replaces the pipeline of an earlier call
+    _log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    queue_handler = BoundedQueueHandler(_log_queue, overflow=os.getenv("LOG_QUEUE_OVERFLOW", OVERFLOW_DROP).lower())
+    stdlib_root_logger.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(
+        _log_queue, console_handler, file_handler, error_handler, respect_handler_level=True
+    )
+    _listener.start()
 
     # Get a structlog logger instance.
     # The name here is for the logger that setup_logging itself might use.
@@ -1,49 +1,57 @@
 # app/main.py
-from fastapi import FastAPI, HTTPException, Depends, Header, Request
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware # Added
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi.responses import JSONResponse, Response
+from starlette.requests import HTTPConnection # Request or WebSocket
+from typing import Optional, Set
 import uuid
+import time
 from contextlib import asynccontextmanager
 import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
 from .database import engine, SessionLocal
+from .metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_DB_DURATION, HTTP_REQUEST_DB_QUERIES, HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS, HTTP_REQUESTS_IN_PROGRESS, RequestDbStats, instrument_engine, metrics_spool, render_metrics,
+    request_db_stats, route_template
+)
+from .sql_profiler import QueryProfile, current_profile, install_profiler, log_profile, profiler_enabled
+from .sampling_profiler import MAX_PROFILE_SECONDS, ProfilerBusyError, SamplingProfiler, profile_response
+from .security import is_admin_key
 from .models.database import Base
 from .services.data_sync import DataSyncService
-from .api import devices, scripts, monitoring
+from .services.search_index import rebuild_search_index_if_empty
+from .services.suggest_index import load_suggestions, suggest_index_sync
+from .services.script_facets import rebuild_script_facets_if_empty
+from .services.bulk_execution import JOB_LEASE_SECONDS, bulk_execution_runner, mark_interrupted_jobs
+from .services.realtime import handle_websocket
+from .services.stats_push import stats_publisher
+from .services.event_bus import event_bus
+from .services.leadership import SYNC_REQUEST_MESSAGE, create_leader_lock, wait_for_leadership
+from .services.sync_journal import TRIGGER_MANUAL, TRIGGER_STARTUP, mark_interrupted_runs
+from .api import devices, scripts, monitoring, changes, suggest, webhooks, automation, events, profiling, sync
 from .pulseway.client import PulsewayClient
 import os
 import structlog
 import sentry_sdk # Added Sentry
 
 from .logging_config import setup_logging
+from .tracing import init_tracing, record_slow_or_failed_request
 # Import custom exceptions and the base AppException
 from .exceptions import AppException, DatabaseError, ExternalAPIError, AuthenticationError, NotFoundError, BusinessLogicError # Added
 
-# Initialize Sentry SDK
+# Initialize Sentry SDK (errors and sampled performance traces, see tracing.py)
 SENTRY_DSN = os.getenv("SENTRY_DSN")
-if SENTRY_DSN:
-    sentry_sdk.init(
-        dsn=SENTRY_DSN,
-        # Set traces_sample_rate to 1.0 to capture 100%
-        # of transactions for performance monitoring.
-        # Adjust in production!
-        traces_sample_rate=1.0,
-        # Consider adding environment, release version for better Sentry event filtering
-        # environment=os.getenv("ENVIRONMENT", "development"),
-        # release="pulseway-backend@1.0.0" # Replace with dynamic version
-    )
+if init_tracing(SENTRY_DSN):
     # Use logger for this message
     # Potential issue: logger might not be configured yet if setup_logging is called after this.
     # However, structlog.get_logger() can be called before configure, messages will be buffered.
-    # For now, let's assume basic logging (like print to stdout) might happen or it's buffered.
-    # A better pattern is to configure logging (stdlib part) then Sentry then structlog processors.
-    # Given current structure, will use a temp logger or print if logger is not yet useful.
-    # Safest is to move Sentry init after basic logging is up.
-    # Let's assume logger is available for now from structlog's global config.
-    structlog.get_logger("sentry_init").info(f"Sentry initialized with DSN starting: {SENTRY_DSN[:20]}...")
+    structlog.get_logger("sentry_init").info(
+        "Tracing initialized", exporter=os.getenv("TRACES_EXPORTER", "sentry"),
+        dsn=f"{SENTRY_DSN[:20]}..." if SENTRY_DSN else None
+    )
 else:
     # Same assumption for logger here.
     structlog.get_logger("sentry_init").warning("Sentry DSN not found, Sentry will not be initialized.")
@@ -57,7 +65,13 @@ logger = structlog.get_logger(__name__)
 scheduler = AsyncIOScheduler()
 
 # API Key Verification
-async def verify_api_key(x_api_key: Optional[str] = Header(None, alias="X-API-Key")):
+WEBHOOK_PATH_PREFIX = "/api/v1/webhooks/" # Must match the webhooks router prefix below
+
+async def verify_api_key(connection: HTTPConnection, x_api_key: Optional[str] = Header(None, alias="X-API-Key")):
+    # Inbound webhooks are called by Pulseway and authenticate with their URL token instead
+    if connection.url.path.startswith(WEBHOOK_PATH_PREFIX):
+        return None
+
     expected_api_key = os.getenv("API_KEY")
     if expected_api_key is None:
         expected_api_key = "your-secret-key-here"  # Fallback as per original snippet
@@ -75,6 +89,29 @@ async def lifespan(app: FastAPI):
     
     # Create database tables
     Base.metadata.create_all(bind=engine)
+    instrument_engine(engine)
+    # Lets whichever worker is scraped serve every worker's metrics
+    metrics_spool.start()
+    if profiler_enabled():
+        install_profiler(engine)
+        logger.info("SQL profiler enabled")
+
+    # Connect to the other workers before anything is broadcast
+    await event_bus.start()
+
+    # Build the device search index and script facets for databases synced before they existed, and load typeahead suggestions
+    db = SessionLocal()
+    try:
+        indexed = rebuild_search_index_if_empty(db)
+        if indexed:
+            logger.info("Built device search index", documents=indexed)
+        facets = rebuild_script_facets_if_empty(db)
+        if facets:
+            logger.info("Built script platform/category facets", facets=facets)
+        suggestions = load_suggestions(db)
+        logger.info("Loaded typeahead suggestions", keys=suggestions)
+    finally:
+        db.close()
     
     # Initialize Pulseway client
     pulseway_client = PulsewayClient(
@@ -85,35 +122,110 @@ async def lifespan(app: FastAPI):
     
     # Initialize data sync service
     data_sync = DataSyncService(pulseway_client)
-    
-    # Schedule periodic data refresh (every 10 minutes)
-    scheduler.add_job(
-        data_sync.sync_all_data,
-        IntervalTrigger(minutes=10),
-        id="data_sync",
-        name="Sync Pulseway Data",
-        replace_existing=True
-    )
-    
-    # Start scheduler
-    scheduler.start()
-    
-    # Initial data sync
-    try:
-        await data_sync.sync_all_data()
-        logger.info("Initial data sync completed")
-    except Exception as e:
-        logger.error("Initial data sync failed", error=str(e)) # structlog encourages key-value pairs
+    # Push stats and device changes to WebSocket clients as each sync stage commits
+    data_sync.add_listener(stats_publisher.publish)
+    stats_publisher.register()
+    # Other workers refresh their typeahead suggestions from what each stage changed
+    data_sync.add_listener(suggest_index_sync.publish)
     
     # Store services in app state
     app.state.pulseway_client = pulseway_client
     app.state.data_sync = data_sync
+
+    def close_abandoned_bulk_jobs():
+        # Bulk jobs are dispatched by whichever worker received them; a job whose worker stopped
+        # renewing its lease never finishes
+        db = SessionLocal()
+        try:
+            interrupted = mark_interrupted_jobs(db)
+            if interrupted:
+                logger.warning("Marked abandoned bulk execution jobs as interrupted", jobs=interrupted)
+        finally:
+            db.close()
+
+    async def start_sync_schedule():
+        # Sync runs left running by a previous process never finished. Only the leader closes them,
+        # so a worker starting next to a running leader leaves its work alone.
+        db = SessionLocal()
+        try:
+            interrupted = mark_interrupted_runs(db)
+            if interrupted:
+                logger.warning("Marked sync runs from a previous run as interrupted", runs=interrupted)
+        finally:
+            db.close()
+        close_abandoned_bulk_jobs()
+        scheduler.add_job(
+            close_abandoned_bulk_jobs,
+            IntervalTrigger(seconds=JOB_LEASE_SECONDS),
+            id="bulk_job_leases",
+            name="Close abandoned bulk execution jobs",
+            replace_existing=True
+        )
+
+        # Schedule periodic data refresh (every 10 minutes)
+        scheduler.add_job(
+            data_sync.sync_all_data,
+            IntervalTrigger(minutes=10),
+            id="data_sync",
+            name="Sync Pulseway Data",
+            replace_existing=True
+        )
+        
+        # Start scheduler
+        scheduler.start()
+        
+        # Initial data sync
+        try:
+            await data_sync.sync_all_data(trigger=TRIGGER_STARTUP)
+            logger.info("Initial data sync completed")
+        except Exception as e:
+            logger.error("Initial data sync failed", error=str(e)) # structlog encourages key-value pairs
+
+    # With several workers only the holder of the sync lock syncs; events reach the others over the bus
+    sync_leader = create_leader_lock()
+    leadership_task = None
+
+    # Manual syncs requested on other workers (POST /api/sync) run in the leader, one at a time
+    forwarded_syncs: Set[asyncio.Task] = set()
+
+    async def run_forwarded_sync():
+        try:
+            await data_sync.sync_all_data(trigger=TRIGGER_MANUAL)
+            logger.info("Forwarded manual data synchronization completed")
+        except Exception as e:
+            logger.error("Forwarded manual data synchronization failed", error=str(e))
+
+    async def on_sync_request(message):
+        if message.get("type") != SYNC_REQUEST_MESSAGE or not sync_leader.is_leader or forwarded_syncs:
+            return
+        task = asyncio.create_task(run_forwarded_sync())
+        forwarded_syncs.add(task)
+        task.add_done_callback(forwarded_syncs.discard)
+
+    event_bus.add_internal_handler(on_sync_request)
+
+    if sync_leader.try_acquire():
+        await start_sync_schedule()
+    else:
+        logger.info("Another worker owns the sync schedule; standing by", pid=os.getpid())
+        leadership_task = asyncio.create_task(wait_for_leadership(sync_leader, start_sync_schedule))
+    app.state.sync_leader = sync_leader
     
     yield
     
     # Shutdown
     logger.info("Shutting down Pulseway Backend...")
-    scheduler.shutdown()
+    if leadership_task is not None:
+        leadership_task.cancel()
+    event_bus.remove_internal_handler(on_sync_request)
+    for task in list(forwarded_syncs):
+        task.cancel()
+    if scheduler.running:
+        scheduler.shutdown()
+    sync_leader.release()
+    await bulk_execution_runner.shutdown()
+    await event_bus.stop()
+    metrics_spool.stop()
 
 # Create FastAPI app
 app = FastAPI(
@@ -154,6 +266,46 @@ async def app_exception_handler(request: Request, exc: AppException):
 # Otherwise, the AppException handler above will catch DatabaseError and other children.
 
 
+# Request Profiling Middleware
+# Registered before the tracing middleware so that one wraps it (request id, metrics, logging)
+@app.middleware("http")
+async def request_profiling_middleware(request: Request, call_next):
+    """With ?profile=1 and the admin key, responds with a sampling profile of the request instead of its result"""
+    if request.query_params.get("profile") not in ("1", "true"):
+        return await call_next(request)
+    if not is_admin_key(request.headers.get("X-Admin-Key")):
+        return JSONResponse(status_code=403, content={"detail": "Profiling a request requires the admin key"})
+
+    profiler = SamplingProfiler()
+    try:
+        profiler.start()
+    except ProfilerBusyError as e:
+        return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+    async def drain_body():
+        async for _ in response.body_iterator:  # Include producing the body, discarding it as it comes
+            pass
+
+    truncated = False
+    try:
+        response = await call_next(request)
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            # An event stream never ends: draining it would hold the profiler for good
+            return JSONResponse(status_code=400, content={"detail": "Streaming responses cannot be profiled"})
+        try:
+            await asyncio.wait_for(drain_body(), timeout=MAX_PROFILE_SECONDS)
+        except asyncio.TimeoutError:
+            truncated = True
+    finally:
+        profile = profiler.stop()
+    logger.info("Profiled request", method=request.method, path=request.url.path, status_code=response.status_code,
+                samples=profile.samples, seconds=round(profile.seconds, 3), truncated=truncated)
+    result = profile_response(profile, request.query_params.get("profile_format", "speedscope"),
+                              name=f"{request.method} {request.url.path}")
+    result.headers["X-Profiled-Status"] = str(response.status_code)
+    if truncated:
+        result.headers["X-Profile-Truncated"] = "true"
+    return result
+
 # Request Tracing Middleware
 @app.middleware("http")
 async def request_tracing_middleware(request: Request, call_next):
@@ -165,9 +317,22 @@ async def request_tracing_middleware(request: Request, call_next):
     # Initial log with request details (optional, but good for tracing start)
     logger.debug("Request received", method=request.method, path=request.url.path, client_host=request.client.host if request.client else "unknown")
 
+    # Metrics are labelled by route template, not raw path, to keep the series count bounded
+    route = route_template(request.app.router.routes, request.scope)
+    in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(request.method, route)
+    in_progress.inc()
+    db_stats = RequestDbStats()
+    db_stats_token = request_db_stats.set(db_stats)
+    sql_profile = QueryProfile() if profiler_enabled() else None
+    sql_profile_token = current_profile.set(sql_profile)
+    status_code = 500
+    started = time.perf_counter()
     try:
         response = await call_next(request)
+        status_code = response.status_code
         response.headers["X-Request-ID"] = request_id
+        if sql_profile is not None:
+            response.headers["Server-Timing"] = sql_profile.server_timing()
         # Log after response is generated (optional, but good for tracing end)
         logger.debug("Request finished", method=request.method, path=request.url.path, status_code=response.status_code)
     except Exception as e:
@@ -176,6 +341,17 @@ async def request_tracing_middleware(request: Request, call_next):
         # Important: Re-raise the exception so FastAPI can handle it
         raise e
     finally:
+        duration = time.perf_counter() - started
+        HTTP_REQUEST_DURATION.labels(request.method, route).observe(duration)
+        HTTP_REQUESTS.labels(request.method, route, status_code).inc()
+        HTTP_REQUEST_DB_QUERIES.labels(route).observe(db_stats.queries)
+        HTTP_REQUEST_DB_DURATION.labels(route).observe(db_stats.seconds)
+        in_progress.dec()
+        record_slow_or_failed_request(request.method, request.url.path, route, duration, status_code)
+        request_db_stats.reset(db_stats_token)
+        if sql_profile is not None:
+            log_profile(sql_profile, request.method, route)
+        current_profile.reset(sql_profile_token)
         # Clear context variables for the next request to prevent leakage
         structlog.contextvars.clear_contextvars()
 
@@ -196,6 +372,18 @@ app.add_middleware(
 app.include_router(devices.router, prefix="/api/v1/devices", tags=["devices"])
 app.include_router(scripts.router, prefix="/api/v1/scripts", tags=["scripts"])
 app.include_router(monitoring.router, prefix="/api/v1/monitoring", tags=["monitoring"])
+app.include_router(changes.router, prefix="/api/v1/changes", tags=["changes"])
+app.include_router(suggest.router, prefix="/api/v1/suggest", tags=["suggest"])
+app.include_router(automation.router, prefix="/api/v1/automation", tags=["automation"])
+app.include_router(events.router, prefix="/api/v1/events", tags=["events"])
+app.include_router(webhooks.router, prefix="/api/v1/webhooks", tags=["webhooks"])
+app.include_router(sync.router, prefix="/api/v1/sync", tags=["sync"])
+app.include_router(profiling.router, prefix="/api/v1/admin", tags=["admin"])
+
+# WebSocket endpoint for real-time updates (execution results, ...)
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    await handle_websocket(websocket)
 
 @app.get("/")
 async def root():
@@ -230,12 +418,33 @@ async def health_check():
         "scheduler": "running" if scheduler.running else "stopped"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics of every worker on this host, labelled by worker (see app/metrics.py)"""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/api/sync")
 async def trigger_sync():
-    """Manually trigger data synchronization"""
+    """Manually trigger data synchronization
+
+    Runs here when this worker holds the sync lock. Other workers forward the request to the leader over
+    the event bus and answer 202 without waiting; without a bus crossing workers they answer 409.
+
+    Add ?profile=1 (with the X-Admin-Key header) to get a sampling profile of the sync instead of the result.
+    """
+    sync_leader = getattr(app.state, "sync_leader", None)
+    if sync_leader is not None and not sync_leader.is_leader:
+        if not event_bus.crosses_workers:
+            raise HTTPException(status_code=409, detail="Another process holds the sync lock and runs the sync")
+        await event_bus.publish_internal({"type": SYNC_REQUEST_MESSAGE})
+        logger.info("Manual data synchronization forwarded to the sync leader")
+        return JSONResponse(status_code=202, content={
+            "status": "accepted", "message": "Data synchronization requested from the worker running the sync schedule"
+        })
+
     logger.info("Manual data synchronization triggered")
     try:
-        await app.state.data_sync.sync_all_data()
+        await app.state.data_sync.sync_all_data(trigger=TRIGGER_MANUAL)
         return {"status": "success", "message": "Data synchronization completed"}
     # Let the global AppException handler catch errors from data_sync service
     except AppException as e:
@@ -0,0 +1,395 @@
+"""
+In-process metrics in the Prometheus text exposition format, served at /metrics
+
+Counters, gauges and histograms are kept in memory by each worker process; a
+scrape renders them on the spot, so no exporter, push gateway or extra
+dependency is involved. Recording is a dict lookup and a few additions under a
+per-series lock. Gauges whose value is cheap to read where it lives (circuit
+breaker state, WebSocket queues) are callbacks evaluated at scrape time rather
+than updated on every change.
+
+With several workers a scrape lands on any one of them, so each worker also
+spools its series to METRICS_SPOOL_DIR every METRICS_SPOOL_INTERVAL_SECONDS and
+/metrics renders its own series next to the other workers' latest spool. Every
+series carries a ``worker`` label (the process id): counters restart with the
+worker that kept them, and dashboards sum over it (``sum without (worker)``).
+The directory is shared by the workers of one host; with workers on several
+hosts, scrape each host.
+"""
+
+import bisect
+import glob
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import BaseRoute, Match
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+WORKER_ID = str(os.getpid())
+SPOOL_DIR = os.getenv("METRICS_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "pulseway-metrics"))
+SPOOL_INTERVAL_SECONDS = float(os.getenv("METRICS_SPOOL_INTERVAL_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SYNC_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _add_worker_label(labels: str, worker: Optional[str]) -> str:
+    if worker is None:
+        return labels
+    worker_label = f'worker="{_escape(worker)}"'
+    return "{" + worker_label + ("," + labels[1:] if labels else "}")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Series for the given label values, created on first use."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _series(self) -> Iterable[Tuple[LabelValues, object]]:
+        return list(self._children.items())
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def sample_lines(self, worker: Optional[str] = None) -> List[str]:
+        return [f"{name}{_add_worker_label(labels, worker)} {_format_value(value)}"
+                for name, labels, value in self.samples()]
+
+    def render(self, worker: Optional[str] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.sample_lines(worker))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in self._series():
+            yield self.name, _format_labels(self.labelnames, values), child.value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+
+class CallbackGauge(_Metric):
+    """Gauge read at scrape time; ``callback`` yields (label values, value) pairs."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def samples(self):
+        for values, value in self.callback():
+            yield self.name, _format_labels(self.labelnames, values), value
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # Last slot: above the highest bound
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self):
+        names = self.labelnames + ("le",)
+        for values, child in self._series():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", _format_labels(names, values + (_format_value(float(bound)),)), cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        # Keyed by name, so re-importing a module replaces its metrics instead of duplicating them
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def sample_lines(self, worker: Optional[str] = None) -> Dict[str, List[str]]:
+        return {name: metric.sample_lines(worker) for name, metric in list(self._metrics.items())}
+
+    def render(self, worker: Optional[str] = None, other_workers: Iterable[Dict[str, List[str]]] = ()) -> str:
+        """Exposition text; ``other_workers`` are other processes' sample_lines, merged under the same HELP/TYPE."""
+        other_workers = list(other_workers)
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render(worker))
+            for samples in other_workers:
+                lines.extend(samples.get(metric.name, ()))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class MetricsSpool:
+    """Shares this worker's series with the other workers of the host through a directory.
+
+    Each worker rewrites its own file every ``interval`` seconds; files not rewritten
+    for a few intervals belong to workers that are gone and are removed when read.
+    """
+
+    def __init__(self, directory: str = SPOOL_DIR, registry: Registry = REGISTRY, worker: str = WORKER_ID,
+                 interval: float = SPOOL_INTERVAL_SECONDS):
+        self.directory = directory
+        self.registry = registry
+        self.worker = worker
+        self.interval = max(0.1, interval)
+        self.path = os.path.join(directory, f"worker-{worker}.json")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as spool_file:
+            json.dump(self.registry.sample_lines(self.worker), spool_file)
+        os.replace(temporary, self.path)  # Readers never see a partial file
+
+    def read_others(self) -> List[Dict[str, List[str]]]:
+        """The latest series of the other live workers."""
+        oldest = time.time() - 3 * self.interval
+        others = []
+        for path in glob.glob(os.path.join(self.directory, "worker-*.json")):
+            if path == self.path:
+                continue
+            try:
+                if os.path.getmtime(path) < oldest:
+                    os.remove(path)
+                    continue
+                with open(path) as spool_file:
+                    others.append(json.load(spool_file))
+            except (OSError, ValueError):
+                continue  # Removed or being replaced meanwhile
+        return others
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-spool", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.write()
+            except Exception as e:
+                logger.warning(f"Could not spool metrics to {self.path}: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+
+# Started by the application's lifespan; scrapes outside of it (tests) render this worker alone
+metrics_spool = MetricsSpool()
+
+
+# HTTP requests, recorded by the middleware in main.py
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status"))
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"))
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being handled by route template.", ("method", "route"))
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries issued per HTTP request.", ("route",), buckets=COUNT_BUCKETS)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Database time spent per HTTP request.", ("route",))
+
+# Database statements, recorded by the engine hooks below
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Duration of individual database statements.", buckets=DB_QUERY_BUCKETS)
+
+
+class RequestDbStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Set by the request middleware; statements run in the threadpool still see it, since the context is copied
+request_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    elapsed = time.perf_counter() - started
+    DB_QUERY_DURATION.observe(elapsed)
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Times every statement run through ``engine``; safe to call more than once."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def route_template(routes: Iterable[BaseRoute], scope) -> str:
+    """Path template of the route serving ``scope`` (e.g. /api/v1/devices/{device_id}), keeping label values bounded."""
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "<unnamed>")
+        if match == Match.PARTIAL and partial is None:
+            partial = route  # Path matches but the method does not (405)
+    return getattr(partial, "path", "<unmatched>")
+
+
+def render_metrics() -> str:
+    """Every worker's series on this host, each labelled with its worker."""
+    others = metrics_spool.read_others() if metrics_spool.running else []
+    return REGISTRY.render(WORKER_ID, others)
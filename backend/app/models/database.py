@@ -1,5 +1,5 @@
 from ..database import Base
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -146,6 +146,69 @@ class Script(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+class ScriptFacet(Base):
+    __tablename__ = "script_facets"
+    # Normalized copy of Script.platforms and Script.category_name so script filters and the
+    # platform/category lists are index lookups instead of scans over JSON; see services/script_facets.py.
+    __table_args__ = (Index("ix_script_facets_script_id", "script_id"),)
+    facet = Column(String, primary_key=True)  # platform or category
+    value_key = Column(String, primary_key=True)  # Lowercased value, used for lookups
+    script_id = Column(String, ForeignKey("scripts.id"), primary_key=True)
+    value = Column(String, nullable=False)  # Value as reported by Pulseway, for display
+class BulkExecutionJob(Base):
+    __tablename__ = "bulk_execution_jobs"
+    # One POST /scripts/bulk-execute request, dispatched in the background by services/bulk_execution.py
+    id = Column(String, primary_key=True)  # uuid4 hex, returned to the client as job_id
+    script_id = Column(String, ForeignKey("scripts.id"), nullable=False)
+    variables = Column(JSON, nullable=True)
+    webhook_url = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, completed, interrupted
+    total = Column(Integer, nullable=False, default=0)
+    succeeded = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    unknown = Column(Integer, nullable=False, default=0)  # Dispatched when the server stopped, outcome not recorded
+    owner = Column(String, nullable=True)  # Worker dispatching the job (BulkExecutionRunner.worker_id)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Renewed by the owner; a stale lease means it died
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    items = relationship("BulkExecutionItem", back_populates="job", cascade="all, delete-orphan")
+class BulkExecutionItem(Base):
+    __tablename__ = "bulk_execution_items"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String, ForeignKey("bulk_execution_jobs.id"), nullable=False, index=True)
+    device_identifier = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, running, succeeded, failed, unknown
+    execution_id = Column(String, nullable=True)  # Pulseway ExecutionId when the run started
+    error = Column(Text, nullable=True)
+    status_code = Column(Integer, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    job = relationship("BulkExecutionJob", back_populates="items")
+class Execution(Base):
+    __tablename__ = "executions"
+    # Script, task and workflow runs: started by this backend, reported by Pulseway execution
+    # webhooks (api/webhooks.py) or read through the script execution endpoints
+    __table_args__ = (
+        UniqueConstraint("kind", "execution_id", "device_identifier", name="uq_executions_kind_execution_device"),
+        Index("ix_executions_entity_device", "kind", "entity_id", "device_identifier"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)  # script, task or workflow
+    execution_id = Column(String, nullable=False, index=True)
+    entity_id = Column(String, nullable=True)  # Script, task or workflow id
+    device_identifier = Column(String, nullable=False, default="")  # Empty for workflows run on a server
+    state = Column(String, nullable=True)  # Running, Successful, Failed or Stopped
+    payload = Column(JSON, nullable=True)  # Last webhook body as received
+    # Script execution details, cached by services/execution_cache.py
+    start_time = Column(DateTime(timezone=True), nullable=True)
+    end_time = Column(DateTime(timezone=True), nullable=True)
+    duration_in_seconds = Column(Float, nullable=True)
+    output = Column(Text, nullable=True)
+    exit_code = Column(String, nullable=True)
+    variable_outputs = Column(JSON, nullable=True)
+    details_fetched_at = Column(DateTime(timezone=True), nullable=True)  # Null until details were read from Pulseway
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 class Task(Base):
     __tablename__ = "tasks"
     id = Column(Integer, primary_key=True, index=True)
@@ -186,3 +249,76 @@ class APIKey(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ChangeLogEntry(Base):
+    __tablename__ = "change_log"
+    # AUTOINCREMENT keeps ids monotonic on SQLite even after old entries are pruned,
+    # which lets the id double as the change token handed out to clients. On PostgreSQL
+    # change_feed.record_change serializes writers so ids also commit in order.
+    __table_args__ = {"sqlite_autoincrement": True}
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity_type = Column(String, nullable=False, index=True)  # device, notification, script
+    entity_id = Column(String, nullable=False)
+    operation = Column(String, nullable=False, default="upsert")  # upsert or delete
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+class DeviceSearchDocument(Base):
+    __tablename__ = "device_search_documents"
+    # Denormalized text searched by GET /devices/search; see services/search_index.py.
+    # On SQLite an FTS5 table indexes these columns, on PostgreSQL a trigram index covers `document`.
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    device_identifier = Column(String, ForeignKey("devices.identifier"), unique=True, index=True, nullable=False)
+    name = Column(Text)
+    description = Column(Text)
+    ip_addresses = Column(Text)  # External, local and asset IPs, space separated
+    locations = Column(Text)  # Organization, site and group names
+    tags = Column(Text)  # Asset tags
+    document = Column(Text)  # All of the above, lowercased
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+class SyncRun(Base):
+    __tablename__ = "sync_runs"
+    # One DataSyncService.sync_all_data run, journaled by services/sync_journal.py; totals are summed from its stages
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    trigger = Column(String, nullable=False, default="scheduled")  # scheduled, startup or manual
+    status = Column(String, nullable=False, default="running", index=True)  # running, succeeded, failed, interrupted
+    started_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    rows_fetched = Column(Integer, nullable=False, default=0)
+    rows_created = Column(Integer, nullable=False, default=0)
+    rows_updated = Column(Integer, nullable=False, default=0)
+    rows_unchanged = Column(Integer, nullable=False, default=0)
+    rows_deleted = Column(Integer, nullable=False, default=0)
+    api_calls = Column(Integer, nullable=False, default=0)
+    api_errors = Column(Integer, nullable=False, default=0)
+    bytes_received = Column(Integer, nullable=False, default=0)
+    rate_limit_wait_seconds = Column(Float, nullable=False, default=0.0)
+    error = Column(Text, nullable=True)
+    stages = relationship("SyncRunStage", back_populates="run", cascade="all, delete-orphan",
+                          order_by="SyncRunStage.id")
+class SyncRunStage(Base):
+    __tablename__ = "sync_run_stages"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey("sync_runs.id"), nullable=False, index=True)
+    stage = Column(String, nullable=False)  # organizations, sites, ..., workflows
+    status = Column(String, nullable=False)  # succeeded or failed
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+    rows_fetched = Column(Integer, nullable=False, default=0)
+    rows_created = Column(Integer, nullable=False, default=0)
+    rows_updated = Column(Integer, nullable=False, default=0)
+    rows_unchanged = Column(Integer, nullable=False, default=0)
+    rows_deleted = Column(Integer, nullable=False, default=0)
+    api_calls = Column(Integer, nullable=False, default=0)
+    api_errors = Column(Integer, nullable=False, default=0)  # Failed Pulseway calls, including ones the stage recovered from
+    bytes_received = Column(Integer, nullable=False, default=0)
+    rate_limit_wait_seconds = Column(Float, nullable=False, default=0.0)
+    error = Column(Text, nullable=True)
+    run = relationship("SyncRun", back_populates="stages")
+class EventBusPayload(Base):
+    __tablename__ = "event_bus_payloads"
+    # Events too large for a PostgreSQL NOTIFY: the other workers are notified of the id and read the row
+    # (services/event_bus.py). Rows are deleted after POSTGRES_PAYLOAD_RETENTION_SECONDS.
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
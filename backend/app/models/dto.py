@@ -1,5 +1,5 @@
 # backend/app/models/dto.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, TYPE_CHECKING, Dict, Any # Added Any
 from datetime import datetime
 
@@ -10,7 +10,7 @@ if TYPE_CHECKING:
     from .database import Notification as NotificationModel # For TYPE_CHECKING
     from .database import DeviceAsset as DeviceAssetModel # For TYPE_CHECKING
 
-class DeviceFilters(BaseModel):
+class DeviceFilterCriteria(BaseModel):
     organization: Optional[str] = None
     site: Optional[str] = None
     group: Optional[str] = None
@@ -18,6 +18,8 @@ class DeviceFilters(BaseModel):
     offline_only: Optional[bool] = None
     has_alerts: Optional[bool] = None
     computer_type: Optional[str] = None
+
+class DeviceFilters(DeviceFilterCriteria):
     limit: int = 100
     offset: int = 0
 
@@ -64,6 +66,24 @@ class DeviceDTO(BaseModel):
             firewall_enabled=getattr(device, 'firewall_enabled', None)
         )
 
+    @staticmethod
+    def row_to_dict(row) -> Dict[str, Any]:
+        """Maps a row selected with DEVICE_SUMMARY_FIELDS to a JSON-ready dict.
+
+        Used by list endpoints returning FastJSONResponse, where building a model per row
+        and re-validating it dominates the response time.
+        """
+        data = dict(zip(DEVICE_SUMMARY_FIELDS, row))
+        # Mirror the DTO's required fields for rows synced before the defaults existed
+        data["is_online"] = bool(data["is_online"])
+        data["is_agent_installed"] = bool(data["is_agent_installed"])
+        data["critical_notifications"] = data["critical_notifications"] or 0
+        data["elevated_notifications"] = data["elevated_notifications"] or 0
+        return data
+
+# Device columns needed for a DeviceDTO, in field order
+DEVICE_SUMMARY_FIELDS = tuple(DeviceDTO.model_fields)
+
 class DeviceStatsDTO(BaseModel):
     total_devices: int
     online_devices: int
@@ -146,13 +166,51 @@ class DeviceDetailDTO(BaseModel):
             updates=device.updates
         )
 
+    @staticmethod
+    def row_to_dict(row, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Maps a row selected with ``fields`` (default DEVICE_DETAIL_FIELDS) to a JSON-ready dict."""
+        data = dict(zip(fields or DEVICE_DETAIL_FIELDS, row))
+        # Mirror the DTO's required fields for rows synced before the defaults existed
+        for field in ("is_online", "is_agent_installed", "in_maintenance"):
+            if field in data:
+                data[field] = bool(data[field])
+        for field in ("critical_notifications", "elevated_notifications", "normal_notifications", "low_notifications"):
+            if field in data:
+                data[field] = data[field] or 0
+        return data
+
+# Device columns needed for a DeviceDetailDTO, in field order
+DEVICE_DETAIL_FIELDS = tuple(DeviceDetailDTO.model_fields)
+
+# Upper bound on identifiers per batch lookup, well below database bound-parameter limits
+DEVICE_BATCH_MAX_IDENTIFIERS = 500
+
+class DeviceBatchRequest(BaseModel):
+    identifiers: List[str] = Field(..., min_length=1, max_length=DEVICE_BATCH_MAX_IDENTIFIERS)
+    fields: Optional[List[str]] = None # DeviceDetailDTO field names; all fields when omitted
+
+    @field_validator("fields")
+    @classmethod
+    def validate_fields(cls, fields: Optional[List[str]]) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        unknown = [f for f in fields if f not in DEVICE_DETAIL_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown device fields: {', '.join(unknown)}")
+        # identifier is always returned so results can be matched to the request
+        return ["identifier"] + [f for f in dict.fromkeys(fields) if f != "identifier"]
+
+class DeviceBatchResponse(BaseModel):
+    devices: List[Dict[str, Any]] # DeviceDetailDTO objects, restricted to the requested fields
+    missing: List[str] = []
+
 class NotificationDTO(BaseModel):
-    id: str # Corrected to str based on model
+    id: int
     message: str
     datetime: Optional[datetime] = None
     priority: str
     read: bool
-    device_identifier: str # Added from model
+    device_identifier: Optional[str] = None # Sync does not always link notifications to a device
 
     class Config:
         from_attributes = True
@@ -168,6 +226,26 @@ class NotificationDTO(BaseModel):
             device_identifier=notification.device_identifier
         )
 
+class NotificationFeedItemDTO(BaseModel):
+    """Row of the recent activity and unread notification feeds: a notification with its device's name."""
+    id: int
+    message: Optional[str] = None
+    datetime: Optional[datetime] = None
+    priority: Optional[str] = None
+    read: bool = False
+    device_identifier: Optional[str] = None
+    device_name: Optional[str] = None
+
+    @staticmethod
+    def row_to_dict(row) -> Dict[str, Any]:
+        """Maps a row selected with NOTIFICATION_FEED_FIELDS to a JSON-ready dict."""
+        data = dict(zip(NOTIFICATION_FEED_FIELDS, row))
+        data["read"] = bool(data["read"])
+        return data
+
+# Columns selected for a NotificationFeedItemDTO, in field order (device_name comes from the joined device)
+NOTIFICATION_FEED_FIELDS = tuple(NotificationFeedItemDTO.model_fields)
+
 class DeviceAssetDTO(BaseModel):
     device_identifier: str
     tags: Optional[List[str]] = None
@@ -193,3 +271,154 @@ class DeviceAssetDTO(BaseModel):
             installed_software=asset.installed_software,
             updated_at=asset.updated_at
         )
+
+class ScriptSummary(BaseModel):
+    id: str
+    name: str
+    description: Optional[str]
+    category_name: Optional[str]
+    platforms: Optional[List[str]]
+    created_by: Optional[str]
+    is_built_in: bool
+
+    class Config:
+        from_attributes = True
+
+class ScriptDetail(ScriptSummary):
+    category_id: Optional[int]
+    input_variables: Optional[List[Dict]]
+    output_variables: Optional[List[Dict]]
+    script_items: Optional[List[Dict]]
+
+    class Config:
+        from_attributes = True
+
+class BulkExecutionItemDTO(BaseModel):
+    device_identifier: str
+    status: str # pending, running, succeeded, failed or unknown (dispatched when the server stopped)
+    execution_id: Optional[str] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class BulkExecutionJobDTO(BaseModel):
+    job_id: str
+    script_id: str
+    status: str # queued, running, completed or interrupted
+    total: int
+    pending: int
+    succeeded: int
+    failed: int
+    unknown: int = 0 # Dispatched when the server stopped; the script may have run
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    items: Optional[List[BulkExecutionItemDTO]] = None # Only when requested
+
+class JobExecutionDTO(BaseModel):
+    device_identifier: str
+    dispatch_status: str # pending, running, succeeded, failed or unknown (see BulkExecutionItemDTO)
+    execution_id: Optional[str] = None
+    state: str # Running, Successful, Failed, Stopped; Pending, Dispatching, NotStarted or Unknown before a run exists
+    stale: bool = False # Running, and not re-read from Pulseway within EXECUTION_CACHE_TTL_SECONDS
+    error: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    duration_in_seconds: Optional[float] = None
+    exit_code: Optional[str] = None
+
+class JobExecutionsDTO(BaseModel):
+    job_id: str
+    script_id: str
+    states: Dict[str, int] # Device count per state
+    executions: List[JobExecutionDTO]
+
+class AutomationRunRequest(BaseModel):
+    targets: DeviceFilterCriteria = DeviceFilterCriteria() # Resolved server-side, same semantics as GET /devices
+    device_identifiers: Optional[List[str]] = None # Explicit targets, intersected with the filter when both are given
+    webhook_url: Optional[str] = None
+    dry_run: bool = False # Resolve and return the targets without running anything
+
+class WorkflowRunRequest(AutomationRunRequest):
+    variable_overrides: Optional[List[Dict[str, Any]]] = None # Sent as ConstantVariableOverrides
+
+class AutomationRunChunkDTO(BaseModel):
+    index: int
+    device_count: int
+    status: str # submitted or failed
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    response: Optional[Any] = None # Pulseway's Data for the chunk
+
+class AutomationRunDTO(BaseModel):
+    kind: str # task or workflow
+    entity_id: str
+    dry_run: bool = False
+    targeted: int
+    submitted: int
+    failed: int
+    device_identifiers: List[str]
+    chunks: List[AutomationRunChunkDTO] = []
+
+class EntityChangesDTO(BaseModel):
+    upserted: List[Dict[str, Any]] = []
+    deleted: List[str] = []
+
+class ChangeFeedDTO(BaseModel):
+    token: str # Opaque to clients; pass back as ?since= on the next call
+    reset: bool = False # True when the client must discard its store and reload in full
+    has_more: bool = False
+    devices: EntityChangesDTO = EntityChangesDTO()
+    notifications: EntityChangesDTO = EntityChangesDTO()
+    scripts: EntityChangesDTO = EntityChangesDTO()
+
+class SuggestionDTO(BaseModel):
+    type: str # device, script, organization, site, group or ip
+    id: str # For ip suggestions, the identifier of the device owning the address
+    label: str
+    match: str # The indexed text that matched the query
+
+class SyncRunStageDTO(BaseModel):
+    stage: str # organizations, sites, groups, devices, device_assets, notifications, scripts, tasks, workflows
+    status: str # succeeded or failed
+    started_at: datetime
+    finished_at: datetime
+    duration_seconds: float
+    rows_fetched: int = 0
+    rows_created: int = 0
+    rows_updated: int = 0
+    rows_unchanged: int = 0
+    rows_deleted: int = 0
+    api_calls: int = 0
+    api_errors: int = 0
+    bytes_received: int = 0
+    rate_limit_wait_seconds: float = 0.0
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class SyncRunDTO(BaseModel):
+    id: int
+    trigger: str # scheduled, startup or manual
+    status: str # running, succeeded, failed or interrupted
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    rows_fetched: int = 0
+    rows_created: int = 0
+    rows_updated: int = 0
+    rows_unchanged: int = 0
+    rows_deleted: int = 0
+    api_calls: int = 0
+    api_errors: int = 0
+    bytes_received: int = 0
+    rate_limit_wait_seconds: float = 0.0
+    error: Optional[str] = None
+    stages: Optional[List[SyncRunStageDTO]] = None # Only when requested
+
+    class Config:
+        from_attributes = True
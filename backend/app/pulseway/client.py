@@ -5,9 +5,13 @@ from typing import Optional, Dict, Any, List
 import logging
 from datetime import datetime
 import time
+import threading
+from contextvars import ContextVar
 import pybreaker # Added
 # Import new base exceptions
 from app.exceptions import ExternalAPIError, AuthenticationError, NotFoundError
+from ..metrics import CallbackGauge, Counter, Histogram
+from ..tracing import trace_span
 
 logger = logging.getLogger(__name__) # structlog will find this logger
 
@@ -15,6 +19,50 @@ logger = logging.getLogger(__name__) # structlog will find this logger
 # Opens after 5 consecutive failures, resets after 60 seconds.
 pulseway_api_breaker = pybreaker.CircuitBreaker(fail_max=5, reset_timeout=60)
 
+BREAKER_STATES = (pybreaker.STATE_CLOSED, pybreaker.STATE_OPEN, pybreaker.STATE_HALF_OPEN)
+
+# Metrics; endpoints are labelled by template (see _endpoint_label)
+PULSEWAY_REQUEST_DURATION = Histogram(
+    "pulseway_request_duration_seconds", "Pulseway API call latency, including the rate limiter wait.",
+    ("method", "endpoint", "status"))
+PULSEWAY_RATE_LIMIT_WAIT = Histogram(
+    "pulseway_rate_limit_wait_seconds", "Time Pulseway API calls waited for a rate limiter slot.",
+    buckets=(0, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+PULSEWAY_BREAKER_REJECTIONS = Counter(
+    "pulseway_circuit_breaker_rejections_total", "Pulseway API calls refused while the circuit breaker was open.")
+CallbackGauge(
+    "pulseway_circuit_breaker_state", "1 for the current state of the Pulseway API circuit breaker.", ("state",),
+    lambda: [((state,), int(pulseway_api_breaker.current_state == state)) for state in BREAKER_STATES])
+CallbackGauge(
+    "pulseway_circuit_breaker_failures", "Consecutive failures counted by the Pulseway API circuit breaker.", (),
+    lambda: [((), pulseway_api_breaker.fail_counter)])
+
+
+class ApiCallStats:
+    """Pulseway API usage of one unit of work, e.g. a sync stage (see api_call_stats)"""
+    __slots__ = ("calls", "errors", "bytes_received", "rate_limit_wait")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.rate_limit_wait = 0.0
+
+# Calls made while this is set are added to it; executor threads see it through the copied context
+api_call_stats: ContextVar[Optional[ApiCallStats]] = ContextVar("pulseway_api_call_stats", default=None)
+
+# Path segments of the Pulseway endpoints we call; anything else is an identifier
+_ENDPOINT_WORDS = {
+    "devices", "notifications", "assets", "customfields", "antivirus", "organizations", "sites", "groups",
+    "automation", "scripts", "device", "executions", "run", "tasks", "workflows", "environment"
+}
+
+
+def _endpoint_label(endpoint: str) -> str:
+    """'devices/abc/notifications' -> 'devices/{id}/notifications'"""
+    return "/".join(segment if segment in _ENDPOINT_WORDS else "{id}"
+                    for segment in endpoint.strip("/").split("/"))
+
 # Custom Exception Classes mapped to new hierarchy
 class PulsewayClientError(ExternalAPIError): # Inherits from ExternalAPIError now
     """Base exception for Pulseway client errors. Typically network or non-HTTP errors."""
@@ -55,17 +103,24 @@ class PulsewayClient:
             'Accept': 'application/json'
         })
         
-        # Rate limiting
+        # Rate limiting, shared by every thread using this client (e.g. bulk script dispatch)
         self.last_request_time = 0
         self.min_request_interval = 0.1  # 100ms between requests
+        self._rate_limit_lock = threading.Lock()
     
     def _rate_limit(self):
-        """Simple rate limiting"""
-        now = time.time()
-        elapsed = now - self.last_request_time
-        if elapsed < self.min_request_interval:
-            time.sleep(self.min_request_interval - elapsed)
-        self.last_request_time = time.time()
+        """Spaces requests min_request_interval apart across threads"""
+        with self._rate_limit_lock:
+            # Reserve the next free slot, then wait for it outside the lock
+            now = time.time()
+            slot = max(now, self.last_request_time + self.min_request_interval)
+            self.last_request_time = slot
+        PULSEWAY_RATE_LIMIT_WAIT.observe(slot - now)
+        stats = api_call_stats.get()
+        if stats is not None:
+            stats.rate_limit_wait += slot - now
+        if slot > now:
+            time.sleep(slot - now)
     
     @pulseway_api_breaker # Decorate the method with the circuit breaker
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
@@ -76,6 +131,9 @@ class PulsewayClient:
             url = f"{self.base_url}/{endpoint.lstrip('/')}"
 
             response = self.session.request(method, url, **kwargs)
+            stats = api_call_stats.get()
+            if stats is not None:
+                stats.bytes_received += len(response.content)
 
             # Use status_code from the response for our custom exceptions
             # These specific errors (400,401,403,404) might not always be counted as "failures"
@@ -132,11 +190,28 @@ class PulsewayClient:
 
     def _call_make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         """Helper to wrap calls to _make_request to handle CircuitBreakerError from the decorator."""
+        status = "error"  # Network failures and malformed responses
+        started = time.perf_counter()
         try:
-            return self._make_request(method, endpoint, **kwargs)
+            with trace_span("http.client", f"pulseway {method} {_endpoint_label(endpoint)}"):
+                result = self._make_request(method, endpoint, **kwargs)
+            status = "2xx"
+            return result
         except pybreaker.CircuitBreakerError as e:
+            status = "circuit_open"
+            PULSEWAY_BREAKER_REJECTIONS.inc()
             logger.error(f"Circuit breaker open for Pulseway API (prevented call): {e}. Method: {method}, Endpoint: {endpoint}")
             raise PulsewayClientError(detail=f"Pulseway API is temporarily unavailable (circuit breaker open): {e}", status_code=503) from e
+        except (PulsewayAPIError, PulsewayAuthenticationError, PulsewayPermissionError, PulsewayNotFoundError) as e:
+            status = str(e.status_code)
+            raise
+        finally:
+            PULSEWAY_REQUEST_DURATION.labels(method, _endpoint_label(endpoint), status).observe(
+                time.perf_counter() - started)
+            stats = api_call_stats.get()
+            if stats is not None:
+                stats.calls += 1
+                stats.errors += status != "2xx"
 
     def get(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
         """GET request"""
@@ -0,0 +1,54 @@
+"""
+Fast JSON responses for large list endpoints
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+def json_default(obj: Any) -> Any:
+    """Encodes the types our DTO dicts contain that the stdlib encoder does not handle."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (UUID, Decimal)):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serializes content to UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_text(content: Any) -> str:
+    """Same as dumps() but returns str, e.g. for WebSocket.send_text()."""
+    return dumps(content).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that serializes plain dicts/lists directly.
+
+    Opt-in per endpoint: return ``FastJSONResponse(rows)`` from a route to bypass
+    FastAPI's response_model validation and jsonable_encoder pass. The content must
+    already have the response model's shape (e.g. DeviceDTO.row_to_dict output).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
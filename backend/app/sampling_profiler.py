@@ -0,0 +1,200 @@
+"""
+On-demand sampling profiler
+
+A background thread snapshots the Python stack of every thread in the process
+every PROFILER_SAMPLE_INTERVAL_MS milliseconds (sys._current_frames), so it
+can be switched on in a running worker without redeploying and costs nothing
+while it is off. It measures wall-clock time: a thread waiting on the
+Pulseway API or on SQLite shows up in the frame that is waiting. Threads that
+are only idling (the event loop waiting for I/O, idle executor workers, queue
+consumers) are left out unless ``include_idle`` is set.
+
+Profiles are returned as collapsed stacks (one ``thread;frame;frame count``
+line per stack, for flamegraph.pl / speedscope / inferno) or as speedscope
+JSON with one profile per thread (open it at https://www.speedscope.app).
+
+Only one profile is captured at a time per worker.
+"""
+
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.responses import PlainTextResponse, Response
+
+from .exceptions import BusinessLogicError
+from .responses import FastJSONResponse
+
+SAMPLE_INTERVAL_MS = float(os.getenv("PROFILER_SAMPLE_INTERVAL_MS", "5"))
+MAX_PROFILE_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILE_FORMATS = ("speedscope", "collapsed")
+
+# Leaf frames of threads that are waiting for work rather than doing it
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),  # ThreadPoolExecutor worker blocked on its queue
+}
+
+_capture_lock = threading.Lock()
+# Frame file names are shown relative to these directories
+_PATH_PREFIXES = (
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep,  # backend/
+    sysconfig.get_paths()["stdlib"] + os.sep,
+)
+
+
+class ProfilerBusyError(BusinessLogicError):
+    def __init__(self, detail: str = "A profile is already being captured in this worker.", status_code: int = 409):
+        super().__init__(detail, status_code)
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to site-packages, the backend directory or the stdlib, to keep frame names readable."""
+    marker = "site-packages" + os.sep
+    index = filename.rfind(marker)
+    if index >= 0:
+        return filename[index + len(marker):]
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+class Profile:
+    """Sampled stacks, counted per (thread name, stack of frame indices)."""
+
+    def __init__(self, stacks: Counter, frames: List[Tuple[str, str, int]], interval_ms: float,
+                 samples: int, seconds: float):
+        self.stacks = stacks
+        self.frames = frames
+        self.interval_ms = interval_ms
+        self.samples = samples
+        self.seconds = seconds
+
+    def _frame_name(self, index: int) -> str:
+        name, path, line = self.frames[index]
+        return f"{name} ({path}:{line})"
+
+    def collapsed(self) -> str:
+        lines = [
+            ";".join([thread.replace(";", ":")] + [self._frame_name(index) for index in stack]) + f" {count}"
+            for (thread, stack), count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def speedscope(self, name: str = "profile") -> Dict[str, Any]:
+        by_thread: Dict[str, Dict[str, list]] = {}
+        for (thread, stack), count in self.stacks.most_common():
+            profile = by_thread.setdefault(thread, {"samples": [], "weights": []})
+            profile["samples"].append(list(stack))
+            profile["weights"].append(round(count * self.interval_ms, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "pulseway-backend",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": frame, "file": path, "line": line} for frame, path, line in self.frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": round(sum(profile["weights"]), 3),
+                    "samples": profile["samples"],
+                    "weights": profile["weights"],
+                }
+                for thread, profile in by_thread.items()
+            ],
+        }
+
+
+class SamplingProfiler:
+    """Samples every thread's stack from a background thread between start() and stop()."""
+
+    def __init__(self, interval_ms: float = SAMPLE_INTERVAL_MS, include_idle: bool = False):
+        self.interval_ms = max(1.0, interval_ms)
+        self.include_idle = include_idle
+        self._stacks: Counter = Counter()
+        self._frames: List[Tuple[str, str, int]] = []
+        self._frame_ids: Dict[Any, int] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._samples = 0
+        self._started = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.profile: Optional[Profile] = None
+
+    def start(self) -> None:
+        if not _capture_lock.acquire(blocking=False):
+            raise ProfilerBusyError()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        self._thread.join()
+        _capture_lock.release()
+        return Profile(self._stacks, self._frames, self.interval_ms, self._samples,
+                       time.perf_counter() - self._started)
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.profile = self.stop()
+
+    def _frame_id(self, code) -> int:
+        frame_id = self._frame_ids.get(code)
+        if frame_id is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            frame_id = self._frame_ids[code] = len(self._frames)
+            self._frames.append((name, _short_path(code.co_filename), code.co_firstlineno))
+        return frame_id
+
+    def _thread_name(self, ident: int) -> str:
+        name = self._thread_names.get(ident)
+        if name is None:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._thread_names.setdefault(ident, f"thread-{ident}")
+        return name
+
+    def _sample(self) -> None:
+        own_ident = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            leaf = frame.f_code
+            if not self.include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self._stacks[(self._thread_name(ident), tuple(stack))] += 1
+        self._samples += 1
+
+    def _run(self) -> None:
+        interval = self.interval_ms / 1000
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            self._sample()
+            next_sample += interval
+            # Skip missed ticks instead of sampling in a burst to catch up
+            next_sample = max(next_sample, time.perf_counter())
+            self._stop.wait(next_sample - time.perf_counter())
+
+
+def profile_response(profile: Profile, output_format: str, name: str) -> Response:
+    headers = {"X-Profile-Samples": str(profile.samples), "X-Profile-Seconds": f"{profile.seconds:.3f}"}
+    if output_format == "collapsed":
+        return PlainTextResponse(profile.collapsed(), headers=headers)
+    return FastJSONResponse(profile.speedscope(name), headers=headers)
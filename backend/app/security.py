@@ -1,3 +1,4 @@
+import os
 import secrets
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -57,3 +58,17 @@ async def get_current_active_api_key(
         status_code=status.HTTP_403_FORBIDDEN,
         detail="Invalid API Key or key is not active"
     )
+
+# Admin-only endpoints (profiling) additionally need X-Admin-Key to match ADMIN_API_KEY; unset disables them
+admin_key_header_scheme = APIKeyHeader(name="X-Admin-Key", auto_error=False)
+
+def is_admin_key(admin_key: str) -> bool:
+    expected = os.getenv("ADMIN_API_KEY")
+    return bool(expected and admin_key and secrets.compare_digest(admin_key.encode(), expected.encode()))
+
+async def verify_admin_key(admin_key: str = Depends(admin_key_header_scheme)):
+    if not is_admin_key(admin_key):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin key required"
+        )
@@ -0,0 +1,138 @@
+# backend/app/services/automation_runs.py
+"""
+Fleet-scoped task and workflow runs.
+
+PulsewayClient.run_task and run_workflow take a list of DeviceIdentifiers, so a
+run over many devices is a handful of requests rather than one per device. The
+targets are resolved locally from DeviceFilterCriteria with a single query that
+selects only the identifier column, split into chunks of at most
+PULSEWAY_RUN_BATCH_SIZE identifiers (Pulseway rejects oversized bodies), and the
+chunks are posted on a small thread pool. Every request still goes through the
+client's shared rate limiter.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from ..models.database import Device
+from ..models.dto import DeviceFilterCriteria
+from ..pulseway.client import (
+    PulsewayAPIError, PulsewayAuthenticationError, PulsewayClient, PulsewayClientError,
+    PulsewayNotFoundError, PulsewayPermissionError
+)
+from .device_service import apply_device_filters
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = int(os.getenv("PULSEWAY_RUN_BATCH_SIZE", "100"))
+DEFAULT_CONCURRENCY = int(os.getenv("AUTOMATION_RUN_CONCURRENCY", "4"))
+
+# Errors the client raises for a failed call; each carries detail and status_code
+_PULSEWAY_ERRORS = (
+    PulsewayClientError, PulsewayAPIError, PulsewayAuthenticationError,
+    PulsewayPermissionError, PulsewayNotFoundError
+)
+
+CHUNK_SUBMITTED = "submitted"
+CHUNK_FAILED = "failed"
+
+
+def has_target_filter(criteria: DeviceFilterCriteria) -> bool:
+    """Whether apply_device_filters would apply any criterion; an empty filter would match the whole fleet.
+
+    online_only and offline_only filter whenever they are given (False selects offline or
+    online devices); the string criteria and has_alerts only when truthy.
+    """
+    return bool(
+        criteria.organization or criteria.site or criteria.group or criteria.computer_type
+        or criteria.has_alerts
+        or criteria.online_only is not None or criteria.offline_only is not None
+    )
+
+
+def resolve_target_devices(db: Session, criteria: DeviceFilterCriteria,
+                           device_identifiers: Optional[List[str]] = None) -> List[str]:
+    """Identifiers of the devices matching ``criteria`` (same semantics as GET /devices).
+
+    When ``device_identifiers`` is given, only those devices are considered.
+    """
+    query = apply_device_filters(db.query(Device.identifier), criteria)
+    if device_identifiers is not None:
+        query = query.filter(Device.identifier.in_(set(device_identifiers)))
+    return [identifier for (identifier,) in query.order_by(Device.identifier)]
+
+
+def chunked(identifiers: List[str], size: int) -> List[List[str]]:
+    size = max(1, size)
+    return [identifiers[start:start + size] for start in range(0, len(identifiers), size)]
+
+
+def _submit_chunk(run: Callable[[List[str]], Dict[str, Any]], index: int,
+                  device_ids: List[str]) -> Dict[str, Any]:
+    """Posts one chunk on a worker thread and returns an AutomationRunChunkDTO dict."""
+    result = {"index": index, "device_count": len(device_ids), "status": CHUNK_SUBMITTED}
+    try:
+        response = run(device_ids) or {}
+        result["response"] = response.get('Data')
+    except _PULSEWAY_ERRORS as e:
+        result.update(status=CHUNK_FAILED, error=e.detail, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Unexpected error submitting run chunk {index}: {e}", exc_info=True)
+        result.update(status=CHUNK_FAILED, error=f"Unexpected error: {str(e)}")
+    return result
+
+
+def submit_in_chunks(run: Callable[[List[str]], Dict[str, Any]], device_ids: List[str],
+                     batch_size: Optional[int] = None,
+                     concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Calls ``run`` once per chunk of ``device_ids``, up to ``concurrency`` at a time.
+
+    Blocking; results are returned in chunk order.
+    """
+    chunks = chunked(device_ids, batch_size or DEFAULT_BATCH_SIZE)
+    if not chunks:
+        return []
+    concurrency = concurrency or DEFAULT_CONCURRENCY
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(chunks))),
+                            thread_name_prefix="automation-run") as executor:
+        futures = [executor.submit(_submit_chunk, run, index, chunk) for index, chunk in enumerate(chunks)]
+        return [future.result() for future in futures]
+
+
+def run_task_on_devices(client: PulsewayClient, task_id: str, device_ids: List[str],
+                        webhook_url: Optional[str] = None,
+                        batch_size: Optional[int] = None,
+                        concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    return submit_in_chunks(
+        lambda chunk: client.run_task(task_id, device_ids=chunk, webhook_url=webhook_url),
+        device_ids, batch_size=batch_size, concurrency=concurrency
+    )
+
+
+def run_workflow_on_devices(client: PulsewayClient, workflow_id: str, device_ids: List[str],
+                            webhook_url: Optional[str] = None,
+                            variable_overrides: Optional[List[Dict[str, Any]]] = None,
+                            batch_size: Optional[int] = None,
+                            concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    return submit_in_chunks(
+        lambda chunk: client.run_workflow(workflow_id, device_ids=chunk, webhook_url=webhook_url,
+                                          variable_overrides=variable_overrides),
+        device_ids, batch_size=batch_size, concurrency=concurrency
+    )
+
+
+def summarize_run(kind: str, entity_id: str, device_ids: List[str],
+                  chunks: List[Dict[str, Any]], dry_run: bool = False) -> Dict[str, Any]:
+    """AutomationRunDTO dict for a (possibly dry) run."""
+    submitted = sum(chunk["device_count"] for chunk in chunks if chunk["status"] == CHUNK_SUBMITTED)
+    return {
+        "kind": kind,
+        "entity_id": entity_id,
+        "dry_run": dry_run,
+        "targeted": len(device_ids),
+        "submitted": submitted,
+        "failed": sum(chunk["device_count"] for chunk in chunks if chunk["status"] == CHUNK_FAILED),
+        "device_identifiers": device_ids,
+        "chunks": chunks,
+    }
@@ -0,0 +1,442 @@
+# backend/app/services/bulk_execution.py
+"""
+Background dispatch for POST /scripts/bulk-execute.
+
+The endpoint only validates the request and persists a job with one item per
+device; BulkExecutionRunner then calls PulsewayClient.run_script for each item
+on a small thread pool, so at most ``concurrency`` runs are in flight and the
+client's shared rate limiter spaces the requests. The worker commits the item as
+running before calling Pulseway and commits its result as it arrives, which is
+what GET /scripts/jobs/{job_id} reports.
+
+Each job is owned by the worker dispatching it, which renews a lease
+(heartbeat_at) while it runs. With several workers, a job is only closed as
+interrupted once its lease has expired, i.e. its worker died or shut down:
+items left running are then reported as unknown (the script may or may not
+have started on the device).
+"""
+import asyncio
+import functools
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.database import BulkExecutionItem, BulkExecutionJob, Execution
+from .execution_cache import RUNNING, execution_cache, record_started_executions
+from ..pulseway.client import (
+    PulsewayAPIError, PulsewayAuthenticationError, PulsewayClient, PulsewayClientError,
+    PulsewayNotFoundError, PulsewayPermissionError
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = int(os.getenv("BULK_EXECUTION_CONCURRENCY", "8"))
+JOB_LEASE_SECONDS = float(os.getenv("BULK_JOB_LEASE_SECONDS", "120"))
+# Running executions re-read from Pulseway per GET /scripts/jobs/{job_id}/executions
+JOB_EXECUTIONS_REFRESH_LIMIT = int(os.getenv("JOB_EXECUTIONS_REFRESH_LIMIT", "20"))
+
+# Errors the client raises for a failed call; each carries detail and status_code
+_PULSEWAY_ERRORS = (
+    PulsewayClientError, PulsewayAPIError, PulsewayAuthenticationError,
+    PulsewayPermissionError, PulsewayNotFoundError
+)
+
+ITEM_PENDING = "pending"
+ITEM_RUNNING = "running"
+ITEM_SUCCEEDED = "succeeded"
+ITEM_FAILED = "failed"
+ITEM_UNKNOWN = "unknown"
+ITEM_STATUSES = (ITEM_PENDING, ITEM_RUNNING, ITEM_SUCCEEDED, ITEM_FAILED, ITEM_UNKNOWN)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_INTERRUPTED = "interrupted"
+
+
+def create_bulk_job(db: Session, script_id: str, device_identifiers: List[str],
+                    variables: Optional[List[Dict[str, Any]]] = None,
+                    webhook_url: Optional[str] = None, owner: Optional[str] = None) -> BulkExecutionJob:
+    """Persists a queued job with one pending item per (distinct) device and commits.
+
+    The job's lease starts now, so it is not taken for abandoned before ``owner`` runs it.
+    """
+    identifiers = list(dict.fromkeys(device_identifiers))
+    job = BulkExecutionJob(
+        id=uuid.uuid4().hex,
+        script_id=script_id,
+        variables=variables,
+        webhook_url=webhook_url,
+        status=JOB_QUEUED,
+        total=len(identifiers),
+        succeeded=0,
+        failed=0,
+        unknown=0,
+        owner=owner,
+        heartbeat_at=datetime.now(timezone.utc),
+    )
+    db.add(job)
+    db.flush()
+    db.bulk_insert_mappings(BulkExecutionItem, [
+        {"job_id": job.id, "device_identifier": identifier, "status": ITEM_PENDING}
+        for identifier in identifiers
+    ])
+    db.commit()
+    return job
+
+
+def get_job_status(db: Session, job_id: str, include_items: bool = False,
+                   item_status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Returns the job summary (and optionally its items) as a BulkExecutionJobDTO dict, or None."""
+    job = db.query(BulkExecutionJob).filter(BulkExecutionJob.id == job_id).first()
+    if job is None:
+        return None
+    status = {
+        "job_id": job.id,
+        "script_id": job.script_id,
+        "status": job.status,
+        "total": job.total,
+        "pending": job.total - job.succeeded - job.failed - job.unknown,
+        "succeeded": job.succeeded,
+        "failed": job.failed,
+        "unknown": job.unknown,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if include_items:
+        query = db.query(BulkExecutionItem).filter(BulkExecutionItem.job_id == job_id)
+        if item_status:
+            query = query.filter(BulkExecutionItem.status == item_status)
+        status["items"] = query.order_by(BulkExecutionItem.id).all()
+    return status
+
+
+def _job_execution_join():
+    return and_(
+        Execution.kind == "script",
+        Execution.execution_id == BulkExecutionItem.execution_id,
+        Execution.device_identifier == BulkExecutionItem.device_identifier
+    )
+
+
+def _is_stale_running(state: Optional[str], details_fetched_at: Optional[datetime], stale_before: datetime) -> bool:
+    if state != RUNNING:
+        return False
+    if details_fetched_at is None:
+        return True
+    if details_fetched_at.tzinfo is None:  # SQLite hands back naive UTC datetimes
+        details_fetched_at = details_fetched_at.replace(tzinfo=timezone.utc)
+    return details_fetched_at < stale_before
+
+
+def refresh_job_executions(db: Session, client: PulsewayClient, job_id: str, limit: Optional[int] = None) -> int:
+    """Re-reads the job's Running executions whose cached details are older than the cache TTL.
+
+    Blocking. At most ``limit`` (JOB_EXECUTIONS_REFRESH_LIMIT) are read per call, those
+    read longest ago first, so a large job catches up over a few polls instead of
+    spending one request per device on each. Returns the number refreshed.
+    """
+    job = db.query(BulkExecutionJob.script_id).filter(BulkExecutionJob.id == job_id).first()
+    if job is None:
+        return 0
+    stale_before = execution_cache.stale_before()
+    candidates = db.query(
+        BulkExecutionItem.device_identifier, BulkExecutionItem.execution_id, Execution.state,
+        Execution.details_fetched_at
+    ).join(Execution, _job_execution_join()).filter(
+        BulkExecutionItem.job_id == job_id,
+        Execution.state == RUNNING
+    ).all()
+    stale = sorted(
+        (row for row in candidates if _is_stale_running(row.state, row.details_fetched_at, stale_before)),
+        key=lambda row: (row.details_fetched_at is not None, row.details_fetched_at or stale_before)
+    )[:limit or JOB_EXECUTIONS_REFRESH_LIMIT]
+    return execution_cache.refresh_script_execution_details(
+        db, client, job.script_id, [(row.device_identifier, row.execution_id) for row in stale]
+    )
+
+
+def get_job_executions(db: Session, job_id: str) -> List[Dict[str, Any]]:
+    """Per-device dispatch result and execution state of a job, in one query.
+
+    The state comes from the local executions table (webhooks, cached detail reads,
+    refresh_job_executions); ``stale`` flags Running rows not re-read within the
+    cache TTL. Devices whose run never started report their dispatch status instead.
+    """
+    rows = db.query(
+        BulkExecutionItem.device_identifier, BulkExecutionItem.status, BulkExecutionItem.execution_id,
+        BulkExecutionItem.error, Execution.state, Execution.start_time, Execution.end_time,
+        Execution.duration_in_seconds, Execution.exit_code, Execution.details_fetched_at
+    ).outerjoin(Execution, _job_execution_join()).filter(
+        BulkExecutionItem.job_id == job_id
+    ).order_by(BulkExecutionItem.id).all()
+
+    stale_before = execution_cache.stale_before()
+    return [
+        {
+            "device_identifier": row.device_identifier,
+            "dispatch_status": row.status,
+            "execution_id": row.execution_id,
+            "state": row.state or {ITEM_PENDING: "Pending", ITEM_RUNNING: "Dispatching",
+                                   ITEM_FAILED: "NotStarted"}.get(row.status, "Unknown"),
+            "stale": _is_stale_running(row.state, row.details_fetched_at, stale_before),
+            "error": row.error,
+            "start_time": row.start_time,
+            "end_time": row.end_time,
+            "duration_in_seconds": row.duration_in_seconds,
+            "exit_code": row.exit_code,
+        }
+        for row in rows
+    ]
+
+
+def mark_interrupted_jobs(db: Session, lease_seconds: float = JOB_LEASE_SECONDS) -> int:
+    """Closes the queued/running jobs whose owner stopped renewing their lease.
+
+    Items never dispatched are failed. Items dispatched without a recorded result
+    are marked unknown: the run request may or may not have reached Pulseway.
+    Jobs are not resumed automatically: re-running a script on devices that may
+    already have received it is the operator's call. Jobs still dispatching on a
+    live worker are left alone.
+    """
+    now = datetime.now(timezone.utc)
+    jobs = db.query(BulkExecutionJob).filter(
+        BulkExecutionJob.status.in_((JOB_QUEUED, JOB_RUNNING)),
+        or_(BulkExecutionJob.heartbeat_at.is_(None),
+            BulkExecutionJob.heartbeat_at < now - timedelta(seconds=lease_seconds))
+    ).all()
+    for job in jobs:
+        not_dispatched = db.query(BulkExecutionItem).filter(
+            BulkExecutionItem.job_id == job.id,
+            BulkExecutionItem.status == ITEM_PENDING
+        ).update({
+            BulkExecutionItem.status: ITEM_FAILED,
+            BulkExecutionItem.error: "Not dispatched: the worker running the job stopped",
+        }, synchronize_session=False)
+        in_flight = db.query(BulkExecutionItem).filter(
+            BulkExecutionItem.job_id == job.id,
+            BulkExecutionItem.status == ITEM_RUNNING
+        ).update({
+            BulkExecutionItem.status: ITEM_UNKNOWN,
+            BulkExecutionItem.error: "State unknown: the worker running the job stopped while the run was being "
+                                     "dispatched; the script may have run on the device",
+        }, synchronize_session=False)
+        job.failed += not_dispatched
+        job.unknown += in_flight
+        job.status = JOB_INTERRUPTED
+        job.finished_at = now
+        logger.warning(f"Bulk execution job {job.id} abandoned by worker {job.owner}: "
+                       f"{not_dispatched} items not dispatched, {in_flight} unknown.")
+    db.commit()
+    return len(jobs)
+
+
+def _run_script(client: PulsewayClient, script_id: str, device_id: str,
+                variables: Optional[List[Dict[str, Any]]], webhook_url: Optional[str]) -> Dict[str, Any]:
+    """Runs one item on a worker thread and returns the values to store on it."""
+    try:
+        response = client.run_script(
+            script_id=script_id,
+            device_id=device_id,
+            variables=variables,
+            webhook_url=webhook_url
+        )
+        execution_id = (response or {}).get('Data', {}).get('ExecutionId')
+        if execution_id:
+            return {"status": ITEM_SUCCEEDED, "execution_id": execution_id}
+        return {"status": ITEM_FAILED, "error": "No execution ID returned"}
+    except _PULSEWAY_ERRORS as e:
+        return {"status": ITEM_FAILED, "error": e.detail, "status_code": e.status_code}
+    except Exception as e:
+        logger.error(f"Unexpected error running script {script_id} on device {device_id}: {e}", exc_info=True)
+        return {"status": ITEM_FAILED, "error": f"Unexpected error: {str(e)}"}
+
+
+class BulkExecutionRunner:
+    """Runs bulk execution jobs as asyncio tasks on the application's event loop."""
+
+    def __init__(self, session_factory=SessionLocal, concurrency: int = DEFAULT_CONCURRENCY,
+                 lease_seconds: float = JOB_LEASE_SECONDS):
+        self.session_factory = session_factory
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        # Recorded as the owner of the jobs this process dispatches
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        # Worker threads write items one at a time, each with its own session
+        self._write_lock = threading.Lock()
+
+    def submit(self, job_id: str, client: PulsewayClient) -> asyncio.Task:
+        """Starts dispatching a queued job; must be called from the event loop."""
+        task = asyncio.get_running_loop().create_task(self.run(job_id, client))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bulk-exec")
+        return self._executor
+
+    def _write(self, write):
+        with self._write_lock:
+            db = self.session_factory()
+            try:
+                result = write(db)
+                db.commit()
+                return result
+            finally:
+                db.close()
+
+    @staticmethod
+    def _mark_running(db: Session, item_id: int) -> bool:
+        """Whether the item was still pending; it is not if its job was closed as interrupted meanwhile."""
+        return db.query(BulkExecutionItem).filter(
+            BulkExecutionItem.id == item_id,
+            BulkExecutionItem.status == ITEM_PENDING
+        ).update({BulkExecutionItem.status: ITEM_RUNNING}, synchronize_session=False) == 1
+
+    @staticmethod
+    def _record_result(db: Session, job_id: str, script_id: str, item_id: int, device_id: str,
+                       result: Dict[str, Any]) -> None:
+        if result.get("execution_id"):
+            record_started_executions(db, script_id, [(device_id, result["execution_id"])])
+        values = {getattr(BulkExecutionItem, key): value for key, value in result.items()}
+        counter = BulkExecutionJob.succeeded if result["status"] == ITEM_SUCCEEDED else BulkExecutionJob.failed
+        counts = {counter: counter + 1}
+        updated = db.query(BulkExecutionItem).filter(
+            BulkExecutionItem.id == item_id,
+            BulkExecutionItem.status == ITEM_RUNNING
+        ).update(values, synchronize_session=False)
+        if not updated:
+            # The job was closed as interrupted while the run was in flight: the item was counted
+            # as unknown, and now its outcome is known
+            updated = db.query(BulkExecutionItem).filter(
+                BulkExecutionItem.id == item_id,
+                BulkExecutionItem.status == ITEM_UNKNOWN
+            ).update(values, synchronize_session=False)
+            counts[BulkExecutionJob.unknown] = BulkExecutionJob.unknown - 1
+        if updated:
+            db.query(BulkExecutionJob).filter(BulkExecutionJob.id == job_id).update(
+                counts, synchronize_session=False
+            )
+
+    @staticmethod
+    def _renew_lease(db: Session, job_id: str, owner: str) -> None:
+        db.query(BulkExecutionJob).filter(
+            BulkExecutionJob.id == job_id,
+            BulkExecutionJob.owner == owner,
+            BulkExecutionJob.status == JOB_RUNNING
+        ).update({BulkExecutionJob.heartbeat_at: datetime.now(timezone.utc)}, synchronize_session=False)
+
+    async def _keep_lease(self, job_id: str) -> None:
+        """Renews the job's lease a few times per lease period until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.lease_seconds / 4)
+            try:
+                await loop.run_in_executor(None, self._write, functools.partial(
+                    self._renew_lease, job_id=job_id, owner=self.worker_id
+                ))
+            except Exception as e:
+                logger.error(f"Could not renew the lease of bulk execution job {job_id}: {e}")
+
+    def _dispatch_item(self, client: PulsewayClient, job_id: str, script_id: str, item_id: int, device_id: str,
+                       variables: Optional[List[Dict[str, Any]]], webhook_url: Optional[str]) -> None:
+        """Runs one item on a worker thread: committed as running first, so a restart can tell it was sent."""
+        if not self._write(functools.partial(self._mark_running, item_id=item_id)):
+            return
+        result = _run_script(client, script_id, device_id, variables, webhook_url)
+        self._write(functools.partial(self._record_result, job_id=job_id, script_id=script_id, item_id=item_id,
+                                      device_id=device_id, result=result))
+
+    async def run(self, job_id: str, client: PulsewayClient) -> None:
+        db = self.session_factory()
+        lease = None
+        try:
+            job = db.query(BulkExecutionJob).filter(BulkExecutionJob.id == job_id).first()
+            if job is None or job.status != JOB_QUEUED:
+                return
+            job.status = JOB_RUNNING
+            job.started_at = job.heartbeat_at = datetime.now(timezone.utc)
+            job.owner = self.worker_id
+            db.commit()
+            lease = asyncio.get_running_loop().create_task(self._keep_lease(job_id))
+
+            script_id, variables, webhook_url = job.script_id, job.variables, job.webhook_url
+            items = db.query(BulkExecutionItem.id, BulkExecutionItem.device_identifier).filter(
+                BulkExecutionItem.job_id == job_id,
+                BulkExecutionItem.status == ITEM_PENDING
+            ).order_by(BulkExecutionItem.id).all()
+
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+
+            await asyncio.gather(*(
+                loop.run_in_executor(executor, functools.partial(
+                    self._dispatch_item, client, job_id, script_id, item_id, device_id, variables, webhook_url
+                ))
+                for item_id, device_id in items
+            ))
+
+            # Unless the job was closed as interrupted meanwhile (e.g. a lease renewal was missed)
+            completed = db.query(BulkExecutionJob).filter(
+                BulkExecutionJob.id == job_id,
+                BulkExecutionJob.status == JOB_RUNNING
+            ).update({
+                BulkExecutionJob.status: JOB_COMPLETED,
+                BulkExecutionJob.finished_at: datetime.now(timezone.utc),
+            }, synchronize_session=False)
+            db.commit()
+            if completed:
+                logger.info(f"Bulk execution job {job_id} completed ({len(items)} devices).")
+            else:
+                logger.warning(f"Bulk execution job {job_id} finished after it was closed as interrupted.")
+        except asyncio.CancelledError:
+            db.rollback()
+            logger.warning(f"Bulk execution job {job_id} cancelled during shutdown.")
+            # Give up the lease so the leader closes the job now instead of after it expires
+            db.query(BulkExecutionJob).filter(
+                BulkExecutionJob.id == job_id,
+                BulkExecutionJob.status == JOB_RUNNING
+            ).update({BulkExecutionJob.heartbeat_at: None}, synchronize_session=False)
+            db.commit()
+            raise
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Bulk execution job {job_id} failed: {e}", exc_info=True)
+            db.query(BulkExecutionJob).filter(
+                BulkExecutionJob.id == job_id,
+                BulkExecutionJob.status == JOB_RUNNING
+            ).update({
+                BulkExecutionJob.status: JOB_INTERRUPTED,
+                BulkExecutionJob.finished_at: datetime.now(timezone.utc),
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            if lease is not None:
+                lease.cancel()
+            db.close()
+
+    async def shutdown(self) -> None:
+        """Cancels running jobs; the sync leader's mark_interrupted_jobs() closes their remaining items."""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Process-wide runner used by the scripts API
+bulk_execution_runner = BulkExecutionRunner()
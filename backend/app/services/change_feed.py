@@ -0,0 +1,161 @@
+# backend/app/services/change_feed.py
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from ..models.database import ChangeLogEntry, Device, Notification, Script
+
+# Entity types tracked in the change log, mapped to (model, primary key column)
+TRACKED_ENTITIES = {
+    "device": (Device, Device.identifier),
+    "notification": (Notification, Notification.id),
+    "script": (Script, Script.id),
+}
+
+OPERATION_UPSERT = "upsert"
+OPERATION_DELETE = "delete"
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+_IN_CHUNK_SIZE = 500
+
+# Arbitrary application-wide key for pg_advisory_xact_lock, see _serialize_change_log_writers
+CHANGE_LOG_ADVISORY_LOCK_KEY = 0x50_57_43_4C  # "PWCL"
+
+
+def _serialize_change_log_writers(db: Session) -> None:
+    """Makes change log ids become visible in id order on PostgreSQL.
+
+    A sequence hands out ids when rows are flushed, but they become visible when their
+    transaction commits: a reader could see id 12 while 11 is still in flight, and the
+    token 12 would skip 11 for good. Holding a transaction-level advisory lock from a
+    transaction's first change until it commits or rolls back allocates and commits ids
+    in the same order. SQLite already allows a single writer at a time.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    transaction = db.get_transaction()
+    if transaction is not None and db.info.get("change_log_locked_by") is transaction:
+        return  # Already held until this transaction ends
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_LOG_ADVISORY_LOCK_KEY})
+    db.info["change_log_locked_by"] = db.get_transaction()
+
+
+def record_change(db: Session, entity_type: str, entity_id, operation: str = OPERATION_UPSERT) -> None:
+    """Adds a change log entry to the current transaction. The caller commits."""
+    if entity_type not in TRACKED_ENTITIES:
+        raise ValueError(f"Untracked entity type for change log: {entity_type}")
+    _serialize_change_log_writers(db)
+    db.add(ChangeLogEntry(entity_type=entity_type, entity_id=str(entity_id), operation=operation))
+
+
+def record_changes(db: Session, entity_type: str, entity_ids: Iterable, operation: str = OPERATION_UPSERT) -> None:
+    """Adds change log entries for many entities of one type. The caller commits."""
+    for entity_id in entity_ids:
+        record_change(db, entity_type, entity_id, operation)
+
+
+def current_change_token(db: Session) -> int:
+    """Returns the latest change log id, i.e. the current data generation."""
+    return db.query(func.max(ChangeLogEntry.id)).scalar() or 0
+
+
+def prune_change_log(db: Session, retention_days: int = 7) -> int:
+    """Deletes entries older than the retention window, always keeping the newest one.
+
+    Clients holding a token older than the oldest kept entry are told to reset.
+    """
+    newest_id = current_change_token(db)
+    if not newest_id:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    deleted = db.query(ChangeLogEntry).filter(
+        ChangeLogEntry.changed_at < cutoff,
+        ChangeLogEntry.id < newest_id
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def parse_change_token(token: Optional[str]) -> Optional[int]:
+    """Parses a client-supplied token. Returns None for a missing or malformed token."""
+    if token is None or token == "":
+        return None
+    try:
+        value = int(token)
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+class ChangeFeedService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_changes_since(self, since: Optional[int], limit: int = 5000,
+                          entity_types: Optional[List[str]] = None) -> Dict:
+        """Collects entities created, updated or deleted after the given change token.
+
+        Returns a dict with the new token, whether the client must reset, whether more
+        changes remain beyond ``limit`` log entries, and per-type upserted entities and
+        deleted identifiers. Several changes to one entity collapse into its latest state.
+        ``entity_types`` restricts the feed to some types; tokens stay comparable across calls.
+        """
+        entity_types = list(entity_types or TRACKED_ENTITIES)
+        latest = current_change_token(self.db)
+        empty = {entity_type: ([], []) for entity_type in entity_types}
+
+        if since is None or since > latest:
+            # Unknown or foreign token: the client cannot know what it missed.
+            return {"token": latest, "reset": True, "has_more": False, "changes": empty}
+
+        oldest_kept = self.db.query(func.min(ChangeLogEntry.id)).scalar()
+        if oldest_kept is not None and since < oldest_kept - 1:
+            # Entries between the client's token and the oldest kept one were pruned.
+            return {"token": latest, "reset": True, "has_more": False, "changes": empty}
+
+        entries = self.db.query(
+            ChangeLogEntry.id, ChangeLogEntry.entity_type, ChangeLogEntry.entity_id, ChangeLogEntry.operation
+        ).filter(
+            ChangeLogEntry.id > since,
+            ChangeLogEntry.entity_type.in_(entity_types)
+        ).order_by(ChangeLogEntry.id).limit(limit + 1).all()
+
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        # With nothing new for these types the client can skip ahead to the latest token.
+        token = entries[-1].id if has_more else latest
+
+        # Later entries win, so an upsert followed by a delete reports only the delete.
+        final_ops: Dict[Tuple[str, str], str] = {}
+        for entry in entries:
+            final_ops[(entry.entity_type, entry.entity_id)] = entry.operation
+
+        changes = {}
+        for entity_type in entity_types:
+            upsert_ids = [eid for (etype, eid), op in final_ops.items() if etype == entity_type and op == OPERATION_UPSERT]
+            deleted_ids = [eid for (etype, eid), op in final_ops.items() if etype == entity_type and op == OPERATION_DELETE]
+            upserted = self._load_entities(entity_type, upsert_ids)
+            # An upserted entity that no longer exists locally was removed outside the log.
+            found_ids = {str(self._entity_key(entity_type, entity)) for entity in upserted}
+            deleted_ids.extend(eid for eid in upsert_ids if eid not in found_ids)
+            changes[entity_type] = (upserted, deleted_ids)
+
+        return {"token": token, "reset": False, "has_more": has_more, "changes": changes}
+
+    def _load_entities(self, entity_type: str, entity_ids: List[str]) -> List:
+        model, key_column = TRACKED_ENTITIES[entity_type]
+        if entity_type == "notification":
+            keys = [int(eid) for eid in entity_ids if eid.isdigit()]
+        else:
+            keys = list(entity_ids)
+        results = []
+        for start in range(0, len(keys), _IN_CHUNK_SIZE):
+            chunk = keys[start:start + _IN_CHUNK_SIZE]
+            results.extend(self.db.query(model).filter(key_column.in_(chunk)).all())
+        return results
+
+    @staticmethod
+    def _entity_key(entity_type: str, entity):
+        if entity_type == "device":
+            return entity.identifier
+        return entity.id
@@ -1,48 +1,167 @@
 # app/services/data_sync.py
 import asyncio
-from typing import List, Dict, Any, Optional
+import contextvars
+import functools
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError # Added
+import sentry_sdk
 from datetime import datetime, timezone
 import logging # structlog will pick this up
+import os
+import time
 from ..database import SessionLocal
 from ..exceptions import DatabaseError, ExternalAPIError # Added
+from ..metrics import SYNC_BUCKETS, Counter, Gauge, Histogram
+from ..tracing import trace_span
 from ..models.database import (
     Organization, Site, Group, Device, DeviceAsset, 
     Notification, Script, Task, Workflow
 )
-from ..pulseway.client import PulsewayClient
+from ..pulseway.client import ApiCallStats, PulsewayClient, api_call_stats
+from .change_feed import record_change, prune_change_log
+from .search_index import index_devices
+from .script_facets import index_script_facets
+from .suggest_index import suggest_index_sync
+from .sync_journal import (
+    RUN_FAILED, RUN_SUCCEEDED, STAGE_FAILED, STAGE_SUCCEEDED, TRIGGER_SCHEDULED, finish_run, prune_sync_runs,
+    record_stage, start_run
+)
 
 logger = logging.getLogger(__name__)
 
+SYNC_STAGE_DURATION = Histogram(
+    "sync_stage_duration_seconds", "Duration of each Pulseway sync stage.", ("stage", "outcome"), buckets=SYNC_BUCKETS)
+SYNC_STAGE_ROWS = Counter(
+    "sync_stage_rows_total", "Rows written by each Pulseway sync stage.", ("stage", "operation"))
+SYNC_LAST_SUCCESS = Gauge(
+    "sync_last_success_timestamp_seconds", "Unix time the last full Pulseway sync completed.")
+
+def _error_message(error: Exception) -> str:
+    return getattr(error, "detail", None) or str(error) or type(error).__name__
+
 class DataSyncService:
     """Service for synchronizing Pulseway data with local database"""
     
     def __init__(self, pulseway_client: PulsewayClient):
         self.client = pulseway_client
         self.db_session = SessionLocal
+        self.listeners: List[Callable[[], Awaitable[Any]]] = []
+
+    def add_listener(self, listener: Callable[[], Awaitable[Any]]):
+        """Registers a coroutine function awaited after each sync stage has committed"""
+        self.listeners.append(listener)
+
+    async def _notify_listeners(self):
+        for listener in self.listeners:
+            try:
+                await listener()
+            except Exception as e:
+                # Listeners push to clients; a failure must not fail the sync.
+                logger.warning(f"Sync listener failed: {e}")
     
-    async def sync_all_data(self):
+    async def _run_blocking(self, func, *args):
+        """Runs a blocking Pulseway call in the default executor, keeping the trace context for its spans"""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, func, *args))
+
+    async def sync_all_data(self, trigger: str = TRIGGER_SCHEDULED):
         """Sync all data from Pulseway API"""
-        logger.info("Starting full data synchronization...")
-        
+        with sentry_sdk.start_transaction(op="task", name="pulseway.sync"):
+            logger.info("Starting full data synchronization...")
+            run_id = self._journal(start_run, trigger)
+
+            try:
+                # Sync in order of dependencies
+                for stage in (
+                    self.sync_organizations, self.sync_sites, self.sync_groups, self.sync_devices,
+                    self.sync_device_assets, self.sync_notifications, self.sync_scripts,
+                    self.sync_tasks, self.sync_workflows
+                ):
+                    await self._run_stage(stage, run_id)
+                    await self._notify_listeners()
+                self.prune_change_log()
+                self.prune_sync_runs()
+                SYNC_LAST_SUCCESS.set(time.time())
+
+                logger.info("Data synchronization completed successfully")
+            except Exception as e:
+                logger.error(f"Data synchronization failed: {e}")
+                if run_id is not None:
+                    self._journal(finish_run, run_id, RUN_FAILED, _error_message(e))
+                raise
+            if run_id is not None:
+                self._journal(finish_run, run_id, RUN_SUCCEEDED)
+
+    async def _run_stage(self, stage, run_id: Optional[int] = None):
+        """Runs one sync stage, recording its duration, rows and Pulseway API usage in the metrics and the journal"""
+        name = stage.__name__.replace("sync_", "", 1)
+        outcome = "error"
+        counts = None
+        error = None
+        api_stats = ApiCallStats()
+        api_stats_token = api_call_stats.set(api_stats)
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
         try:
-            # Sync in order of dependencies
-            await self.sync_organizations()
-            await self.sync_sites()
-            await self.sync_groups()
-            await self.sync_devices()
-            await self.sync_device_assets()
-            await self.sync_notifications()
-            await self.sync_scripts()
-            await self.sync_tasks()
-            await self.sync_workflows()
-            
-            logger.info("Data synchronization completed successfully")
+            with trace_span("sync.stage", name):
+                counts = await stage()
+            outcome = "success"
         except Exception as e:
-            logger.error(f"Data synchronization failed: {e}")
+            error = _error_message(e)
             raise
-    
+        finally:
+            duration = time.perf_counter() - started
+            api_call_stats.reset(api_stats_token)
+            SYNC_STAGE_DURATION.labels(name, outcome).observe(duration)
+            if run_id is not None:
+                self._journal(record_stage, run_id, name, STAGE_SUCCEEDED if error is None else STAGE_FAILED,
+                              started_at, duration, counts if isinstance(counts, dict) else None, api_stats, error)
+        if isinstance(counts, dict):
+            for operation in ("created", "updated"):
+                SYNC_STAGE_ROWS.labels(name, operation).inc(counts.get(operation, 0))
+
+    def _journal(self, func, *args):
+        """Writes to the sync run journal in its own session; a failure is logged and never fails the sync."""
+        db = self.db_session()
+        try:
+            return func(db, *args)
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"Failed to update the sync run journal: {e}")
+            return None
+        finally:
+            db.close()
+
+    def prune_change_log(self):
+        """Drop change log entries older than the retention window"""
+        retention_days = int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "7"))
+        db = self.db_session()
+        try:
+            pruned = prune_change_log(db, retention_days=retention_days)
+            if pruned:
+                logger.info(f"Pruned {pruned} change log entries older than {retention_days} days.")
+        except SQLAlchemyError as e:
+            db.rollback()
+            # Pruning is housekeeping; a failure must not fail the whole sync.
+            logger.warning(f"Failed to prune change log: {e}")
+        finally:
+            db.close()
+
+    def prune_sync_runs(self):
+        """Drop sync run journal entries older than the retention window"""
+        retention_days = int(os.getenv("SYNC_RUN_RETENTION_DAYS", "30"))
+        pruned = self._journal(prune_sync_runs, retention_days)
+        if pruned:
+            logger.info(f"Pruned {pruned} sync runs older than {retention_days} days.")
+
+    def _refresh_suggestions(self, refresh, *args):
+        """Updates the typeahead index after a stage commits; never fails the sync."""
+        try:
+            refresh(*args)
+        except Exception as e:
+            logger.warning(f"Failed to refresh typeahead suggestions: {e}")
+
     async def sync_organizations(self):
         """Sync organizations"""
         logger.info("Syncing organizations...")
@@ -54,8 +173,8 @@ class DataSyncService:
             top = 100
 
             while True:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, self.client.get_organizations, top, skip
+                response = await self._run_blocking(
+                    self.client.get_organizations, top, skip
                 )
 
                 current_batch = response.get('Data', [])
@@ -113,20 +232,22 @@ class DataSyncService:
                     created_count += 1
             
             db.commit()
+            self._refresh_suggestions(suggest_index_sync.refresh_named, db, "organization")
             logger.info(f"Synced organizations. Created: {created_count}, Updated: {updated_count}.")
+            return {"fetched": len(all_organizations_data), "created": created_count, "updated": updated_count}
 
         except SQLAlchemyError as e:
             db.rollback()
-            logger.error("Database error during organizations sync", error=str(e), exc_info=True)
+            logger.error(f"Database error during organizations sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Database error syncing organizations: {str(e)}") from e
         except ExternalAPIError as e: # Catch errors from PulsewayClient explicitly if needed for special handling
             db.rollback() # Rollback on API errors too if partial data shouldn't be committed
-            logger.error("External API error during organizations sync", error=str(e.detail), status_code=e.status_code, exc_info=True)
+            logger.error(f"External API error during organizations sync ({e.status_code}): {e.detail}", exc_info=True)
             # Re-raise to be caught by main.py handlers or the caller
             raise # Or wrap in a service-specific error if desired: raise DataSyncFailedError(...) from e
         except Exception as e: # Catch any other unexpected errors
             db.rollback()
-            logger.error("Unexpected error during organizations sync", error=str(e), exc_info=True)
+            logger.error(f"Unexpected error during organizations sync: {e}", exc_info=True)
             # Consider raising a generic AppException or a specific DataSyncFailedError here
             raise DatabaseError(detail=f"Unexpected error syncing organizations: {str(e)}") from e # Or a more generic error
         finally:
@@ -143,8 +264,8 @@ class DataSyncService:
             top = 100
 
             while True:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, self.client.get_sites, top, skip
+                response = await self._run_blocking(
+                    self.client.get_sites, top, skip
                 )
 
                 current_batch = response.get('Data', [])
@@ -211,19 +332,21 @@ class DataSyncService:
                     created_count += 1
             
             db.commit()
+            self._refresh_suggestions(suggest_index_sync.refresh_named, db, "site")
             logger.info(f"Synced sites. Created: {created_count}, Updated: {updated_count}.")
+            return {"fetched": len(all_sites_data), "created": created_count, "updated": updated_count}
             
         except SQLAlchemyError as e:
             db.rollback()
-            logger.error("Database error during sites sync", error=str(e), exc_info=True)
+            logger.error(f"Database error during sites sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Database error syncing sites: {str(e)}") from e
         except ExternalAPIError as e:
             db.rollback()
-            logger.error("External API error during sites sync", error=str(e.detail), status_code=e.status_code, exc_info=True)
+            logger.error(f"External API error during sites sync ({e.status_code}): {e.detail}", exc_info=True)
             raise
         except Exception as e:
             db.rollback()
-            logger.error("Unexpected error during sites sync", error=str(e), exc_info=True)
+            logger.error(f"Unexpected error during sites sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Unexpected error syncing sites: {str(e)}") from e
         finally:
             db.close()
@@ -239,8 +362,8 @@ class DataSyncService:
             top = 100
 
             while True:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, self.client.get_groups, top, skip
+                response = await self._run_blocking(
+                    self.client.get_groups, top, skip
                 )
 
                 current_batch = response.get('Data', [])
@@ -315,19 +438,21 @@ class DataSyncService:
                     created_count += 1
             
             db.commit()
+            self._refresh_suggestions(suggest_index_sync.refresh_named, db, "group")
             logger.info(f"Synced groups. Created: {created_count}, Updated: {updated_count}.")
+            return {"fetched": len(all_groups_data), "created": created_count, "updated": updated_count}
             
         except SQLAlchemyError as e:
             db.rollback()
-            logger.error("Database error during groups sync", error=str(e), exc_info=True)
+            logger.error(f"Database error during groups sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Database error syncing groups: {str(e)}") from e
         except ExternalAPIError as e:
             db.rollback()
-            logger.error("External API error during groups sync", error=str(e.detail), status_code=e.status_code, exc_info=True)
+            logger.error(f"External API error during groups sync ({e.status_code}): {e.detail}", exc_info=True)
             raise
         except Exception as e:
             db.rollback()
-            logger.error("Unexpected error during groups sync", error=str(e), exc_info=True)
+            logger.error(f"Unexpected error during groups sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Unexpected error syncing groups: {str(e)}") from e
         finally:
             db.close()
@@ -344,8 +469,8 @@ class DataSyncService:
             top = 100
             
             while True:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, self.client.get_devices, top, skip
+                response = await self._run_blocking(
+                    self.client.get_devices, top, skip
                 )
                 
                 devices_data = response.get('Data', [])
@@ -365,6 +490,7 @@ class DataSyncService:
 
             created_count = 0
             updated_count = 0
+            changed_identifiers = [] # Devices whose search documents need refreshing
 
             for device_data in all_devices:
                 device_identifier = device_data['Identifier']
@@ -372,8 +498,8 @@ class DataSyncService:
 
                 # Get detailed device info - this is needed for both create and update
                 try:
-                    device_details_response = await asyncio.get_event_loop().run_in_executor(
-                        None, self.client.get_device, device_identifier
+                    device_details_response = await self._run_blocking(
+                        self.client.get_device, device_identifier
                     )
                     detailed_data = device_details_response.get('Data', {})
                 except Exception as e:
@@ -488,6 +614,8 @@ class DataSyncService:
 
                     if updated:
                         record_to_update.updated_at = datetime.now(timezone.utc)
+                        record_change(db, "device", device_identifier)
+                        changed_identifiers.append(device_identifier)
                         updated_count += 1
                 else:
                     device = Device(
@@ -525,22 +653,27 @@ class DataSyncService:
                         last_seen_online=last_seen
                     )
                     db.add(device)
+                    record_change(db, "device", device_identifier)
+                    changed_identifiers.append(device_identifier)
                     created_count += 1
             
+            index_devices(db, changed_identifiers)
             db.commit()
+            self._refresh_suggestions(suggest_index_sync.refresh_devices, db, changed_identifiers)
             logger.info(f"Synced devices. Created: {created_count}, Updated: {updated_count}.")
+            return {"fetched": len(all_devices), "created": created_count, "updated": updated_count}
             
         except SQLAlchemyError as e:
             db.rollback()
-            logger.error("Database error during devices sync", error=str(e), exc_info=True)
+            logger.error(f"Database error during devices sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Database error syncing devices: {str(e)}") from e
         except ExternalAPIError as e:
             db.rollback()
-            logger.error("External API error during devices sync", error=str(e.detail), status_code=e.status_code, exc_info=True)
+            logger.error(f"External API error during devices sync ({e.status_code}): {e.detail}", exc_info=True)
             raise
         except Exception as e:
             db.rollback()
-            logger.error("Unexpected error during devices sync", error=str(e), exc_info=True)
+            logger.error(f"Unexpected error during devices sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Unexpected error syncing devices: {str(e)}") from e
         finally:
             db.close()
@@ -556,8 +689,8 @@ class DataSyncService:
             top = 100
 
             while True:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, self.client.get_assets, top, skip
+                response = await self._run_blocking(
+                    self.client.get_assets, top, skip
                 )
                 
                 current_batch = response.get('Data', [])
@@ -579,6 +712,7 @@ class DataSyncService:
 
             created_count = 0
             updated_count = 0
+            changed_identifiers = [] # Devices whose search documents need refreshing
 
             for asset_data in all_assets_data:
                 # 'Identifier' from /assets endpoint is the device_identifier
@@ -612,6 +746,7 @@ class DataSyncService:
 
                     if updated:
                         record_to_update.updated_at = datetime.now(timezone.utc)
+                        changed_identifiers.append(device_identifier)
                         updated_count += 1
                 else:
                     device_asset = DeviceAsset(
@@ -624,22 +759,26 @@ class DataSyncService:
                         installed_software=asset_data.get('InstalledSoftware')
                     )
                     db.add(device_asset)
+                    changed_identifiers.append(device_identifier)
                     created_count += 1
             
+            # Asset tags and IPs are part of the device search documents
+            index_devices(db, changed_identifiers)
             db.commit()
             logger.info(f"Synced device assets. Created: {created_count}, Updated: {updated_count}.")
+            return {"fetched": len(all_assets_data), "created": created_count, "updated": updated_count}
             
         except SQLAlchemyError as e:
             db.rollback()
-            logger.error("Database error during device assets sync", error=str(e), exc_info=True)
+            logger.error(f"Database error during device assets sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Database error syncing device assets: {str(e)}") from e
         except ExternalAPIError as e:
             db.rollback()
-            logger.error("External API error during device assets sync", error=str(e.detail), status_code=e.status_code, exc_info=True)
+            logger.error(f"External API error during device assets sync ({e.status_code}): {e.detail}", exc_info=True)
             raise
         except Exception as e:
             db.rollback()
-            logger.error("Unexpected error during device assets sync", error=str(e), exc_info=True)
+            logger.error(f"Unexpected error during device assets sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Unexpected error syncing device assets: {str(e)}") from e
         finally:
             db.close()
@@ -655,8 +794,8 @@ class DataSyncService:
             top = 100 # Using a smaller page size for notifications
             
             while True:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, self.client.get_notifications, top, skip
+                response = await self._run_blocking(
+                    self.client.get_notifications, top, skip
                 )
 
                 current_batch = response.get('Data', [])
@@ -717,6 +856,7 @@ class DataSyncService:
                     if updated:
                         # Assuming Notification model has an onupdate for updated_at
                         # If not, add: record_to_update.updated_at = datetime.now(timezone.utc)
+                        record_change(db, "notification", notif_id)
                         updated_count += 1
                 else:
                     notification = Notification(
@@ -727,22 +867,24 @@ class DataSyncService:
                         read=False  # Default to unread for new notifications
                     )
                     db.add(notification)
+                    record_change(db, "notification", notif_id)
                     created_count += 1
             
             db.commit()
             logger.info(f"Synced notifications. Created: {created_count}, Updated: {updated_count}.")
+            return {"fetched": len(all_notifications_data), "created": created_count, "updated": updated_count}
             
         except SQLAlchemyError as e:
             db.rollback()
-            logger.error("Database error during notifications sync", error=str(e), exc_info=True)
+            logger.error(f"Database error during notifications sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Database error syncing notifications: {str(e)}") from e
         except ExternalAPIError as e:
             db.rollback()
-            logger.error("External API error during notifications sync", error=str(e.detail), status_code=e.status_code, exc_info=True)
+            logger.error(f"External API error during notifications sync ({e.status_code}): {e.detail}", exc_info=True)
             raise
         except Exception as e:
             db.rollback()
-            logger.error("Unexpected error during notifications sync", error=str(e), exc_info=True)
+            logger.error(f"Unexpected error during notifications sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Unexpected error syncing notifications: {str(e)}") from e
         finally:
             db.close()
@@ -758,8 +900,8 @@ class DataSyncService:
             top = 100
 
             while True:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, self.client.get_scripts, top, skip
+                response = await self._run_blocking(
+                    self.client.get_scripts, top, skip
                 )
 
                 current_batch = response.get('Data', [])
@@ -779,6 +921,7 @@ class DataSyncService:
 
             created_count = 0
             updated_count = 0
+            changed_script_ids = [] # Scripts whose platform/category facets need refreshing
 
             for script_data in all_scripts_data:
                 script_id = script_data['Id']
@@ -810,6 +953,8 @@ class DataSyncService:
 
                     if updated:
                         record_to_update.updated_at = datetime.now(timezone.utc)
+                        record_change(db, "script", script_id)
+                        changed_script_ids.append(script_id)
                         updated_count += 1
                 else:
                     script = Script(
@@ -823,22 +968,27 @@ class DataSyncService:
                         is_built_in=script_data.get('IsBuiltIn', False)
                     )
                     db.add(script)
+                    record_change(db, "script", script_id)
+                    changed_script_ids.append(script_id)
                     created_count += 1
-            
+
+            index_script_facets(db, changed_script_ids)
             db.commit()
+            self._refresh_suggestions(suggest_index_sync.refresh_named, db, "script")
             logger.info(f"Synced scripts. Created: {created_count}, Updated: {updated_count}.")
+            return {"fetched": len(all_scripts_data), "created": created_count, "updated": updated_count}
             
         except SQLAlchemyError as e:
             db.rollback()
-            logger.error("Database error during scripts sync", error=str(e), exc_info=True)
+            logger.error(f"Database error during scripts sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Database error syncing scripts: {str(e)}") from e
         except ExternalAPIError as e:
             db.rollback()
-            logger.error("External API error during scripts sync", error=str(e.detail), status_code=e.status_code, exc_info=True)
+            logger.error(f"External API error during scripts sync ({e.status_code}): {e.detail}", exc_info=True)
             raise
         except Exception as e:
             db.rollback()
-            logger.error("Unexpected error during scripts sync", error=str(e), exc_info=True)
+            logger.error(f"Unexpected error during scripts sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Unexpected error syncing scripts: {str(e)}") from e
         finally:
             db.close()
@@ -854,8 +1004,8 @@ class DataSyncService:
             top = 100
             
             while True:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, self.client.get_tasks, top, skip
+                response = await self._run_blocking(
+                    self.client.get_tasks, top, skip
                 )
 
                 current_batch = response.get('Data', [])
@@ -950,18 +1100,19 @@ class DataSyncService:
             
             db.commit()
             logger.info(f"Synced tasks. Created: {created_count}, Updated: {updated_count}.")
+            return {"fetched": len(all_tasks_data), "created": created_count, "updated": updated_count}
             
         except SQLAlchemyError as e:
             db.rollback()
-            logger.error("Database error during tasks sync", error=str(e), exc_info=True)
+            logger.error(f"Database error during tasks sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Database error syncing tasks: {str(e)}") from e
         except ExternalAPIError as e:
             db.rollback()
-            logger.error("External API error during tasks sync", error=str(e.detail), status_code=e.status_code, exc_info=True)
+            logger.error(f"External API error during tasks sync ({e.status_code}): {e.detail}", exc_info=True)
             raise
         except Exception as e:
             db.rollback()
-            logger.error("Unexpected error during tasks sync", error=str(e), exc_info=True)
+            logger.error(f"Unexpected error during tasks sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Unexpected error syncing tasks: {str(e)}") from e
         finally:
             db.close()
@@ -977,8 +1128,8 @@ class DataSyncService:
             top = 100
             
             while True:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, self.client.get_workflows, top, skip
+                response = await self._run_blocking(
+                    self.client.get_workflows, top, skip
                 )
 
                 current_batch = response.get('Data', [])
@@ -1059,18 +1210,19 @@ class DataSyncService:
             
             db.commit()
             logger.info(f"Synced workflows. Created: {created_count}, Updated: {updated_count}.")
+            return {"fetched": len(all_workflows_data), "created": created_count, "updated": updated_count}
             
         except SQLAlchemyError as e:
             db.rollback()
-            logger.error("Database error during workflows sync", error=str(e), exc_info=True)
+            logger.error(f"Database error during workflows sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Database error syncing workflows: {str(e)}") from e
         except ExternalAPIError as e:
             db.rollback()
-            logger.error("External API error during workflows sync", error=str(e.detail), status_code=e.status_code, exc_info=True)
+            logger.error(f"External API error during workflows sync ({e.status_code}): {e.detail}", exc_info=True)
             raise
         except Exception as e:
             db.rollback()
-            logger.error("Unexpected error during workflows sync", error=str(e), exc_info=True)
+            logger.error(f"Unexpected error during workflows sync: {e}", exc_info=True)
             raise DatabaseError(detail=f"Unexpected error syncing workflows: {str(e)}") from e
         finally:
-            db.close()
\ No newline at end of file
+            db.close()
@@ -0,0 +1,81 @@
+# backend/app/services/device_export.py
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator
+from ..database import SessionLocal
+from ..models.dto import DeviceFilterCriteria, DEVICE_DETAIL_FIELDS
+from ..responses import dumps, json_default
+from .device_service import DeviceService, DEVICE_EXPORT_ASSET_FIELDS
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Records encoded per yielded chunk: small enough that the first bytes go out at once,
+# large enough to keep per-chunk overhead negligible.
+_CHUNK_RECORDS = 200
+
+
+def iter_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encodes records as newline-delimited JSON, one record per line."""
+    chunk = []
+    for record in records:
+        chunk.append(dumps(record))
+        if len(chunk) >= _CHUNK_RECORDS:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+def _csv_value(value: Any) -> Any:
+    # Nested values (IP lists, event logs, disks...) are written as JSON text
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=json_default)
+    return json_default(value) if value is not None and not isinstance(value, (str, int, float, bool)) else value
+
+
+def iter_csv(records: Iterable[Dict[str, Any]], include_assets: bool = True) -> Iterator[bytes]:
+    """Encodes records as CSV with a header row; asset fields are prefixed with ``asset_``."""
+    header = list(DEVICE_DETAIL_FIELDS)
+    if include_assets:
+        header += [f"asset_{field}" for field in DEVICE_EXPORT_ASSET_FIELDS]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    count = 0
+    for record in records:
+        row = [_csv_value(record[field]) for field in DEVICE_DETAIL_FIELDS]
+        if include_assets:
+            assets = record.get("assets") or {}
+            row += [_csv_value(assets.get(field)) for field in DEVICE_EXPORT_ASSET_FIELDS]
+        writer.writerow(row)
+        count += 1
+        if count % _CHUNK_RECORDS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    # Always flush, so an empty export still returns the header row
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_device_export(criteria: DeviceFilterCriteria, export_format: str = "ndjson",
+                         include_assets: bool = True) -> Iterator[bytes]:
+    """Streams the filtered device inventory in the given format.
+
+    The generator owns its database session: it outlives the request handler (and its
+    get_db dependency) while the response body is being sent.
+    """
+    db = SessionLocal()
+    try:
+        records = DeviceService(db=db, pulseway_client=None).iter_device_export(criteria, include_assets)
+        if export_format == "csv":
+            yield from iter_csv(records, include_assets)
+        else:
+            yield from iter_ndjson(records)
+    finally:
+        db.close()
@@ -1,46 +1,96 @@
 # backend/app/services/device_service.py
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional # Added Optional
-from ..models.dto import DeviceFilters # Corrected import
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, load_only
+from typing import List, Dict, Any, Iterator, Optional, Tuple # Added Optional
+from ..models.dto import DeviceFilterCriteria, DeviceFilters, DEVICE_SUMMARY_FIELDS, DEVICE_DETAIL_FIELDS # Corrected import
 from ..models.database import Device, Notification, DeviceAsset # Added Notification, DeviceAsset
 from ..pulseway.client import PulsewayClient
+from .change_feed import record_change
+from .search_index import index_devices, search_device_identifiers
 from datetime import datetime # Added datetime
 # from datetime import datetime, timezone # if using timezone.utc
 
+# Columns selected for row-based listings, in DeviceDTO field order
+DEVICE_SUMMARY_COLUMNS = [getattr(Device, field) for field in DEVICE_SUMMARY_FIELDS]
+DEVICE_DETAIL_COLUMNS = [getattr(Device, field) for field in DEVICE_DETAIL_FIELDS]
+# Asset columns included in exports (device_identifier is implied by the device)
+DEVICE_EXPORT_ASSET_FIELDS = ("tags", "asset_info", "public_ip_address", "ip_addresses", "disks", "installed_software", "updated_at")
+DEVICE_EXPORT_ASSET_COLUMNS = [getattr(DeviceAsset, field) for field in DEVICE_EXPORT_ASSET_FIELDS]
+
+def apply_device_filters(query, filters: DeviceFilterCriteria):
+    """Applies the GET /devices list filters to a query selecting from Device (entities, rows or identifiers)."""
+    if filters.organization:
+        query = query.filter(Device.organization_name.ilike(f"%{filters.organization}%"))
+    if filters.site:
+        query = query.filter(Device.site_name.ilike(f"%{filters.site}%"))
+    if filters.group:
+        query = query.filter(Device.group_name.ilike(f"%{filters.group}%"))
+    if filters.online_only is not None: # Changed from if filters.online_only:
+        query = query.filter(Device.is_online == filters.online_only)
+    if filters.offline_only is not None: # Changed from if filters.offline_only:
+        query = query.filter(Device.is_online == (not filters.offline_only))
+    if filters.has_alerts:
+        query = query.filter(
+            (Device.critical_notifications > 0) |
+            (Device.elevated_notifications > 0)
+        )
+    if filters.computer_type:
+        query = query.filter(Device.computer_type.ilike(f"%{filters.computer_type}%"))
+    return query
+
 class DeviceService:
     def __init__(self, db: Session, pulseway_client: PulsewayClient):
         self.db = db
         self.client = pulseway_client
 
     def get_devices_with_filters(self, filters: DeviceFilters) -> List[Device]: # Updated type hint
-        # Logic from backend/app/api/devices.py::get_devices will be moved here
-        # For now, let's add a placeholder implementation
-
-        query = self.db.query(Device)
-
-        # Apply filters (to be implemented fully)
-        if filters.organization:
-            query = query.filter(Device.organization_name.ilike(f"%{filters.organization}%"))
-        if filters.site:
-            query = query.filter(Device.site_name.ilike(f"%{filters.site}%"))
-        if filters.group:
-            query = query.filter(Device.group_name.ilike(f"%{filters.group}%"))
-        if filters.online_only is not None: # Changed from if filters.online_only:
-            query = query.filter(Device.is_online == filters.online_only)
-        if filters.offline_only is not None: # Changed from if filters.offline_only:
-            query = query.filter(Device.is_online == (not filters.offline_only))
-        if filters.has_alerts:
-            query = query.filter(
-                (Device.critical_notifications > 0) |
-                (Device.elevated_notifications > 0)
-            )
-        if filters.computer_type:
-            query = query.filter(Device.computer_type.ilike(f"%{filters.computer_type}%"))
+        """Gets filtered devices with only the DeviceDTO columns loaded.
+
+        The JSON blobs (event_logs, updates, local_ip_addresses) are deferred and load on access.
+        """
+        query = apply_device_filters(
+            self.db.query(Device).options(load_only(*DEVICE_SUMMARY_COLUMNS)), filters
+        )
 
         devices = query.offset(filters.offset).limit(filters.limit).all()
 
         return devices
 
+    def get_device_rows_with_filters(self, filters: DeviceFilters) -> List[Row]:
+        """Same as get_devices_with_filters but selects only the DeviceDTO columns.
+
+        Returns plain row tuples, skipping ORM identity-map bookkeeping for large lists.
+        """
+        query = apply_device_filters(self.db.query(*DEVICE_SUMMARY_COLUMNS), filters)
+        return query.offset(filters.offset).limit(filters.limit).all()
+
+    def iter_device_export(self, criteria: DeviceFilterCriteria, include_assets: bool = True,
+                           batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Yields one dict per matching device (DeviceDetailDTO fields plus ``assets``).
+
+        Rows are fetched in batches of ``batch_size`` with a server-side cursor where the
+        driver supports one, so memory use does not grow with the size of the fleet.
+        """
+        columns = list(DEVICE_DETAIL_COLUMNS)
+        if include_assets:
+            columns += DEVICE_EXPORT_ASSET_COLUMNS
+        query = self.db.query(*columns)
+        if include_assets:
+            query = query.outerjoin(DeviceAsset, DeviceAsset.device_identifier == Device.identifier)
+        query = apply_device_filters(query, criteria).order_by(Device.identifier)
+
+        detail_count = len(DEVICE_DETAIL_COLUMNS)
+        for row in query.yield_per(batch_size):
+            record = dict(zip(DEVICE_DETAIL_FIELDS, row[:detail_count]))
+            if include_assets:
+                asset_values = row[detail_count:]
+                # No asset row for this device: the outer join yields all NULLs
+                record["assets"] = (
+                    dict(zip(DEVICE_EXPORT_ASSET_FIELDS, asset_values))
+                    if any(value is not None for value in asset_values) else None
+                )
+            yield record
+
     def get_device_statistics(self) -> Dict[str, Any]: # Or a specific DTO if we want to map here
         """Calculates device statistics."""
 
@@ -94,6 +144,24 @@ class DeviceService:
         device = self.db.query(Device).filter(Device.identifier == device_id).first()
         return device
 
+    def get_device_rows_by_identifiers(self, identifiers: List[str],
+                                       fields: Optional[List[str]] = None) -> Tuple[List[Row], List[str]]:
+        """Fetches many devices in a single IN (...) query.
+
+        Selects only ``fields`` (default: all DeviceDetailDTO fields, identifier first).
+        Returns the rows in request order and the identifiers that were not found.
+        """
+        fields = list(fields or DEVICE_DETAIL_FIELDS)
+        requested = list(dict.fromkeys(identifiers))
+        columns = [getattr(Device, field) for field in fields]
+        rows = self.db.query(*columns).filter(Device.identifier.in_(requested)).all()
+
+        identifier_index = fields.index("identifier")
+        by_identifier = {row[identifier_index]: row for row in rows}
+        found = [by_identifier[identifier] for identifier in requested if identifier in by_identifier]
+        missing = [identifier for identifier in requested if identifier not in by_identifier]
+        return found, missing
+
     def refresh_single_device_data(self, device_id: str) -> Dict[str, Any]:
         """Refreshes data for a specific device from Pulseway API and updates the local DB."""
         try:
@@ -142,6 +210,8 @@ class DeviceService:
                         pass # Keep old value or log
 
                 device.updated_at = datetime.now() # Consider datetime.now(timezone.utc)
+                record_change(self.db, "device", device.identifier)
+                index_devices(self.db, [device.identifier])
 
                 self.db.commit()
                 self.db.refresh(device)
@@ -154,41 +224,46 @@ class DeviceService:
             # Log e (e.g., logger.error(f"Failed to refresh device data for {device_id}: {e}"))
             return {"status": "error", "message": f"An unexpected error occurred: {str(e)}"}
 
-    def search_devices_by_term(self, search_term: str, limit: int = 20) -> List[Device]:
-        """Searches devices by name, description, or IP address."""
-        return self.db.query(Device).filter(
-            (Device.name.ilike(f"%{search_term}%")) |
-            (Device.description.ilike(f"%{search_term}%")) |
-            (Device.external_ip_address.ilike(f"%{search_term}%"))
-        ).limit(limit).all()
+    def search_devices_by_term(self, search_term: str, limit: int = 20) -> List[Row]:
+        """Searches devices by name, description, IP addresses, organization/site/group and asset tags.
+
+        Matches come ranked from the search index (see search_index.py). Like the other
+        listing helpers below, this selects only the DeviceDTO columns (see
+        DeviceDTO.row_to_dict); use get_device_details for a full row.
+        """
+        identifiers = search_device_identifiers(self.db, search_term, limit)
+        if not identifiers:
+            return []
+        rows, _ = self.get_device_rows_by_identifiers(identifiers, list(DEVICE_SUMMARY_FIELDS))
+        return rows
 
-    def get_devices_by_organization_name(self, org_name: str, limit: int = 100, offset: int = 0) -> List[Device]:
+    def get_devices_by_organization_name(self, org_name: str, limit: int = 100, offset: int = 0) -> List[Row]:
         """Gets all devices for a specific organization."""
-        return self.db.query(Device).filter(
+        return self.db.query(*DEVICE_SUMMARY_COLUMNS).filter(
             Device.organization_name.ilike(f"%{org_name}%")
         ).offset(offset).limit(limit).all()
 
-    def get_devices_by_site_name(self, site_name: str, limit: int = 100, offset: int = 0) -> List[Device]:
+    def get_devices_by_site_name(self, site_name: str, limit: int = 100, offset: int = 0) -> List[Row]:
         """Gets all devices for a specific site."""
-        return self.db.query(Device).filter(
+        return self.db.query(*DEVICE_SUMMARY_COLUMNS).filter(
             Device.site_name.ilike(f"%{site_name}%")
         ).offset(offset).limit(limit).all()
 
-    def get_devices_with_critical_alerts(self, limit: int = 50) -> List[Device]:
+    def get_devices_with_critical_alerts(self, limit: int = 50) -> List[Row]:
         """Gets devices with critical alerts."""
-        return self.db.query(Device).filter(
+        return self.db.query(*DEVICE_SUMMARY_COLUMNS).filter(
             Device.critical_notifications > 0
         ).order_by(Device.critical_notifications.desc()).limit(limit).all()
 
-    def get_devices_with_elevated_alerts(self, limit: int = 50) -> List[Device]:
+    def get_devices_with_elevated_alerts(self, limit: int = 50) -> List[Row]:
         """Gets devices with elevated alerts."""
-        return self.db.query(Device).filter(
+        return self.db.query(*DEVICE_SUMMARY_COLUMNS).filter(
             Device.elevated_notifications > 0
         ).order_by(Device.elevated_notifications.desc()).limit(limit).all()
 
-    def get_offline_devices_list(self, limit: int = 100, offset: int = 0) -> List[Device]: # Renamed to avoid conflict if any
+    def get_offline_devices_list(self, limit: int = 100, offset: int = 0) -> List[Row]: # Renamed to avoid conflict if any
         """Gets all offline devices."""
-        return self.db.query(Device).filter(
+        return self.db.query(*DEVICE_SUMMARY_COLUMNS).filter(
             Device.is_online == False
         ).order_by(Device.last_seen_online.desc()).offset(offset).limit(limit).all()
 
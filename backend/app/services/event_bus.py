@@ -0,0 +1,296 @@
+# backend/app/services/event_bus.py
+"""
+Pub/sub between the worker processes serving the API.
+
+Real-time messages (stats, device changes, execution results) are produced in
+whichever worker runs the sync or receives the webhook, but WebSocket clients
+are spread over all workers. Broadcasts therefore go through an EventBus: the
+event is handed to the local handlers right away and sent to the other workers,
+whose handlers deliver it to their own clients.
+
+EVENT_BUS_BACKEND selects the transport:
+
+* ``memory`` (default): a single process; nothing leaves it.
+* ``unix``: every worker binds a datagram socket in EVENT_BUS_SOCKET_DIR and
+  sends each event to the other sockets found there. Workers must share a host.
+* ``postgres``: LISTEN/NOTIFY on DATABASE_URL (or EVENT_BUS_DATABASE_URL);
+  needs psycopg2. NOTIFY payloads are limited to 8000 bytes, so larger events
+  are stored in the event_bus_payloads table and only their id is notified.
+
+Events that do not fit the unix transport are delivered locally and logged.
+
+publish_internal sends a message to the other workers' internal handlers only:
+coordination between workers (e.g. the sync leader telling the others to
+refresh their in-memory indexes) that clients never see.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from ..models.database import EventBusPayload
+from ..responses import dumps
+
+logger = logging.getLogger(__name__)
+
+# handler(message, topics, coalesce_key)
+EventHandler = Callable[[Dict[str, Any], Optional[List[str]], Optional[str]], Awaitable[Any]]
+# handler(message), for publish_internal
+InternalHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+POSTGRES_CHANNEL = "pulseway_events"
+POSTGRES_MAX_PAYLOAD = 7999
+# Stored payloads are read by the other workers as soon as they are notified
+POSTGRES_PAYLOAD_RETENTION_SECONDS = 300
+UNIX_MAX_DATAGRAM = 200 * 1024
+
+
+class EventBus:
+    """In-process bus; also the base class of the cross-worker transports."""
+
+    crosses_workers = False
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex  # Identifies this worker in envelopes
+        self.handlers: List[EventHandler] = []
+        self.internal_handlers: List[InternalHandler] = []
+
+    def add_handler(self, handler: EventHandler) -> None:
+        self.handlers.append(handler)
+
+    def remove_handler(self, handler: EventHandler) -> None:
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+
+    def add_internal_handler(self, handler: InternalHandler) -> None:
+        self.internal_handlers.append(handler)
+
+    def remove_internal_handler(self, handler: InternalHandler) -> None:
+        if handler in self.internal_handlers:
+            self.internal_handlers.remove(handler)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, message: Dict[str, Any], topics: Optional[List[str]] = None,
+                      coalesce_key: Optional[str] = None) -> None:
+        """Delivers to this worker's handlers, then forwards to the other workers."""
+        event = {"origin": self.origin, "message": message, "topics": topics, "coalesce_key": coalesce_key}
+        await self._deliver(event)
+        try:
+            await self._send(event)
+        except Exception as e:
+            logger.error(f"Failed to forward event to other workers: {e}")
+
+    async def publish_internal(self, message: Dict[str, Any]) -> None:
+        """Sends a message to the other workers' internal handlers; this worker has acted on it already."""
+        try:
+            await self._send({"origin": self.origin, "internal": True, "message": message})
+        except Exception as e:
+            logger.error(f"Failed to forward internal message to other workers: {e}")
+
+    async def _send(self, event: Dict[str, Any]) -> None:
+        """Forwards an event to the other workers; nothing to do in process."""
+
+    async def _deliver(self, event: Dict[str, Any]) -> None:
+        if event.get("internal"):
+            for handler in list(self.internal_handlers):
+                try:
+                    await handler(event["message"])
+                except Exception as e:
+                    logger.error(f"Internal message handler failed: {e}")
+            return
+        for handler in list(self.handlers):
+            try:
+                await handler(event["message"], event.get("topics"), event.get("coalesce_key"))
+            except Exception as e:
+                logger.error(f"Event handler failed: {e}")
+
+    def _receive(self, payload: bytes) -> None:
+        """Schedules delivery of an envelope received from another worker."""
+        try:
+            event = json.loads(payload)
+        except ValueError as e:
+            logger.warning(f"Discarding malformed event: {e}")
+            return
+        if event.get("origin") == self.origin:
+            return  # Our own event, already delivered locally
+        event = self._resolve(event)
+        if event is not None:
+            asyncio.get_running_loop().create_task(self._deliver(event))
+
+    def _resolve(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The full envelope of a received event, for transports that send references; None drops it."""
+        return event
+
+
+class UnixSocketEventBus(EventBus):
+    crosses_workers = True
+
+    def __init__(self, socket_dir: str):
+        super().__init__()
+        self.socket_dir = socket_dir
+        self.path = os.path.join(socket_dir, f"worker-{self.origin}.sock")
+        self._socket: Optional[socket.socket] = None
+
+    async def start(self) -> None:
+        os.makedirs(self.socket_dir, exist_ok=True)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, UNIX_MAX_DATAGRAM * 2)
+        self._socket.bind(self.path)
+        self._socket.setblocking(False)
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), self._on_readable)
+        logger.info(f"Event bus listening on {self.path}")
+
+    async def stop(self) -> None:
+        if self._socket is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._socket.fileno())
+        self._socket.close()
+        self._socket = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _on_readable(self) -> None:
+        while self._socket is not None:
+            try:
+                payload = self._socket.recv(UNIX_MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            self._receive(payload)
+
+    def _peers(self) -> List[str]:
+        try:
+            names = os.listdir(self.socket_dir)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.socket_dir, name) for name in names
+                if name.startswith("worker-") and name.endswith(".sock")
+                and os.path.join(self.socket_dir, name) != self.path]
+
+    async def _send(self, event: Dict[str, Any]) -> None:
+        if self._socket is None:
+            return
+        payload = dumps(event)
+        if len(payload) > UNIX_MAX_DATAGRAM:
+            logger.warning(f"Event of {len(payload)} bytes is too large to forward to other workers")
+            return
+        for peer in self._peers():
+            try:
+                self._socket.sendto(payload, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Left behind by a worker that exited without cleaning up
+                try:
+                    os.unlink(peer)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                logger.warning(f"Event dropped for {peer}: worker is not reading its socket")
+
+
+class PostgresEventBus(EventBus):
+    crosses_workers = True
+
+    def __init__(self, database_url: str):
+        super().__init__()
+        self.database_url = database_url
+        self._listen_conn = None
+        self._notify_conn = None
+        self._notify_lock = asyncio.Lock()
+
+    def _connect(self):
+        try:
+            import psycopg2
+            import psycopg2.extensions
+        except ImportError as e:
+            raise RuntimeError("EVENT_BUS_BACKEND=postgres requires psycopg2") from e
+        from sqlalchemy.engine import make_url
+        dsn = make_url(self.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        return conn
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._listen_conn = await loop.run_in_executor(None, self._connect)
+        self._notify_conn = await loop.run_in_executor(None, self._connect)
+        with self._listen_conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {POSTGRES_CHANNEL}")
+        loop.add_reader(self._listen_conn.fileno(), self._on_readable)
+        logger.info(f"Event bus listening on PostgreSQL channel {POSTGRES_CHANNEL}")
+
+    async def stop(self) -> None:
+        if self._listen_conn is not None:
+            asyncio.get_running_loop().remove_reader(self._listen_conn.fileno())
+            self._listen_conn.close()
+            self._listen_conn = None
+        if self._notify_conn is not None:
+            self._notify_conn.close()
+            self._notify_conn = None
+
+    def _on_readable(self) -> None:
+        self._listen_conn.poll()
+        while self._listen_conn.notifies:
+            notification = self._listen_conn.notifies.pop(0)
+            self._receive(notification.payload.encode("utf-8"))
+
+    def _notify(self, payload: str) -> None:
+        with self._notify_conn.cursor() as cursor:
+            if len(payload.encode("utf-8")) > POSTGRES_MAX_PAYLOAD:
+                # Too large for NOTIFY: store it and notify its id. The connection autocommits,
+                # so the row is visible before the notification is.
+                cursor.execute(
+                    f"DELETE FROM {EventBusPayload.__tablename__} WHERE created_at < now() - %s * interval '1 second'",
+                    (POSTGRES_PAYLOAD_RETENTION_SECONDS,)
+                )
+                cursor.execute(f"INSERT INTO {EventBusPayload.__tablename__} (payload) VALUES (%s) RETURNING id",
+                               (payload,))
+                payload = json.dumps({"origin": self.origin, "payload_id": cursor.fetchone()[0]})
+            cursor.execute("SELECT pg_notify(%s, %s)", (POSTGRES_CHANNEL, payload))
+
+    async def _send(self, event: Dict[str, Any]) -> None:
+        if self._notify_conn is None:
+            return
+        payload = dumps(event)
+        # One connection, one statement at a time
+        async with self._notify_lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._notify, payload.decode("utf-8"))
+
+    def _resolve(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if "payload_id" not in event:
+            return event
+        # Read on the listening connection, in notification order; a primary key lookup
+        with self._listen_conn.cursor() as cursor:
+            cursor.execute(f"SELECT payload FROM {EventBusPayload.__tablename__} WHERE id = %s",
+                           (event["payload_id"],))
+            row = cursor.fetchone()
+        if row is None:
+            logger.warning(f"Stored event {event['payload_id']} was already deleted; not delivered")
+            return None
+        return json.loads(row[0])
+
+
+def create_event_bus(backend: Optional[str] = None) -> EventBus:
+    """Builds the bus selected by EVENT_BUS_BACKEND (memory, unix or postgres)."""
+    backend = (backend or os.getenv("EVENT_BUS_BACKEND", "memory")).lower()
+    if backend == "memory":
+        return EventBus()
+    if backend == "unix":
+        return UnixSocketEventBus(os.getenv("EVENT_BUS_SOCKET_DIR", "/tmp/pulseway-events"))
+    if backend == "postgres":
+        database_url = os.getenv("EVENT_BUS_DATABASE_URL") or os.getenv("DATABASE_URL", "")
+        if not database_url.startswith("postgresql"):
+            raise ValueError("EVENT_BUS_BACKEND=postgres needs a postgresql:// DATABASE_URL or EVENT_BUS_DATABASE_URL")
+        return PostgresEventBus(database_url)
+    raise ValueError(f"Unknown EVENT_BUS_BACKEND: {backend!r}")
+
+
+# Process-wide bus; started in the application lifespan
+event_bus = create_event_bus()
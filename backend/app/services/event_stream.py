@@ -0,0 +1,177 @@
+# backend/app/services/event_stream.py
+"""
+Server-Sent Events feed of the real-time messages sent to /ws.
+
+EventStreamHub is a second handler on the event bus next to the WebSocket
+ConnectionManager, so both see the same messages. Every message gets an id
+``<epoch>-<sequence>`` and is kept in a bounded replay buffer; a client that
+reconnects with Last-Event-ID is sent what it missed, or an ``event: reset``
+when the id is older than the buffer or from another worker or process
+lifetime (the client should then reload). Each stream has its own bounded
+queue; a stream that falls behind is closed and resumes from the buffer on
+reconnect. Messages arriving together are written in one flush.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Iterable, List, Optional, Set, Tuple
+from ..metrics import CallbackGauge
+from ..responses import dumps_text
+from .event_bus import EventBus, event_bus
+from .realtime import scope_wildcard
+
+logger = logging.getLogger(__name__)
+
+REPLAY_BUFFER_SIZE = int(os.getenv("SSE_REPLAY_BUFFER_SIZE", "1000"))
+STREAM_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "512"))
+FLUSH_INTERVAL_SECONDS = float(os.getenv("SSE_FLUSH_INTERVAL_SECONDS", "0.1"))
+KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+RETRY_MILLISECONDS = 3000
+
+
+@dataclass(frozen=True)
+class StreamEvent:
+    seq: int
+    id: str
+    event: str
+    topics: Optional[Tuple[str, ...]]
+    data: str
+
+    def encode(self) -> str:
+        # dumps_text emits compact JSON, which never contains a raw newline
+        return f"id: {self.id}\nevent: {self.event}\ndata: {self.data}\n\n"
+
+
+def topics_match(subscribed: Optional[Set[str]], topics: Optional[Iterable[str]]) -> bool:
+    """Whether an event for ``topics`` (None: everyone) reaches a stream filtered on ``subscribed`` (None: all)."""
+    if subscribed is None or topics is None:
+        return True
+    for topic in topics:
+        if topic in subscribed or scope_wildcard(topic) in subscribed:
+            return True
+    return False
+
+
+class StreamSubscriber:
+    def __init__(self, topics: Optional[Set[str]], max_queue: int = STREAM_QUEUE_SIZE):
+        self.topics = topics
+        self.max_queue = max(1, max_queue)
+        self._pending: Deque[StreamEvent] = deque()
+        self._wakeup = asyncio.Event()
+        self.closed = False
+
+    def offer(self, event: StreamEvent) -> bool:
+        """Queues an event; False when the queue is full."""
+        if len(self._pending) >= self.max_queue:
+            return False
+        self._pending.append(event)
+        self._wakeup.set()
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Waits for events (or close); False on timeout."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._wakeup.clear()
+        return True
+
+    def drain(self) -> List[StreamEvent]:
+        events = list(self._pending)
+        self._pending.clear()
+        return events
+
+
+class EventStreamHub:
+    def __init__(self, bus: Optional[EventBus] = None, replay_size: int = REPLAY_BUFFER_SIZE,
+                 max_queue: int = STREAM_QUEUE_SIZE):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.max_queue = max_queue
+        self._seq = 0
+        self._buffer: Deque[StreamEvent] = deque(maxlen=max(1, replay_size))
+        self.subscribers: Set[StreamSubscriber] = set()
+        if bus is not None:
+            bus.add_handler(self.deliver)
+
+    async def deliver(self, message: dict, topics: Optional[List[str]] = None,
+                      coalesce_key: Optional[str] = None) -> None:
+        self._seq += 1
+        event = StreamEvent(
+            seq=self._seq,
+            id=f"{self.epoch}-{self._seq}",
+            event=str(message.get("type") or "message"),
+            topics=tuple(topics) if topics is not None else None,
+            data=dumps_text(message),
+        )
+        self._buffer.append(event)
+        for subscriber in list(self.subscribers):
+            if not topics_match(subscriber.topics, event.topics):
+                continue
+            if not subscriber.offer(event):
+                logger.warning(f"Closing event stream: queue full ({subscriber.max_queue} events)")
+                self.unsubscribe(subscriber)
+                subscriber.close()
+
+    def _parse_event_id(self, last_event_id: Optional[str]) -> Optional[int]:
+        if not last_event_id:
+            return None
+        epoch, _, seq = last_event_id.rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return -1
+        return int(seq)
+
+    def subscribe(self, topics: Optional[Set[str]],
+                  last_event_id: Optional[str] = None) -> Tuple[StreamSubscriber, List[StreamEvent], bool]:
+        """Registers a stream; returns it, the events to replay and whether the client must reset."""
+        subscriber = StreamSubscriber(topics, self.max_queue)
+        self.subscribers.add(subscriber)
+
+        last_seq = self._parse_event_id(last_event_id)
+        if last_seq is None:
+            return subscriber, [], False
+        oldest_seq = self._buffer[0].seq if self._buffer else self._seq + 1
+        if last_seq < 0 or last_seq > self._seq or last_seq < oldest_seq - 1:
+            return subscriber, [], True
+        replay = [event for event in self._buffer
+                  if event.seq > last_seq and topics_match(topics, event.topics)]
+        return subscriber, replay, False
+
+    def unsubscribe(self, subscriber: StreamSubscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    async def stream(self, topics: Optional[Set[str]], last_event_id: Optional[str] = None,
+                     flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                     keepalive: float = KEEPALIVE_SECONDS) -> AsyncIterator[str]:
+        """Yields text/event-stream chunks until the client disconnects or falls behind."""
+        subscriber, replay, reset = self.subscribe(topics, last_event_id)
+        try:
+            head = f"retry: {RETRY_MILLISECONDS}\n\n"
+            if reset:
+                head += f"id: {self.epoch}-{self._seq}\nevent: reset\ndata: {{}}\n\n"
+            yield head + "".join(event.encode() for event in replay)
+
+            while not subscriber.closed:
+                if not await subscriber.wait(keepalive):
+                    yield ": keepalive\n\n"
+                    continue
+                if flush_interval > 0:
+                    await asyncio.sleep(flush_interval)  # Let a burst collect into one write
+                events = subscriber.drain()
+                if events:
+                    yield "".join(event.encode() for event in events)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+# Process-wide hub fed by the same bus as the WebSocket manager
+event_stream_hub = EventStreamHub(bus=event_bus)
+
+CallbackGauge("event_streams", "Open Server-Sent Events streams.", (), lambda: [((), len(event_stream_hub.subscribers))])
@@ -0,0 +1,273 @@
+# backend/app/services/execution_cache.py
+"""
+Local cache in front of Pulseway's script execution endpoints.
+
+Executions are stored in the ``executions`` table. Details of an execution in a
+terminal state (Successful, Failed, Stopped) never change, so once read they are
+served locally forever; a Running execution is re-read after
+EXECUTION_CACHE_TTL_SECONDS. Execution list pages are kept in memory for the same
+TTL as the ids they contained and rendered from the table, so states updated by
+webhooks show up without another API call. Starting a run or receiving a webhook
+drops the cached pages of that script/device pair.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..models.database import Execution
+from ..pulseway.client import (
+    PulsewayAPIError, PulsewayAuthenticationError, PulsewayClient, PulsewayClientError,
+    PulsewayNotFoundError, PulsewayPermissionError
+)
+
+logger = logging.getLogger(__name__)
+
+# Errors the client raises for a failed call
+_PULSEWAY_ERRORS = (
+    PulsewayClientError, PulsewayAPIError, PulsewayAuthenticationError,
+    PulsewayPermissionError, PulsewayNotFoundError
+)
+
+TERMINAL_STATES = frozenset({"Successful", "Failed", "Stopped"})
+RUNNING = "Running"
+
+DEFAULT_TTL_SECONDS = float(os.getenv("EXECUTION_CACHE_TTL_SECONDS", "15"))
+REFRESH_CONCURRENCY = int(os.getenv("EXECUTION_REFRESH_CONCURRENCY", "4"))
+_MAX_CACHED_PAGES = 1024
+
+
+def parse_pulseway_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes for timezone-aware columns
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _get_script_execution(db: Session, script_id: str, device_id: str, execution_id: str) -> Optional[Execution]:
+    return db.query(Execution).filter(
+        Execution.kind == "script",
+        Execution.execution_id == execution_id,
+        Execution.device_identifier == device_id
+    ).first()
+
+
+def _upsert_script_execution(db: Session, script_id: str, device_id: str, execution_id: str,
+                             values: Dict[str, Any]) -> Execution:
+    execution = _get_script_execution(db, script_id, device_id, execution_id)
+    if execution is None:
+        execution = Execution(kind="script", execution_id=execution_id, entity_id=script_id,
+                              device_identifier=device_id)
+        db.add(execution)
+    for key, value in values.items():
+        setattr(execution, key, value)
+    return execution
+
+
+def _detail_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Execution columns from a ScriptExecutionDetail payload."""
+    exit_code = data.get('ExitCode')
+    return {
+        "start_time": parse_pulseway_timestamp(data.get('StartTime')),
+        "end_time": parse_pulseway_timestamp(data.get('EndTime')),
+        "duration_in_seconds": data.get('DurationInSeconds'),
+        "state": data.get('State'),
+        "output": data.get('Output'),
+        "exit_code": str(exit_code) if exit_code is not None else None,
+        "variable_outputs": data.get('VariableOutputs'),
+        "details_fetched_at": datetime.now(timezone.utc),
+    }
+
+
+def execution_summary(execution: Execution) -> Dict[str, Any]:
+    """Execution as an item of Pulseway's execution list (same keys)."""
+    return {
+        "Id": execution.execution_id,
+        "StartTime": _as_utc(execution.start_time).isoformat() if execution.start_time else None,
+        "DurationInSeconds": execution.duration_in_seconds,
+        "State": execution.state,
+    }
+
+
+def execution_detail(execution: Execution) -> Dict[str, Any]:
+    """Execution as ScriptExecutionDetail fields."""
+    return {
+        "id": execution.execution_id,
+        "start_time": execution.start_time,
+        "duration_in_seconds": execution.duration_in_seconds,
+        "state": execution.state,
+        "end_time": execution.end_time,
+        "output": execution.output,
+        "exit_code": execution.exit_code,
+        "variable_outputs": execution.variable_outputs,
+    }
+
+
+def record_started_executions(db: Session, script_id: str, started: Iterable[Tuple[str, str]]) -> None:
+    """Stores (device_id, execution_id) pairs of runs this backend just started as Running.
+
+    Runs in the caller's transaction; the caller commits.
+    """
+    for device_id, execution_id in started:
+        if _get_script_execution(db, script_id, device_id, execution_id) is None:
+            db.add(Execution(kind="script", execution_id=execution_id, entity_id=script_id,
+                             device_identifier=device_id, state=RUNNING))
+        execution_cache.invalidate(script_id, device_id)
+
+
+class ExecutionCache:
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_pages: int = _MAX_CACHED_PAGES):
+        self.ttl_seconds = ttl_seconds
+        self.max_pages = max_pages
+        # (script_id, device_id, top, skip) -> (fetched at, execution ids, total count)
+        self._pages: "OrderedDict[Tuple[str, str, int, int], Tuple[float, List[str], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, script_id: Optional[str], device_id: Optional[str]) -> None:
+        with self._lock:
+            for key in [key for key in self._pages if key[0] == script_id and key[1] == device_id]:
+                del self._pages[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+
+    def _cached_page(self, key) -> Optional[Tuple[List[str], int]]:
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None:
+                return None
+            fetched_at, ids, total = entry
+            if time.monotonic() - fetched_at > self.ttl_seconds:
+                del self._pages[key]
+                return None
+            self._pages.move_to_end(key)
+            return ids, total
+
+    def _store_page(self, key, ids: List[str], total: int) -> None:
+        with self._lock:
+            self._pages[key] = (time.monotonic(), ids, total)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+    @staticmethod
+    def _load(db: Session, device_id: str, execution_ids: List[str]) -> Dict[str, Execution]:
+        if not execution_ids:
+            return {}
+        return {
+            execution.execution_id: execution
+            for execution in db.query(Execution).filter(
+                Execution.kind == "script",
+                Execution.device_identifier == device_id,
+                Execution.execution_id.in_(execution_ids)
+            )
+        }
+
+    def list_script_executions(self, db: Session, client: PulsewayClient, script_id: str, device_id: str,
+                               top: int = 20, skip: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Returns (executions in Pulseway's list format, total count), calling Pulseway at most once per TTL."""
+        key = (script_id, device_id, top, skip)
+        cached = self._cached_page(key)
+        if cached is None:
+            response = client.get_script_executions(script_id=script_id, device_id=device_id, top=top, skip=skip)
+            items = [item for item in (response.get('Data', []) or []) if item.get('Id')]
+            ids = [str(item['Id']) for item in items]
+            existing = self._load(db, device_id, ids)
+            for execution_id, item in zip(ids, items):
+                execution = existing.get(execution_id)
+                if execution is None:
+                    execution = existing[execution_id] = Execution(
+                        kind="script", execution_id=execution_id, entity_id=script_id, device_identifier=device_id
+                    )
+                    db.add(execution)
+                if execution.state != item.get('State'):
+                    execution.details_fetched_at = None  # Cached output predates the state change
+                execution.start_time = parse_pulseway_timestamp(item.get('StartTime'))
+                execution.duration_in_seconds = item.get('DurationInSeconds')
+                execution.state = item.get('State')
+            db.commit()
+            total = (response.get('Meta') or {}).get('TotalCount', len(items))
+            self._store_page(key, ids, total)
+        else:
+            ids, total = cached
+
+        rows = self._load(db, device_id, ids)
+        return [execution_summary(rows[execution_id]) for execution_id in ids if execution_id in rows], total
+
+    def get_script_execution_details(self, db: Session, client: PulsewayClient, script_id: str, device_id: str,
+                                     execution_id: str) -> Optional[Dict[str, Any]]:
+        """Returns ScriptExecutionDetail fields, or None when Pulseway has no such execution."""
+        execution = _get_script_execution(db, script_id, device_id, execution_id)
+        if execution is not None and execution.details_fetched_at is not None:
+            if execution.state in TERMINAL_STATES:
+                return execution_detail(execution)
+            age = datetime.now(timezone.utc) - _as_utc(execution.details_fetched_at)
+            if age <= timedelta(seconds=self.ttl_seconds):
+                return execution_detail(execution)
+
+        response = client.get_script_execution_details(script_id=script_id, device_id=device_id,
+                                                       execution_id=execution_id)
+        data = response.get('Data', {})
+        if not data:
+            return None
+        execution = _upsert_script_execution(db, script_id, device_id, execution_id, _detail_values(data))
+        db.commit()
+        return execution_detail(execution)
+
+    def stale_before(self) -> datetime:
+        """Running executions whose details were read before this are due for another read."""
+        return datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+
+    def refresh_script_execution_details(self, db: Session, client: PulsewayClient, script_id: str,
+                                         executions: List[Tuple[str, str]],
+                                         concurrency: int = REFRESH_CONCURRENCY) -> int:
+        """Re-reads the details of (device_id, execution_id) pairs, up to ``concurrency`` at a time.
+
+        Blocking. Failed reads are logged and skipped, leaving those rows as they were.
+        Returns the number of executions updated.
+        """
+        if not executions:
+            return 0
+
+        def read(execution: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+            device_id, execution_id = execution
+            try:
+                response = client.get_script_execution_details(script_id=script_id, device_id=device_id,
+                                                               execution_id=execution_id)
+                return response.get('Data') or None
+            except _PULSEWAY_ERRORS as e:
+                logger.warning(f"Could not refresh execution {execution_id} on device {device_id}: {e.detail}")
+            except Exception as e:
+                logger.error(f"Unexpected error refreshing execution {execution_id} on device {device_id}: {e}",
+                             exc_info=True)
+            return None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(executions))),
+                                thread_name_prefix="execution-refresh") as executor:
+            results = list(executor.map(read, executions))
+
+        refreshed = 0
+        for (device_id, execution_id), data in zip(executions, results):
+            if data:
+                _upsert_script_execution(db, script_id, device_id, execution_id, _detail_values(data))
+                refreshed += 1
+        db.commit()
+        return refreshed
+
+
+# Process-wide cache used by the scripts API
+execution_cache = ExecutionCache()
@@ -0,0 +1,152 @@
+# backend/app/services/execution_webhooks.py
+"""
+Pulseway execution webhooks.
+
+run_script, run_task and run_workflow accept a WebhookUrl; once a run finishes on
+a device Pulseway POSTs a small JSON body there (EventType, the script/task/
+workflow id, DeviceIdentifier or TargetId, ExecutionId and State or Status).
+Pulseway does not sign these requests, so the URL we hand out carries a shared
+secret (PULSEWAY_WEBHOOK_TOKEN) that the receiver checks in constant time.
+"""
+import hmac
+import os
+import uuid
+from typing import Any, Dict, Optional
+import requests
+from sqlalchemy.orm import Session
+from ..models.database import Execution
+from .execution_cache import execution_cache
+
+WEBHOOK_PATH = "/api/v1/webhooks/pulseway/executions"
+
+# EventType -> (kind, field holding the script/task/workflow id)
+EVENT_TYPES = {
+    "ScriptExecutionFinished": ("script", "ScriptId"),
+    "TaskExecutionFinished": ("task", "TaskId"),
+    "WorkflowExecutionFinished": ("workflow", "WorkflowId"),
+}
+
+# WebSocket message type and subscription event per kind
+BROADCAST_EVENTS = {
+    "script": ("SCRIPT_EXECUTION_UPDATE", "script_executions"),
+    "task": ("TASK_EXECUTION_UPDATE", "task_executions"),
+    "workflow": ("WORKFLOW_EXECUTION_UPDATE", "workflow_executions"),
+}
+
+# Workflow webhooks report Status (Success/Failed); scripts and tasks report State
+_WORKFLOW_STATES = {"Success": "Successful", "Failed": "Failed"}
+
+
+class InvalidWebhookPayload(ValueError):
+    pass
+
+
+def webhook_token() -> Optional[str]:
+    return os.getenv("PULSEWAY_WEBHOOK_TOKEN") or None
+
+
+def verify_webhook_token(token: Optional[str]) -> bool:
+    expected = webhook_token()
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+def default_webhook_url() -> Optional[str]:
+    """URL to pass as WebhookUrl when the caller gave none, if the receiver is configured.
+
+    PULSEWAY_WEBHOOK_BASE_URL is this backend's address as reachable from Pulseway.
+    """
+    base_url = os.getenv("PULSEWAY_WEBHOOK_BASE_URL")
+    token = webhook_token()
+    if not base_url or not token:
+        return None
+    return f"{base_url.rstrip('/')}{WEBHOOK_PATH}?token={token}"
+
+
+def parse_execution_webhook(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalizes a webhook body into Execution column values."""
+    event = EVENT_TYPES.get(payload.get("EventType"))
+    if event is None:
+        raise InvalidWebhookPayload(f"Unsupported EventType: {payload.get('EventType')!r}")
+    kind, entity_field = event
+    if payload.get("ExecutionId") in (None, ""):
+        raise InvalidWebhookPayload("ExecutionId is required")
+
+    if kind == "workflow":
+        device_identifier = payload.get("TargetId") if payload.get("TargetType", "Device") == "Device" else None
+        state = _WORKFLOW_STATES.get(payload.get("Status"), payload.get("Status"))
+    else:
+        device_identifier = payload.get("DeviceIdentifier")
+        state = payload.get("State")
+
+    entity_id = payload.get(entity_field)
+    return {
+        "kind": kind,
+        "execution_id": str(payload["ExecutionId"]),
+        "entity_id": str(entity_id) if entity_id is not None else None,
+        "device_identifier": device_identifier or "",
+        "state": state,
+        "payload": payload,
+    }
+
+
+def record_execution(db: Session, values: Dict[str, Any]) -> Execution:
+    """Inserts or updates the execution row (Pulseway may deliver a webhook more than once). Commits."""
+    execution = db.query(Execution).filter(
+        Execution.kind == values["kind"],
+        Execution.execution_id == values["execution_id"],
+        Execution.device_identifier == values["device_identifier"]
+    ).first()
+    if execution is None:
+        execution = Execution(**values)
+        db.add(execution)
+    else:
+        if execution.state != values["state"]:
+            execution.details_fetched_at = None  # Cached output predates the state change
+        for key, value in values.items():
+            setattr(execution, key, value)
+    db.commit()
+    if execution.kind == "script":
+        execution_cache.invalidate(execution.entity_id, execution.device_identifier)
+    return execution
+
+
+def execution_message(execution: Execution) -> Dict[str, Any]:
+    """WebSocket message announcing a finished execution."""
+    message_type, _ = BROADCAST_EVENTS[execution.kind]
+    return {
+        "type": message_type,
+        "execution": {
+            "kind": execution.kind,
+            "execution_id": execution.execution_id,
+            "entity_id": execution.entity_id,
+            "device_identifier": execution.device_identifier or None,
+            "state": execution.state,
+        },
+    }
+
+
+def build_test_payload(kind: str, entity_id: str, device_identifier: str,
+                       execution_id: Optional[str] = None, state: str = "Successful") -> Dict[str, Any]:
+    """A webhook body shaped like Pulseway's, for exercising the receiver locally."""
+    event_type = next(name for name, (event_kind, _) in EVENT_TYPES.items() if event_kind == kind)
+    entity_field = EVENT_TYPES[event_type][1]
+    execution_id = execution_id or str(uuid.uuid4())
+    if kind == "workflow":
+        status = next((status for status, mapped in _WORKFLOW_STATES.items() if mapped == state), state)
+        return {"EventType": event_type, entity_field: entity_id, "ExecutionId": execution_id,
+                "Status": status, "TargetType": "Device", "TargetId": device_identifier}
+    return {"EventType": event_type, entity_field: entity_id, "DeviceIdentifier": device_identifier,
+            "ExecutionId": execution_id, "State": state}
+
+
+def send_test_webhook(base_url: str, payload: Dict[str, Any], token: Optional[str] = None,
+                      timeout: float = 10.0) -> requests.Response:
+    """POSTs ``payload`` to the receiver at ``base_url`` the way Pulseway would."""
+    return requests.post(
+        f"{base_url.rstrip('/')}{WEBHOOK_PATH}",
+        params={"token": token or webhook_token() or ""},
+        json=payload,
+        timeout=timeout
+    )
@@ -0,0 +1,127 @@
+# backend/app/services/leadership.py
+"""
+Picks the one worker that owns the periodic Pulseway sync.
+
+Every worker runs the application lifespan, but only the holder of the sync
+lock schedules sync_all_data; the others keep retrying in the background and
+take over when the holder exits (the lock is released with its process).
+
+* FileLeaderLock: an exclusive flock on SYNC_LEADER_LOCK_FILE (default
+  pulseway-sync.lock in the system temp directory), for workers on one host and
+  `cli_tool.py sync now`. Without fcntl (Windows) there is a single worker and it
+  always leads.
+* PostgresLeaderLock: a session-level pg_try_advisory_lock, for workers spread
+  over hosts sharing a PostgreSQL database; needs psycopg2.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+from typing import Awaitable, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_try_advisory_lock
+SYNC_ADVISORY_LOCK_KEY = 0x50_57_53_59  # "PWSY"
+RETRY_SECONDS = float(os.getenv("SYNC_LEADER_RETRY_SECONDS", "30"))
+DEFAULT_LOCK_FILE = os.path.join(tempfile.gettempdir(), "pulseway-sync.lock")
+
+# Internal event bus message asking the leader for a manual sync (POST /api/sync on another worker)
+SYNC_REQUEST_MESSAGE = "sync.requested"
+
+
+class FileLeaderLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None or fcntl is None
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class PostgresLeaderLock:
+    def __init__(self, database_url: str, key: int = SYNC_ADVISORY_LOCK_KEY):
+        self.database_url = database_url
+        self.key = key
+        self._conn = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        try:
+            import psycopg2
+        except ImportError as e:
+            raise RuntimeError("A PostgreSQL sync leader lock requires psycopg2") from e
+        from sqlalchemy.engine import make_url
+        dsn = make_url(self.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.key,))
+            acquired = cursor.fetchone()[0]
+        if not acquired:
+            conn.close()
+            return False
+        # The lock lives as long as this connection
+        self._conn = conn
+        return True
+
+    def release(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def create_leader_lock():
+    """Advisory lock in PostgreSQL when the event bus runs there, else a lock file."""
+    if os.getenv("EVENT_BUS_BACKEND", "memory").lower() == "postgres":
+        database_url = os.getenv("EVENT_BUS_DATABASE_URL") or os.getenv("DATABASE_URL", "")
+        return PostgresLeaderLock(database_url)
+    return FileLeaderLock(os.getenv("SYNC_LEADER_LOCK_FILE") or DEFAULT_LOCK_FILE)
+
+
+async def wait_for_leadership(lock, on_acquired: Callable[[], Awaitable[None]],
+                              retry_seconds: float = RETRY_SECONDS) -> None:
+    """Retries ``lock`` until it is acquired, then awaits ``on_acquired``. Cancel to give up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            acquired = await loop.run_in_executor(None, lock.try_acquire)
+        except Exception as e:
+            logger.warning(f"Could not check the sync leader lock: {e}")
+            acquired = False
+        if acquired:
+            logger.info(f"Worker {os.getpid()} took over the sync schedule")
+            await on_acquired()
+            return
+        await asyncio.sleep(retry_seconds)
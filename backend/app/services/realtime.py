@@ -0,0 +1,365 @@
+# backend/app/services/realtime.py
+"""
+WebSocket fan-out shared by the API and background services.
+
+Clients connect to /ws and send {"type": "SUBSCRIBE", "events": [...]}; anything
+broadcast with one of those event types is pushed to them. Besides plain event
+types ("stats", "sync", ...) clients may subscribe to scoped topics such as
+``device:<identifier>`` or ``org:<id>``, or to every topic of a scope with
+``device:*``. Subscriptions are kept as an index from topic to connections, so
+a broadcast only visits the clients subscribed to it.
+
+Broadcasting never waits on a socket. Each message is serialized once and put
+on every recipient's bounded send queue, which a per-connection writer task
+drains, so one slow client cannot hold up the others. Messages broadcast with a
+``coalesce_key`` (periodic state such as stats) do not queue up: only the latest
+payload per key is kept until the writer gets to it. A client whose queue of
+other messages overflows, or whose socket stops accepting writes for
+WS_SEND_TIMEOUT_SECONDS, is disconnected with code 1013 and reconnects.
+
+With several workers, broadcasts travel over the event bus (see event_bus.py)
+so that clients connected to any worker receive them.
+
+Messages are JSON text frames unless the client asks for MessagePack in its
+SUBSCRIBE ({"type": "SUBSCRIBE", "events": [...], "encoding": "msgpack"}); the
+confirmation reports the encoding in effect, which stays JSON when msgpack is
+not installed. Frame compression is the permessage-deflate extension, agreed
+in the WebSocket handshake (uvicorn's --ws-per-message-deflate, on by default
+with the websockets implementation), so it applies to both encodings.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Union
+from fastapi import WebSocket, WebSocketDisconnect
+from ..metrics import CallbackGauge, Counter
+from ..responses import dumps_text, json_default
+from .event_bus import EventBus, event_bus
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; clients then stay on JSON
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+
+WILDCARD = "*"
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+
+WS_CLIENTS_DROPPED = Counter(
+    "websocket_clients_dropped_total", "WebSocket clients disconnected for falling behind.", ("reason",))
+
+# "Try Again Later": the client fell too far behind and should reconnect
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+def supported_encodings() -> List[str]:
+    return [ENCODING_JSON, ENCODING_MSGPACK] if msgpack is not None else [ENCODING_JSON]
+
+
+def encode_message(message: dict, encoding: str = ENCODING_JSON) -> Union[str, bytes]:
+    """Text frame payload for JSON, binary for MessagePack."""
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb(message, default=json_default, use_bin_type=True)
+    return dumps_text(message)
+
+
+def scope_wildcard(topic: str) -> Optional[str]:
+    """The wildcard covering a scoped topic ("device:*" for "device:<id>"), else None."""
+    scope, separator, key = topic.partition(":")
+    if not separator or key == WILDCARD:
+        return None
+    return f"{scope}:{WILDCARD}"
+
+
+class ClientConnection:
+    """Send side of one WebSocket: a bounded queue drained by a single writer task."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int = SEND_QUEUE_SIZE,
+                 send_timeout: float = SEND_TIMEOUT_SECONDS):
+        self.websocket = websocket
+        self.max_queue = max(1, max_queue)
+        self.send_timeout = send_timeout
+        self.encoding = ENCODING_JSON
+        self._pending: Deque[Union[str, bytes]] = deque()
+        self._latest: "OrderedDict[str, Union[str, bytes]]" = OrderedDict()  # coalesce key -> newest payload
+        self._wakeup = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+
+    @property
+    def backlog(self) -> int:
+        return len(self._pending) + len(self._latest)
+
+    def enqueue(self, payload: Union[str, bytes], coalesce_key: Optional[str] = None) -> bool:
+        """Queues a serialized message; False when the queue is full and the client should be dropped."""
+        if coalesce_key is not None:
+            self._latest[coalesce_key] = payload
+            self._latest.move_to_end(coalesce_key)
+        elif len(self._pending) >= self.max_queue:
+            return False
+        else:
+            self._pending.append(payload)
+        self._wakeup.set()
+        return True
+
+    def _next_payload(self) -> Union[str, bytes, None]:
+        if self._pending:
+            return self._pending.popleft()
+        if self._latest:
+            return self._latest.popitem(last=False)[1]
+        return None
+
+    async def run_writer(self) -> None:
+        """Sends queued payloads in order until cancelled; raises if the socket fails or stalls."""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            payload = self._next_payload()
+            while payload is not None:
+                send = self.websocket.send_text if isinstance(payload, str) else self.websocket.send_bytes
+                await asyncio.wait_for(send(payload), timeout=self.send_timeout)
+                payload = self._next_payload()
+
+
+class ConnectionManager:
+    def __init__(self, max_queue: int = SEND_QUEUE_SIZE, send_timeout: float = SEND_TIMEOUT_SECONDS,
+                 bus: Optional[EventBus] = None):
+        self.bus = bus
+        if bus is not None:
+            bus.add_handler(self.deliver)
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.subscriptions: Dict[WebSocket, Set[str]] = {}  # connection -> topics
+        self.subscribers: Dict[str, Set[WebSocket]] = {}  # topic -> connections
+        # event type -> coroutine returning the message a new subscriber starts from
+        self.snapshot_providers: Dict[str, Callable[[], Awaitable[Optional[Dict[str, Any]]]]] = {}
+        self._drop_tasks: Set[asyncio.Task] = set()  # Referenced until done so they are not garbage-collected
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        client = ClientConnection(websocket, self.max_queue, self.send_timeout)
+        client.writer = asyncio.create_task(self._write(client))
+        self.clients[websocket] = client
+        self.subscriptions[websocket] = set()
+        logger.info(f"Client connected. Total connections: {len(self.clients)}")
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client is not None and client.writer is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+        for topic in self.subscriptions.pop(websocket, ()):
+            self._remove_subscriber(topic, websocket)
+        if client is not None:
+            logger.info(f"Client disconnected. Total connections: {len(self.clients)}")
+
+    async def _write(self, client: ClientConnection):
+        try:
+            await client.run_writer()
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping WebSocket client: send stalled for {client.send_timeout}s")
+            WS_CLIENTS_DROPPED.labels("send_timeout").inc()
+            await self._drop(client)
+        except Exception as e:
+            logger.error(f"Error sending message to client: {e}")
+            self.disconnect(client.websocket)
+
+    async def _drop(self, client: ClientConnection):
+        """Disconnects a client that fell behind; it reconnects and resubscribes."""
+        self.disconnect(client.websocket)
+        try:
+            await client.websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        except Exception:
+            pass  # Already gone
+
+    def _drop_done(self, task: asyncio.Task) -> None:
+        self._drop_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Failed to drop WebSocket client: {task.exception()}")
+
+    def _enqueue(self, websocket: WebSocket, message: dict, coalesce_key: Optional[str] = None,
+                 payloads: Optional[Dict[str, Union[str, bytes]]] = None) -> None:
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        # Serialize once per encoding; the payload is identical for every recipient
+        payloads = payloads if payloads is not None else {}
+        payload = payloads.get(client.encoding)
+        if payload is None:
+            payload = payloads[client.encoding] = encode_message(message, client.encoding)
+        if not client.enqueue(payload, coalesce_key):
+            logger.warning(f"Dropping WebSocket client: send queue full ({client.max_queue} messages)")
+            WS_CLIENTS_DROPPED.labels("queue_full").inc()
+            if client.writer is not None:
+                client.writer.cancel()
+            task = asyncio.create_task(self._drop(client))
+            self._drop_tasks.add(task)
+            task.add_done_callback(self._drop_done)
+
+    async def send_personal_message(self, message: dict, websocket: WebSocket):
+        self._enqueue(websocket, message)
+
+    def set_encoding(self, websocket: WebSocket, encoding: Optional[str]) -> str:
+        """Switches a client to ``encoding`` if supported; returns the encoding in effect."""
+        client = self.clients.get(websocket)
+        if client is None:
+            return ENCODING_JSON
+        if encoding in supported_encodings():
+            client.encoding = encoding
+        return client.encoding
+
+    def _recipients(self, event_types: Iterable[str]) -> Set[WebSocket]:
+        recipients: Set[WebSocket] = set()
+        for topic in event_types:
+            recipients.update(self.subscribers.get(topic, ()))
+            wildcard = scope_wildcard(topic)
+            if wildcard is not None:
+                recipients.update(self.subscribers.get(wildcard, ()))
+        return recipients
+
+    async def broadcast(self, message: dict, event_type: Union[str, Iterable[str], None] = None,
+                        coalesce_key: Optional[str] = None):
+        """Broadcast message to all connected clients or filtered by subscription.
+
+        ``event_type`` may be a list of topics (e.g. ["devices", "device:<id>",
+        "org:<id>"]); a client subscribed to several of them gets the message once.
+        Only queues the message; ``coalesce_key`` marks it as latest-state that may
+        replace an unsent message with the same key. Goes through the event bus when
+        there is one, so the clients of the other workers receive it too.
+        """
+        topics = None
+        if event_type is not None:
+            topics = [event_type] if isinstance(event_type, str) else list(event_type)
+        if self.bus is not None:
+            await self.bus.publish(message, topics, coalesce_key)
+        else:
+            await self.deliver(message, topics, coalesce_key)
+
+    async def deliver(self, message: dict, topics: Optional[List[str]] = None,
+                      coalesce_key: Optional[str] = None):
+        """Queues a message for the matching clients of this worker."""
+        recipients = list(self.clients) if topics is None else self._recipients(topics)
+        payloads: Dict[str, Union[str, bytes]] = {}
+        for connection in recipients:
+            self._enqueue(connection, message, coalesce_key, payloads)
+
+    async def subscribe(self, websocket: WebSocket, event_types: List[str]):
+        """Subscribe client to specific event types (subscribing again is a no-op)"""
+        topics = self.subscriptions.setdefault(websocket, set())
+        for topic in event_types:
+            if isinstance(topic, str) and topic not in topics:
+                topics.add(topic)
+                self.subscribers.setdefault(topic, set()).add(websocket)
+
+    async def unsubscribe(self, websocket: WebSocket, event_types: List[str]):
+        topics = self.subscriptions.get(websocket, set())
+        for topic in event_types:
+            if topic in topics:
+                topics.discard(topic)
+                self._remove_subscriber(topic, websocket)
+
+    def _remove_subscriber(self, topic: str, websocket: WebSocket):
+        connections = self.subscribers.get(topic)
+        if connections is not None:
+            connections.discard(websocket)
+            if not connections:
+                del self.subscribers[topic]
+
+    def has_scope_subscribers(self, scope: str) -> bool:
+        """Whether anyone subscribed to a ``<scope>:...`` topic."""
+        prefix = f"{scope}:"
+        return any(topic.startswith(prefix) for topic in self.subscribers)
+
+    def register_snapshot(self, event_type: str,
+                          provider: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> None:
+        self.snapshot_providers[event_type] = provider
+
+    async def send_snapshots(self, websocket: WebSocket, event_types: List[str]):
+        """Sends the registered snapshot of each newly subscribed event type."""
+        for event_type in event_types:
+            provider = self.snapshot_providers.get(event_type)
+            if provider is None:
+                continue
+            try:
+                snapshot = await provider()
+            except Exception as e:
+                logger.error(f"Failed to build {event_type} snapshot: {e}")
+                continue
+            if snapshot is not None:
+                await self.send_personal_message(snapshot, websocket)
+
+    def subscriber_count(self, event_type: str) -> int:
+        """Number of clients a broadcast to ``event_type`` would reach."""
+        return len(self._recipients([event_type]))
+
+
+# Process-wide manager; every /ws endpoint and broadcaster goes through it
+manager = ConnectionManager(bus=event_bus)
+
+
+def _send_queue_depths():
+    backlogs = [client.backlog for client in list(manager.clients.values())]
+    return [(("sum",), sum(backlogs)), (("max",), max(backlogs, default=0))]
+
+
+CallbackGauge("websocket_connections", "Open WebSocket connections.", (), lambda: [((), len(manager.clients))])
+CallbackGauge(
+    "websocket_send_queue_depth", "Messages waiting in WebSocket send queues, summed and for the fullest client.",
+    ("aggregate",), _send_queue_depths)
+
+
+async def handle_websocket(websocket: WebSocket, connection_manager: ConnectionManager = manager):
+    """Serves one /ws connection: subscriptions and ping/pong until the client goes away."""
+    await connection_manager.connect(websocket)
+    try:
+        while True:
+            # Receive client messages
+            data = await websocket.receive_text()
+            message = json.loads(data)
+
+            # Handle subscription requests
+            if message.get("type") == "SUBSCRIBE":
+                event_types = message.get("events", [])
+                await connection_manager.subscribe(websocket, event_types)
+                encoding = connection_manager.set_encoding(websocket, message.get("encoding"))
+                await connection_manager.send_personal_message({
+                    "type": "SUBSCRIPTION_CONFIRMED",
+                    "events": event_types,
+                    "encoding": encoding
+                }, websocket)
+                await connection_manager.send_snapshots(websocket, event_types)
+
+            elif message.get("type") == "UNSUBSCRIBE":
+                event_types = message.get("events", [])
+                await connection_manager.unsubscribe(websocket, event_types)
+                await connection_manager.send_personal_message({
+                    "type": "UNSUBSCRIPTION_CONFIRMED",
+                    "events": event_types
+                }, websocket)
+
+            # Handle ping/pong for connection health
+            elif message.get("type") == "PING":
+                await connection_manager.send_personal_message({
+                    "type": "PONG",
+                    "timestamp": datetime.now().isoformat()
+                }, websocket)
+
+    except WebSocketDisconnect:
+        connection_manager.disconnect(websocket)
+    except Exception as e:
+        logger.error(f"WebSocket error: {e}")
+        connection_manager.disconnect(websocket)
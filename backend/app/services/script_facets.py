@@ -0,0 +1,93 @@
+# backend/app/services/script_facets.py
+"""
+Script platform/category facets.
+
+Script.platforms is a JSON array, which no database can index usefully for
+"scripts that run on Windows". sync_scripts copies each platform and the
+category name into ``script_facets`` rows keyed by (facet, lowercased value,
+script id), so filtering and listing the distinct values walk that primary key.
+"""
+from typing import Iterable, List, Optional
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from ..models.database import Script, ScriptFacet
+
+PLATFORM = "platform"
+CATEGORY = "category"
+
+_IN_CHUNK_SIZE = 500
+
+
+def _facet_rows(script_id: str, platforms, category_name: Optional[str]) -> List[dict]:
+    values = []
+    if isinstance(platforms, str):
+        platforms = [platforms]
+    for platform in platforms or ():
+        if isinstance(platform, str) and platform.strip():
+            values.append((PLATFORM, platform.strip()))
+    if category_name and category_name.strip():
+        values.append((CATEGORY, category_name.strip()))
+
+    rows = {}
+    for facet, value in values:
+        rows.setdefault((facet, value.lower()), value)
+    return [
+        {"facet": facet, "value_key": value_key, "script_id": script_id, "value": value}
+        for (facet, value_key), value in rows.items()
+    ]
+
+
+def _insert_facets(db: Session, scripts) -> int:
+    rows = []
+    for script_id, platforms, category_name in scripts:
+        rows.extend(_facet_rows(script_id, platforms, category_name))
+    if rows:
+        db.execute(insert(ScriptFacet), rows)
+    return len(rows)
+
+
+def index_script_facets(db: Session, script_ids: Optional[Iterable[str]] = None) -> int:
+    """(Re)builds facets for the given scripts, or for every script when ``script_ids`` is None.
+
+    Runs in the caller's transaction; the caller commits. Returns the number of facet rows written.
+    """
+    db.flush()
+    columns = (Script.id, Script.platforms, Script.category_name)
+    if script_ids is None:
+        db.query(ScriptFacet).delete(synchronize_session=False)
+        return _insert_facets(db, db.query(*columns).all())
+
+    keys = list(dict.fromkeys(script_ids))
+    count = 0
+    for start in range(0, len(keys), _IN_CHUNK_SIZE):
+        chunk = keys[start:start + _IN_CHUNK_SIZE]
+        db.query(ScriptFacet).filter(ScriptFacet.script_id.in_(chunk)).delete(synchronize_session=False)
+        count += _insert_facets(db, db.query(*columns).filter(Script.id.in_(chunk)).all())
+    return count
+
+
+def rebuild_script_facets_if_empty(db: Session) -> int:
+    """Fills the facets on startup for databases synced before the table existed."""
+    if db.query(ScriptFacet.script_id).first() is not None:
+        return 0
+    if db.query(Script.id).first() is None:
+        return 0
+    count = index_script_facets(db)
+    db.commit()
+    return count
+
+
+def scripts_with_facet(facet: str, value: str):
+    """Subquery of script ids having ``value`` (case-insensitive) for ``facet``, for Script.id.in_()."""
+    return select(ScriptFacet.script_id).where(
+        ScriptFacet.facet == facet,
+        ScriptFacet.value_key == value.strip().lower()
+    )
+
+
+def list_facet_values(db: Session, facet: str) -> List[str]:
+    """Distinct values of one facet, sorted case-insensitively."""
+    rows = db.query(func.min(ScriptFacet.value)).filter(
+        ScriptFacet.facet == facet
+    ).group_by(ScriptFacet.value_key).order_by(ScriptFacet.value_key).all()
+    return [row[0] for row in rows]
@@ -0,0 +1,218 @@
+# backend/app/services/search_index.py
+"""
+Device search index.
+
+Searchable text for each device (name, description, IPs, organization/site/group
+names and asset tags) is denormalized into ``device_search_documents`` during sync.
+How it is indexed depends on the database:
+
+* SQLite: an FTS5 table with the trigram tokenizer (external content, kept in sync by
+  triggers). It serves substring matches like the old ILIKE '%term%' and ranks with bm25.
+* PostgreSQL: a pg_trgm GIN index on ``document``, ranked by word_similarity().
+* Anything else, or SQLite builds without FTS5 trigram support: ILIKE over the documents.
+"""
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import event, func, insert, inspect, or_, and_, text
+from sqlalchemy.orm import Session
+from ..models.database import Device, DeviceAsset, DeviceSearchDocument
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "device_search_fts"
+# bm25 column weights, in FTS column order: name, description, ip_addresses, locations, tags
+_BM25_WEIGHTS = "10.0, 2.0, 6.0, 3.0, 4.0"
+# Trigram indexes cannot serve terms shorter than this
+_MIN_INDEXED_TERM_LENGTH = 3
+_IN_CHUNK_SIZE = 500
+_INSERT_BATCH_SIZE = 1000
+
+_IP_PATTERN = re.compile(r"^[0-9A-Fa-f:.]+$")
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, ip_addresses, locations, tags,
+        content='device_search_documents', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS device_search_documents_ai AFTER INSERT ON device_search_documents BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, ip_addresses, locations, tags)
+        VALUES (new.id, new.name, new.description, new.ip_addresses, new.locations, new.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS device_search_documents_ad AFTER DELETE ON device_search_documents BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, ip_addresses, locations, tags)
+        VALUES ('delete', old.id, old.name, old.description, old.ip_addresses, old.locations, old.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS device_search_documents_au AFTER UPDATE ON device_search_documents BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, ip_addresses, locations, tags)
+        VALUES ('delete', old.id, old.name, old.description, old.ip_addresses, old.locations, old.tags);
+        INSERT INTO {FTS_TABLE}(rowid, name, description, ip_addresses, locations, tags)
+        VALUES (new.id, new.name, new.description, new.ip_addresses, new.locations, new.tags);
+    END""",
+]
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_device_search_documents_document_trgm "
+    "ON device_search_documents USING gin (document gin_trgm_ops)",
+]
+
+
+@event.listens_for(DeviceSearchDocument.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    """Creates the dialect-specific index whenever create_all() creates the documents table."""
+    statements = {"sqlite": _SQLITE_DDL, "postgresql": _POSTGRES_DDL}.get(connection.dialect.name)
+    if not statements:
+        return
+    try:
+        with connection.begin_nested():
+            for statement in statements:
+                connection.execute(text(statement))
+    except Exception as e:
+        # Missing FTS5/trigram support or pg_trgm permissions: searches fall back to ILIKE
+        logger.warning(f"Device search index unavailable, falling back to ILIKE: {e}")
+
+
+@event.listens_for(DeviceSearchDocument.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def search_backend(db: Session) -> str:
+    """Returns "fts5", "pg_trgm" or "like" for the session's database."""
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+    if dialect == "sqlite":
+        return "fts5" if inspect(bind).has_table(FTS_TABLE) else "like"
+    if dialect == "postgresql":
+        return "pg_trgm"
+    return "like"
+
+
+def _collect_strings(value: Any) -> Iterable[str]:
+    """Yields the string leaves of a JSON value (IP lists, tag lists...)."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _collect_strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _collect_strings(item)
+
+
+def extract_ip_addresses(*values: Any) -> List[str]:
+    """Returns the distinct IP-looking strings found in the given (JSON) values."""
+    ips = []
+    for value in values:
+        ips.extend(s for s in _collect_strings(value) if ("." in s or ":" in s) and _IP_PATTERN.match(s))
+    return list(dict.fromkeys(ips))
+
+
+def build_search_document(row) -> Dict[str, Any]:
+    """Builds the documents table values from a row selected with _DOCUMENT_COLUMNS."""
+    ip_addresses = " ".join(extract_ip_addresses(row.external_ip_address, row.local_ip_addresses,
+                                                 row.public_ip_address, row.ip_addresses))
+    locations = " ".join(v for v in (row.organization_name, row.site_name, row.group_name) if v)
+    tags = " ".join(_collect_strings(row.tags))
+    fields = {
+        "name": row.name or "",
+        "description": row.description or "",
+        "ip_addresses": ip_addresses,
+        "locations": locations,
+        "tags": tags,
+    }
+    fields["device_identifier"] = row.identifier
+    fields["document"] = " ".join(v for v in fields.values() if v).lower()
+    return fields
+
+
+_DOCUMENT_COLUMNS = (
+    Device.identifier, Device.name, Device.description, Device.external_ip_address, Device.local_ip_addresses,
+    Device.organization_name, Device.site_name, Device.group_name,
+    DeviceAsset.tags, DeviceAsset.public_ip_address, DeviceAsset.ip_addresses,
+)
+
+
+def _document_query(db: Session):
+    return db.query(*_DOCUMENT_COLUMNS).outerjoin(
+        DeviceAsset, DeviceAsset.device_identifier == Device.identifier
+    )
+
+
+def _insert_documents(db: Session, rows) -> int:
+    batch, count = [], 0
+    for row in rows:
+        batch.append(build_search_document(row))
+        if len(batch) >= _INSERT_BATCH_SIZE:
+            db.execute(insert(DeviceSearchDocument), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(DeviceSearchDocument), batch)
+        count += len(batch)
+    return count
+
+
+def index_devices(db: Session, identifiers: Optional[Iterable[str]] = None) -> int:
+    """(Re)indexes the given devices, or every device when ``identifiers`` is None.
+
+    Runs in the caller's transaction; the caller commits. Returns the number of documents written.
+    """
+    db.flush()  # Sessions are created with autoflush=False; make pending devices visible
+    if identifiers is None:
+        db.query(DeviceSearchDocument).delete(synchronize_session=False)
+        return _insert_documents(db, _document_query(db).yield_per(_INSERT_BATCH_SIZE))
+
+    keys = list(dict.fromkeys(identifiers))
+    count = 0
+    for start in range(0, len(keys), _IN_CHUNK_SIZE):
+        chunk = keys[start:start + _IN_CHUNK_SIZE]
+        db.query(DeviceSearchDocument).filter(
+            DeviceSearchDocument.device_identifier.in_(chunk)
+        ).delete(synchronize_session=False)
+        count += _insert_documents(db, _document_query(db).filter(Device.identifier.in_(chunk)).all())
+    return count
+
+
+def rebuild_search_index_if_empty(db: Session) -> int:
+    """Fills the index on startup for databases synced before the index existed."""
+    if db.query(DeviceSearchDocument.id).first() is not None:
+        return 0
+    if db.query(Device.identifier).first() is None:
+        return 0
+    count = index_devices(db)
+    db.commit()
+    return count
+
+
+def search_device_identifiers(db: Session, term: str, limit: int = 20) -> List[str]:
+    """Returns identifiers of devices matching every word of ``term``, best match first."""
+    words = term.split()
+    if not words:
+        return []
+    backend = search_backend(db)
+
+    if backend == "fts5" and all(len(word) >= _MIN_INDEXED_TERM_LENGTH for word in words):
+        match = " AND ".join('"{}"'.format(word.replace('"', '""')) for word in words)
+        rows = db.execute(text(
+            f"SELECT d.device_identifier FROM {FTS_TABLE} f "
+            f"JOIN device_search_documents d ON d.id = f.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match "
+            f"ORDER BY bm25({FTS_TABLE}, {_BM25_WEIGHTS}) LIMIT :limit"
+        ), {"match": match, "limit": limit})
+        return [row[0] for row in rows]
+
+    query = db.query(DeviceSearchDocument.device_identifier).filter(
+        and_(*[DeviceSearchDocument.document.ilike(f"%{word.lower()}%") for word in words])
+    )
+    if backend == "pg_trgm":
+        query = query.order_by(func.word_similarity(term.lower(), DeviceSearchDocument.document).desc())
+    else:
+        # Short words on SQLite: prefer devices whose name starts with the term
+        query = query.order_by(
+            or_(*[DeviceSearchDocument.name.ilike(f"{word}%") for word in words]).desc(),
+            DeviceSearchDocument.name
+        )
+    return [row[0] for row in query.limit(limit).all()]
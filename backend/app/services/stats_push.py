@@ -0,0 +1,201 @@
+# backend/app/services/stats_push.py
+"""
+Real-time stats pushed to WebSocket clients when synced data changes.
+
+DataSyncService calls StatsPublisher.publish after every sync stage. The change
+log id (see change_feed.current_change_token) is the data generation: when it
+has not moved since the last push nothing is queried or sent. Otherwise one
+aggregate query recomputes the fleet counters and clients subscribed to
+"stats" get a STATS_UPDATE carrying only the counters that changed plus the
+notifications that arrived since the last push. Devices named in the new change
+log entries are pushed as DEVICE_UPDATE / DEVICE_REMOVED to the clients
+subscribed to ``device:<identifier>`` or ``org:<organization id>``.
+
+A client subscribing to "stats" first receives the current counters in full
+(``"full": true``), so the deltas that follow always apply to a known base.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.database import ChangeLogEntry, Device, Notification
+from ..models.dto import DeviceDTO, DEVICE_SUMMARY_FIELDS
+from .change_feed import OPERATION_DELETE, current_change_token
+from .realtime import ConnectionManager, manager
+
+logger = logging.getLogger(__name__)
+
+STATS_EVENT = "stats"
+RECENT_NOTIFICATION_LIMIT = 5
+NEW_NOTIFICATION_LIMIT = 20
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+_IN_CHUNK_SIZE = 500
+
+_DEVICE_COLUMNS = [getattr(Device, field) for field in DEVICE_SUMMARY_FIELDS] + [Device.organization_id]
+
+
+def compute_stats(db: Session) -> Dict[str, int]:
+    """Fleet counters in one aggregate query."""
+    total, online, critical = db.query(
+        func.count(Device.identifier),
+        func.coalesce(func.sum(case((Device.is_online == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Device.critical_notifications > 0, 1), else_=0)), 0)
+    ).one()
+    return {
+        "total_devices": total,
+        "online_devices": online,
+        "offline_devices": total - online,
+        "critical_alerts": critical,
+    }
+
+
+def _notification_dict(notification: Notification) -> Dict[str, Any]:
+    return {
+        "id": notification.id,
+        "message": notification.message,
+        "priority": notification.priority,
+        "device_identifier": notification.device_identifier,
+        "datetime": notification.datetime.isoformat() if notification.datetime else None,
+    }
+
+
+class StatsPublisher:
+    def __init__(self, connection_manager: ConnectionManager = manager, session_factory=SessionLocal):
+        self.manager = connection_manager
+        self.session_factory = session_factory
+        self.token: Optional[int] = None  # Data generation of the last push
+        self.stats: Dict[str, Any] = {}
+        self.last_notification_id: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    def register(self) -> None:
+        """Sends new "stats" subscribers the current counters before any delta."""
+        self.manager.register_snapshot(STATS_EVENT, self.snapshot)
+
+    async def snapshot(self) -> Dict[str, Any]:
+        async with self._lock:
+            db = self.session_factory()
+            try:
+                if self.token is None:
+                    self._reset_baseline(db)
+                    data = dict(self.stats)
+                else:
+                    # Read afresh: the sync, and so the publishing, may run in another worker
+                    data = self._current_stats(db)
+            finally:
+                db.close()
+            return self._stats_message(data, [], full=True)
+
+    @staticmethod
+    def _current_stats(db: Session) -> Dict[str, Any]:
+        stats: Dict[str, Any] = compute_stats(db)
+        stats["recent_notifications"] = [
+            _notification_dict(n) for n in
+            db.query(Notification).order_by(Notification.datetime.desc()).limit(RECENT_NOTIFICATION_LIMIT)
+        ]
+        return stats
+
+    def _reset_baseline(self, db: Session) -> None:
+        self.token = current_change_token(db)
+        self.stats = self._current_stats(db)
+        self.last_notification_id = db.query(func.max(Notification.id)).scalar() or 0
+
+    def _stats_message(self, data: Dict[str, Any], new_notifications: List[Dict[str, Any]],
+                       full: bool = False) -> Dict[str, Any]:
+        if new_notifications:
+            data["new_notifications"] = new_notifications
+        return {
+            "type": "STATS_UPDATE",
+            "timestamp": datetime.now().isoformat(),
+            "token": str(self.token),
+            "full": full,
+            "data": data,
+        }
+
+    async def publish(self) -> bool:
+        """Pushes what changed since the last call; returns False when the data generation did not move."""
+        async with self._lock:
+            db = self.session_factory()
+            try:
+                token = current_change_token(db)
+                if self.token is None:
+                    # Nothing was pushed yet, so there is no base for a delta
+                    self._reset_baseline(db)
+                    return True
+                if token == self.token:
+                    return False
+                previous_token, self.token = self.token, token
+
+                await self._publish_stats(db)
+                await self._publish_device_changes(db, previous_token, token)
+                return True
+            finally:
+                db.close()
+
+    async def _publish_stats(self, db: Session) -> None:
+        stats = compute_stats(db)
+        changed = {key: value for key, value in stats.items() if self.stats.get(key) != value}
+        self.stats.update(changed)
+
+        new_notifications = []
+        if self.last_notification_id is not None:
+            new_notifications = [
+                _notification_dict(n) for n in
+                db.query(Notification).filter(Notification.id > self.last_notification_id)
+                .order_by(Notification.id.desc()).limit(NEW_NOTIFICATION_LIMIT)
+            ]
+        if new_notifications:
+            self.last_notification_id = new_notifications[0]["id"]
+            recent = new_notifications + self.stats.get("recent_notifications", [])
+            self.stats["recent_notifications"] = recent[:RECENT_NOTIFICATION_LIMIT]
+
+        if changed or new_notifications:
+            await self.manager.broadcast(self._stats_message(changed, new_notifications), STATS_EVENT)
+
+    def _may_have_device_subscribers(self) -> bool:
+        if self.manager.bus is not None and self.manager.bus.crosses_workers:
+            return True  # Subscribers of the other workers are not visible from here
+        return self.manager.has_scope_subscribers("device") or self.manager.has_scope_subscribers("org")
+
+    async def _publish_device_changes(self, db: Session, since: int, until: int) -> None:
+        if not self._may_have_device_subscribers():
+            return
+        final_ops: Dict[str, str] = {}
+        for entity_id, operation in db.query(ChangeLogEntry.entity_id, ChangeLogEntry.operation).filter(
+            ChangeLogEntry.id > since,
+            ChangeLogEntry.id <= until,
+            ChangeLogEntry.entity_type == "device"
+        ).order_by(ChangeLogEntry.id):
+            final_ops[entity_id] = operation
+
+        upserted = [identifier for identifier, op in final_ops.items() if op != OPERATION_DELETE]
+        found = set()
+        for start in range(0, len(upserted), _IN_CHUNK_SIZE):
+            for row in db.query(*_DEVICE_COLUMNS).filter(
+                Device.identifier.in_(upserted[start:start + _IN_CHUNK_SIZE])
+            ):
+                found.add(row.identifier)
+                topics = [f"device:{row.identifier}"]
+                if row.organization_id is not None:
+                    topics.append(f"org:{row.organization_id}")
+                await self.manager.broadcast({
+                    "type": "DEVICE_UPDATE",
+                    "token": str(until),
+                    "device": DeviceDTO.row_to_dict(row[:len(DEVICE_SUMMARY_FIELDS)]),
+                }, topics)
+
+        for identifier in final_ops:
+            if identifier not in found:
+                await self.manager.broadcast({
+                    "type": "DEVICE_REMOVED",
+                    "token": str(until),
+                    "identifier": identifier,
+                }, f"device:{identifier}")
+
+
+# Process-wide publisher fed by DataSyncService
+stats_publisher = StatsPublisher()
@@ -0,0 +1,270 @@
+# backend/app/services/suggest_index.py
+"""
+In-memory prefix index serving typeahead suggestions (GET /api/v1/suggest).
+
+Entries live in one sorted list of (key, ...) tuples per result type; a prefix
+lookup is a bisect to the first key >= prefix in each wanted type's list followed
+by a scan while keys still match, so a type filter is never crowded out by a
+prefix shared by many entries of another type.
+Each label is indexed under its full lowercased text and under every later word,
+so "serv" finds "Alpha Server". The index is loaded at startup and updated by
+DataSyncService after each stage commits. Every worker keeps its own index: the
+sync leader publishes what each stage refreshed on the event bus and the other
+workers re-read the same rows (SuggestIndexSync).
+"""
+import asyncio
+import bisect
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.database import Device, Group, Organization, Script, Site
+from .event_bus import EventBus, event_bus
+from .search_index import extract_ip_addresses
+
+logger = logging.getLogger(__name__)
+
+# "ip" suggestions point at the device owning the address
+SUGGEST_TYPES = ("device", "script", "organization", "site", "group", "ip")
+
+# Bounds on memory: total index keys and indexed label length
+DEFAULT_MAX_ENTRIES = 500_000
+_MAX_LABEL_LENGTH = 200
+_IN_CHUNK_SIZE = 500
+
+SUGGEST_REFRESH_MESSAGE = "suggest_index.refresh"
+# More changed devices than this are sent to the other workers as a full reload, keeping
+# the message well under the event bus payload limits
+_MAX_FORWARDED_DEVICES = 100
+
+
+def _keys_for_label(label: str) -> List[str]:
+    """Lowercased label plus each suffix starting at a word boundary."""
+    text = label[:_MAX_LABEL_LENGTH].lower().strip()
+    if not text:
+        return []
+    words = text.split()
+    return list(dict.fromkeys(" ".join(words[i:]) for i in range(len(words))))
+
+
+class SuggestIndex:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # Result type -> (key, result type, owner type, owner id), sorted. IP keys belong to
+        # a device item but are reported (and stored) with type "ip".
+        self._entries: Dict[str, List[Tuple[str, str, str, str]]] = {}
+        self._size = 0
+        self._labels: Dict[Tuple[str, str], str] = {}  # (type, id) -> display label
+        self._entries_by_item: Dict[Tuple[str, str], List[Tuple[str, str, str, str]]] = {}
+        self._lock = threading.Lock()
+        self.dropped = 0  # Items not indexed because max_entries was reached
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _item_entries(item: Tuple[str, str], label: str, ip_keys: Iterable[str]) -> List[Tuple[str, str, str, str]]:
+        entries = [(key, item[0], item[0], item[1]) for key in _keys_for_label(label)]
+        entries += [(ip.lower(), "ip", item[0], item[1]) for ip in dict.fromkeys(ip_keys) if ip]
+        return entries
+
+    def _remove_locked(self, item: Tuple[str, str]) -> None:
+        for entry in self._entries_by_item.pop(item, ()):
+            entries = self._entries.get(entry[1], [])
+            position = bisect.bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+                self._size -= 1
+        self._labels.pop(item, None)
+
+    def _add_locked(self, item: Tuple[str, str], label: str, entries: List[Tuple[str, str, str, str]],
+                    presorted: bool = False) -> None:
+        if not entries:
+            return
+        if self._size + len(entries) > self.max_entries:
+            if not self.dropped:
+                logger.warning(f"Suggest index full at {self.max_entries} entries; new items are not indexed.")
+            self.dropped += 1
+            return
+        for entry in entries:
+            by_type = self._entries.setdefault(entry[1], [])
+            if presorted:
+                by_type.append(entry)
+            else:
+                bisect.insort(by_type, entry)
+        self._size += len(entries)
+        self._entries_by_item[item] = entries
+        self._labels[item] = label[:_MAX_LABEL_LENGTH]
+
+    def upsert(self, entity_type: str, entity_id, label: Optional[str], ip_keys: Iterable[str] = ()) -> None:
+        """Adds or replaces one item. ``ip_keys`` are indexed verbatim and reported as type "ip"."""
+        item = (entity_type, str(entity_id))
+        entries = self._item_entries(item, label or "", ip_keys)
+        with self._lock:
+            self._remove_locked(item)
+            self._add_locked(item, label or "", entries)
+
+    def remove(self, entity_type: str, entity_id) -> None:
+        with self._lock:
+            self._remove_locked((entity_type, str(entity_id)))
+
+    def replace_type(self, entity_type: str, items: Iterable[Tuple[str, str]]) -> None:
+        """Replaces every item of one type with (id, label) pairs, e.g. after a full stage sync."""
+        prepared = []
+        for entity_id, label in items:
+            item = (entity_type, str(entity_id))
+            prepared.append((item, label or "", self._item_entries(item, label or "", ())))
+        with self._lock:
+            for item in [item for item in self._entries_by_item if item[0] == entity_type]:
+                self._remove_locked(item)
+            for item, label, entries in prepared:
+                self._add_locked(item, label, entries)
+
+    def bulk_load(self, items: Iterable[Tuple[str, str, str, Iterable[str]]]) -> None:
+        """Replaces the whole index from (type, id, label, ip_keys) tuples with a single sort.
+
+        The new index is built aside and swapped in, so lookups keep working meanwhile.
+        """
+        fresh = SuggestIndex(self.max_entries)
+        for entity_type, entity_id, label, ip_keys in items:
+            item = (entity_type, str(entity_id))
+            fresh._add_locked(item, label or "", self._item_entries(item, label or "", ip_keys), presorted=True)
+        for entries in fresh._entries.values():
+            entries.sort()
+        with self._lock:
+            self._entries, self._labels, self._entries_by_item = fresh._entries, fresh._labels, fresh._entries_by_item
+            self._size, self.dropped = fresh._size, fresh.dropped
+
+    def suggest(self, prefix: str, types: Optional[Iterable[str]] = None, limit: int = 10) -> List[Dict[str, str]]:
+        """Returns up to ``limit`` items with a key starting with ``prefix``, shortest key first."""
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return []
+        matches: Dict[Tuple[str, str, str], str] = {}
+        with self._lock:
+            wanted = list(dict.fromkeys(types)) if types else list(self._entries)
+            windows = []
+            for result_type in wanted:
+                entries = self._entries.get(result_type, [])
+                position = bisect.bisect_left(entries, (prefix,))
+                # Scan a bounded window per type so very common prefixes stay cheap
+                windows.append(entries[position:position + limit * 20])
+            labels = self._labels
+        for window in windows:
+            for key, result_type, owner_type, owner_id in window:
+                if not key.startswith(prefix):
+                    break
+                matches.setdefault((result_type, owner_type, owner_id), key)
+        ranked = sorted(matches.items(), key=lambda pair: (len(pair[1]), pair[1]))[:limit]
+        return [
+            {"type": result_type, "id": owner_id, "label": labels.get((owner_type, owner_id), ""), "match": key}
+            for (result_type, owner_type, owner_id), key in ranked
+        ]
+
+
+# Process-wide index used by the suggest API and maintained by DataSyncService
+suggest_index = SuggestIndex()
+
+_NAMED_TYPES = {
+    "script": (Script.id, Script.name),
+    "organization": (Organization.id, Organization.name),
+    "site": (Site.id, Site.name),
+    "group": (Group.id, Group.name),
+}
+
+_DEVICE_COLUMNS = (Device.identifier, Device.name, Device.external_ip_address, Device.local_ip_addresses)
+
+
+def _device_items(rows) -> Iterable[Tuple[str, str, str, List[str]]]:
+    for identifier, name, external_ip, local_ips in rows:
+        yield "device", identifier, name, extract_ip_addresses(external_ip, local_ips)
+
+
+def load_suggestions(db: Session, index: SuggestIndex = suggest_index) -> int:
+    """Rebuilds the whole index from the database. Returns the number of keys indexed."""
+    def items():
+        yield from _device_items(db.query(*_DEVICE_COLUMNS).yield_per(1000))
+        for entity_type, (id_column, name_column) in _NAMED_TYPES.items():
+            for entity_id, name in db.query(id_column, name_column).yield_per(1000):
+                yield entity_type, entity_id, name, ()
+    index.bulk_load(items())
+    return len(index)
+
+
+def refresh_device_suggestions(db: Session, identifiers: Iterable[str], index: SuggestIndex = suggest_index) -> None:
+    """Re-reads the given devices (name and IPs) into the index."""
+    keys = list(dict.fromkeys(identifiers))
+    for start in range(0, len(keys), _IN_CHUNK_SIZE):
+        rows = db.query(*_DEVICE_COLUMNS).filter(Device.identifier.in_(keys[start:start + _IN_CHUNK_SIZE])).all()
+        for entity_type, entity_id, label, ip_keys in _device_items(rows):
+            index.upsert(entity_type, entity_id, label, ip_keys)
+
+
+def refresh_named_suggestions(db: Session, entity_type: str, index: SuggestIndex = suggest_index) -> None:
+    """Reloads every script, organization, site or group name; these tables are small."""
+    id_column, name_column = _NAMED_TYPES[entity_type]
+    index.replace_type(entity_type, db.query(id_column, name_column).all())
+
+
+class SuggestIndexSync:
+    """Refreshes the index after a sync stage and has the other workers do the same.
+
+    DataSyncService calls refresh_devices / refresh_named as stages commit and awaits
+    publish after each stage; other workers receive the refreshes through apply.
+    """
+
+    def __init__(self, index: SuggestIndex = suggest_index, bus: Optional[EventBus] = None,
+                 session_factory=SessionLocal):
+        self.index = index
+        self.bus = bus
+        self.session_factory = session_factory
+        self._devices: Set[str] = set()
+        self._types: Set[str] = set()
+        if bus is not None:
+            bus.add_internal_handler(self.apply)
+
+    def refresh_devices(self, db: Session, identifiers: Iterable[str]) -> None:
+        identifiers = list(identifiers)
+        refresh_device_suggestions(db, identifiers, self.index)
+        self._devices.update(identifiers)
+
+    def refresh_named(self, db: Session, entity_type: str) -> None:
+        refresh_named_suggestions(db, entity_type, self.index)
+        self._types.add(entity_type)
+
+    async def publish(self) -> None:
+        """Sends the refreshes made since the last call to the other workers."""
+        if self.bus is None or not (self._devices or self._types):
+            return
+        message: Dict[str, Any] = {"type": SUGGEST_REFRESH_MESSAGE, "types": sorted(self._types)}
+        if len(self._devices) > _MAX_FORWARDED_DEVICES:
+            message["full"] = True
+        else:
+            message["devices"] = sorted(self._devices)
+        self._devices.clear()
+        self._types.clear()
+        await self.bus.publish_internal(message)
+
+    async def apply(self, message: Dict[str, Any]) -> None:
+        """Re-reads the rows another worker's sync refreshed (internal event bus handler)."""
+        if message.get("type") != SUGGEST_REFRESH_MESSAGE:
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self._apply, message)
+
+    def _apply(self, message: Dict[str, Any]) -> None:
+        db = self.session_factory()
+        try:
+            if message.get("full"):
+                load_suggestions(db, self.index)
+                return
+            refresh_device_suggestions(db, message.get("devices") or [], self.index)
+            for entity_type in message.get("types") or []:
+                if entity_type in _NAMED_TYPES:
+                    refresh_named_suggestions(db, entity_type, self.index)
+        finally:
+            db.close()
+
+
+# Process-wide sync of suggest_index with the other workers
+suggest_index_sync = SuggestIndexSync(suggest_index, bus=event_bus)
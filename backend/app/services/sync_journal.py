@@ -0,0 +1,104 @@
+# backend/app/services/sync_journal.py
+"""Journal of sync runs (sync_runs / sync_run_stages), read by GET /api/v1/sync/runs and `cli_tool.py sync`."""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from ..models.database import SyncRun, SyncRunStage
+from ..pulseway.client import ApiCallStats
+
+RUN_RUNNING = "running"
+RUN_SUCCEEDED = "succeeded"
+RUN_FAILED = "failed"
+RUN_INTERRUPTED = "interrupted"
+RUN_STATUSES = (RUN_RUNNING, RUN_SUCCEEDED, RUN_FAILED, RUN_INTERRUPTED)
+
+STAGE_SUCCEEDED = "succeeded"
+STAGE_FAILED = "failed"
+
+TRIGGER_SCHEDULED = "scheduled"
+TRIGGER_STARTUP = "startup"
+TRIGGER_MANUAL = "manual"
+RUN_TRIGGERS = (TRIGGER_SCHEDULED, TRIGGER_STARTUP, TRIGGER_MANUAL)
+
+# Row counters kept per stage and summed per run
+ROW_COUNTS = ("fetched", "created", "updated", "unchanged", "deleted")
+# Pulseway API counters kept per stage and summed per run, mapped from ApiCallStats attributes
+API_COUNTS = {
+    "api_calls": "calls",
+    "api_errors": "errors",
+    "bytes_received": "bytes_received",
+    "rate_limit_wait_seconds": "rate_limit_wait",
+}
+
+MAX_ERROR_LENGTH = 2000
+
+
+def start_run(db: Session, trigger: str = TRIGGER_SCHEDULED) -> int:
+    run = SyncRun(trigger=trigger, status=RUN_RUNNING, started_at=datetime.now(timezone.utc))
+    db.add(run)
+    db.commit()
+    return run.id
+
+
+def record_stage(db: Session, run_id: int, stage: str, status: str, started_at: datetime, duration_seconds: float,
+                 counts: Optional[Dict[str, int]], api_stats: ApiCallStats, error: Optional[str] = None) -> SyncRunStage:
+    """Stores one stage and adds its counters to the run's totals.
+
+    Stages report what they know (fetched/created/updated); rows fetched but neither
+    created nor updated are counted as unchanged.
+    """
+    counts = dict(counts or {})
+    if "unchanged" not in counts and "fetched" in counts:
+        counts["unchanged"] = max(0, counts["fetched"] - counts.get("created", 0) - counts.get("updated", 0))
+
+    row = SyncRunStage(
+        run_id=run_id,
+        stage=stage,
+        status=status,
+        started_at=started_at,
+        finished_at=started_at + timedelta(seconds=duration_seconds),
+        duration_seconds=duration_seconds,
+        error=error[:MAX_ERROR_LENGTH] if error else None,
+    )
+    for name in ROW_COUNTS:
+        setattr(row, f"rows_{name}", int(counts.get(name, 0)))
+    for column, attribute in API_COUNTS.items():
+        setattr(row, column, getattr(api_stats, attribute))
+    db.add(row)
+
+    run = db.get(SyncRun, run_id)
+    for column in [f"rows_{name}" for name in ROW_COUNTS] + list(API_COUNTS):
+        setattr(run, column, (getattr(run, column) or 0) + getattr(row, column))
+    db.commit()
+    return row
+
+
+def finish_run(db: Session, run_id: int, status: str, error: Optional[str] = None) -> None:
+    run = db.get(SyncRun, run_id)
+    run.status = status
+    run.finished_at = datetime.now(timezone.utc)
+    started_at = run.started_at if run.started_at.tzinfo else run.started_at.replace(tzinfo=timezone.utc)  # SQLite drops the offset
+    run.duration_seconds = (run.finished_at - started_at).total_seconds()
+    run.error = error[:MAX_ERROR_LENGTH] if error else None
+    db.commit()
+
+
+def mark_interrupted_runs(db: Session) -> int:
+    """Closes runs left running by a previous process."""
+    interrupted = db.query(SyncRun).filter(SyncRun.status == RUN_RUNNING).update({
+        SyncRun.status: RUN_INTERRUPTED,
+        SyncRun.error: "The server stopped while the sync was running",
+    }, synchronize_session=False)
+    db.commit()
+    return interrupted
+
+
+def prune_sync_runs(db: Session, retention_days: int = 30) -> int:
+    """Deletes runs (and their stages) started before the retention window."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    old_runs = db.query(SyncRun.id).filter(SyncRun.started_at < cutoff, SyncRun.status != RUN_RUNNING)
+    db.query(SyncRunStage).filter(SyncRunStage.run_id.in_(old_runs.scalar_subquery())).delete(synchronize_session=False)
+    deleted = db.query(SyncRun).filter(SyncRun.started_at < cutoff, SyncRun.status != RUN_RUNNING).delete(
+        synchronize_session=False)
+    db.commit()
+    return deleted
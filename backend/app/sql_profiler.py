@@ -0,0 +1,126 @@
+"""
+Opt-in per-request SQL profiler
+
+With SQL_PROFILER_ENABLED=true every statement a request runs is timed and
+grouped by shape: the SQL text with literals replaced and IN lists collapsed, so
+``WHERE id = 'a'`` and ``WHERE id = 'b'`` count as the same statement. A shape
+that runs at least SQL_PROFILER_N_PLUS_ONE_THRESHOLD times in one request is
+reported as an N+1 suspect: usually a lazy relationship or a query inside a
+loop. Each profiled response carries a ``Server-Timing: db;dur=...`` header
+(shown in the browser's network panel) and a summary is logged at DEBUG level,
+or WARNING when there are suspects, tagged with the request id.
+
+When disabled no engine hooks are installed, so there is no overhead.
+"""
+
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import structlog
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = structlog.get_logger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_PROFILER_N_PLUS_ONE_THRESHOLD", "5"))
+MAX_SUSPECTS_LOGGED = 5
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def profiler_enabled() -> bool:
+    return os.getenv("SQL_PROFILER_ENABLED", "false").lower() == "true"
+
+
+def statement_shape(statement: str) -> str:
+    """SQL text with literals and parameter lists normalized, so repeats of one query compare equal."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PARAMETER_LIST.sub("(?...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class StatementStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+class QueryProfile:
+    """Statements run while handling one request, grouped by shape."""
+
+    def __init__(self):
+        self.statements: Dict[str, StatementStats] = {}
+        self.queries = 0
+        self.seconds = 0.0
+
+    def record(self, statement: str, seconds: float) -> None:
+        shape = statement_shape(statement)
+        stats = self.statements.get(shape)
+        if stats is None:
+            stats = self.statements[shape] = StatementStats()
+        stats.count += 1
+        stats.seconds += seconds
+        self.queries += 1
+        self.seconds += seconds
+
+    def suspects(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Dict[str, Any]]:
+        """Shapes repeated at least ``threshold`` times, most frequent first."""
+        repeated = [(shape, stats) for shape, stats in self.statements.items() if stats.count >= threshold]
+        repeated.sort(key=lambda item: item[1].count, reverse=True)
+        return [{"statement": shape, "count": stats.count, "ms": round(stats.seconds * 1000, 2)}
+                for shape, stats in repeated]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.2f};desc="{self.queries} queries"'
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("sql_profile", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("profile_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None and conn.info.get("profile_start_time"):
+        profile.record(statement, time.perf_counter() - conn.info["profile_start_time"].pop())
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("profile_start_time"):
+        connection.info["profile_start_time"].pop()
+
+
+def install_profiler(engine: Engine) -> None:
+    """Hooks the profiler into ``engine``; safe to call more than once."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def log_profile(profile: QueryProfile, method: str, route: str, threshold: int = N_PLUS_ONE_THRESHOLD) -> None:
+    suspects = profile.suspects(threshold)
+    summary = {
+        "method": method,
+        "route": route,
+        "queries": profile.queries,
+        "db_ms": round(profile.seconds * 1000, 2),
+        "distinct_statements": len(profile.statements),
+    }
+    if suspects:
+        logger.warning("Possible N+1 queries", suspects=suspects[:MAX_SUSPECTS_LOGGED], **summary)
+    else:
+        logger.debug("SQL profile", **summary)
@@ -0,0 +1,202 @@
+"""
+Sentry performance tracing with adaptive sampling
+
+Tracing every request (traces_sample_rate=1.0) is too costly in production.
+Instead:
+
+* TRACES_SAMPLE_RATE (default 0.05) is the share of transactions recorded,
+  decided when they start (head sampling); unsampled ones record no spans.
+* TRACES_ROUTE_SAMPLE_RATES overrides it per request path, as comma-separated
+  ``pattern=rate`` pairs (fnmatch patterns, first match wins), e.g.
+  ``/api/v1/automation/*=1,/api/v1/devices/*=0.01``. Health checks and /metrics
+  default to 0; a path whose override is 0 is not traced at all.
+* With TRACES_KEEP_SLOW_AND_ERRORS=true (default) a request that was not
+  sampled but turned out slower than TRACES_SLOW_REQUEST_SECONDS, or failed with
+  a server error, is still sent: record_slow_or_failed_request (called by the
+  request middleware) starts a transaction for it after the fact, with its
+  duration and status but no child spans. Every other unsampled request costs a
+  timer and one comparison.
+
+TRACES_EXPORTER chooses where transactions go: ``sentry`` (default, needs
+SENTRY_DSN), ``memory`` (kept in InMemoryTransport.envelopes, for local
+inspection and benchmarks) or ``noop`` (recorded and discarded, to measure the
+tracing overhead alone).
+
+trace_span / traced add custom spans; they cost one context lookup when the
+current request or job is not traced.
+"""
+
+import fnmatch
+import functools
+import inspect
+import os
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import sentry_sdk
+from sentry_sdk.transport import Transport
+
+DEFAULT_ROUTE_SAMPLE_RATES = "/=0,/api/health=0,/metrics=0"
+MEMORY_EXPORTER_MAX_ENVELOPES = 1000
+# Placeholder DSN for the local exporters; nothing is sent to it
+LOCAL_DSN = "https://public@localhost/0"
+
+# Set by init_tracing; record_slow_or_failed_request does nothing while it is None
+_sampler: Optional["AdaptiveSampler"] = None
+
+
+def parse_route_rates(value: str) -> List[Tuple[str, float]]:
+    """'/a/*=0.5,/b=0' -> [('/a/*', 0.5), ('/b', 0.0)]; malformed pairs are ignored."""
+    rates = []
+    for pair in value.split(","):
+        pattern, _, rate = pair.strip().rpartition("=")
+        try:
+            rates.append((pattern.strip(), min(1.0, max(0.0, float(rate)))))
+        except ValueError:
+            continue
+    return [(pattern, rate) for pattern, rate in rates if pattern]
+
+
+class AdaptiveSampler:
+    def __init__(self, base_rate: float = 0.05, route_rates: Optional[List[Tuple[str, float]]] = None,
+                 slow_seconds: float = 1.0, keep_slow_and_errors: bool = True):
+        self.base_rate = base_rate
+        self.route_rates = route_rates or []
+        self.slow_seconds = slow_seconds
+        self.keep_slow_and_errors = keep_slow_and_errors
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveSampler":
+        route_rates = (parse_route_rates(os.getenv("TRACES_ROUTE_SAMPLE_RATES", ""))
+                       + parse_route_rates(DEFAULT_ROUTE_SAMPLE_RATES))
+        return cls(
+            base_rate=float(os.getenv("TRACES_SAMPLE_RATE", "0.05")),
+            route_rates=route_rates,
+            slow_seconds=float(os.getenv("TRACES_SLOW_REQUEST_SECONDS", "1.0")),
+            keep_slow_and_errors=os.getenv("TRACES_KEEP_SLOW_AND_ERRORS", "true").lower() == "true",
+        )
+
+    def route_override(self, name: str) -> Optional[float]:
+        for pattern, rate in self.route_rates:
+            if fnmatch.fnmatchcase(name, pattern):
+                return rate
+        return None
+
+    def rate_for(self, name: str) -> float:
+        override = self.route_override(name)
+        return self.base_rate if override is None else override
+
+    def traces_sampler(self, sampling_context: Dict[str, Any]) -> float:
+        scope = sampling_context.get("asgi_scope") or {}
+        name = scope.get("path") or (sampling_context.get("transaction_context") or {}).get("name") or ""
+        return self.rate_for(name)
+
+    def forced_reason(self, path: str, seconds: float, status_code: int) -> Optional[str]:
+        """Why an unsampled request must be recorded anyway ("error" / "slow"), or None."""
+        if not self.keep_slow_and_errors or self.route_override(path) == 0:
+            return None
+        if status_code >= 500:
+            return "error"
+        if seconds >= self.slow_seconds:
+            return "slow"
+        return None
+
+    def before_send_transaction(self, event: Dict[str, Any], hint: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        event.setdefault("tags", {}).setdefault("sampling.reason", "rate")
+        return event
+
+
+class InMemoryTransport(Transport):
+    """Keeps the last envelopes in memory instead of sending them."""
+
+    envelopes: Deque[Any] = deque(maxlen=MEMORY_EXPORTER_MAX_ENVELOPES)
+
+    def capture_envelope(self, envelope) -> None:
+        self.envelopes.append(envelope)
+
+    @classmethod
+    def transactions(cls) -> List[Dict[str, Any]]:
+        return [item.payload.json for envelope in cls.envelopes for item in envelope.items
+                if item.type == "transaction" and item.payload.json is not None]
+
+
+class NoOpTransport(Transport):
+    def capture_envelope(self, envelope) -> None:
+        pass
+
+
+def init_tracing(dsn: Optional[str] = None, exporter: Optional[str] = None,
+                 sampler: Optional[AdaptiveSampler] = None) -> bool:
+    """Initializes Sentry with the adaptive sampler; returns False when there is nowhere to send to."""
+    exporter = (exporter or os.getenv("TRACES_EXPORTER", "sentry")).lower()
+    sampler = sampler or AdaptiveSampler.from_env()
+    options: Dict[str, Any] = {}
+    if exporter == "memory":
+        options = {"dsn": LOCAL_DSN, "transport": InMemoryTransport}
+    elif exporter == "noop":
+        options = {"dsn": LOCAL_DSN, "transport": NoOpTransport}
+    elif dsn:
+        options = {"dsn": dsn}
+    else:
+        return False
+    global _sampler
+    _sampler = sampler
+    sentry_sdk.init(
+        traces_sampler=sampler.traces_sampler,
+        before_send_transaction=sampler.before_send_transaction,
+        environment=os.getenv("ENVIRONMENT", "development"),
+        **options
+    )
+    return True
+
+
+def record_slow_or_failed_request(method: str, path: str, route: str, seconds: float, status_code: int) -> None:
+    """Sends a span-less transaction for a request head sampling skipped that was slow or failed.
+
+    Called by the request middleware once the response is ready; returns right away when
+    tracing is off, the request was sampled, or it was neither slow nor failed.
+    """
+    sampler = _sampler
+    if sampler is None:
+        return
+    current = sentry_sdk.get_current_span()
+    if current is not None and current.sampled:
+        return
+    reason = sampler.forced_reason(path, seconds, status_code)
+    if reason is None:
+        return
+    finished = datetime.now(timezone.utc)
+    transaction = sentry_sdk.start_transaction(name=route, op="http.server", source="route", sampled=True,
+                                               start_timestamp=finished - timedelta(seconds=seconds))
+    transaction.set_http_status(status_code)
+    transaction.set_tag("http.method", method)
+    transaction.set_tag("sampling.reason", reason)
+    transaction.finish(end_timestamp=finished)
+
+
+def trace_span(op: str, name: str):
+    """Child span of the current transaction; a no-op when nothing is being traced."""
+    if sentry_sdk.get_current_span() is None:
+        return nullcontext()
+    return sentry_sdk.start_span(op=op, name=name)
+
+
+def traced(op: str, name: Optional[str] = None):
+    """Decorator form of trace_span, for sync and async functions (FastAPI endpoints included)."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with trace_span(op, span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_span(op, span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,112 @@
+"""
+Serialization benchmark for the device list endpoint.
+
+Compares the original path (ORM entities -> DeviceDTO.from_entity -> FastAPI
+response_model validation -> stdlib json) with the row-based path
+(column-projected rows -> DeviceDTO.row_to_dict -> FastJSONResponse).
+
+Usage (from the repository root):
+    python backend/load_tests/bench_serialization.py [--rows 500 5000] [--repeat 20]
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import Base, Device
+from app.models.dto import DeviceDTO, DeviceFilters
+from app.responses import FastJSONResponse, orjson
+from app.services.device_service import DeviceService
+
+
+def populate(session, count: int):
+    now = datetime.utcnow()
+    session.add_all([
+        Device(
+            identifier=f"device-{i:06d}",
+            name=f"WORKSTATION-{i:06d}",
+            description="Benchmark device",
+            computer_type="windows",
+            is_online=i % 3 != 0,
+            is_agent_installed=True,
+            group_name=f"Group {i % 20}",
+            site_name=f"Site {i % 10}",
+            organization_name=f"Org {i % 5}",
+            critical_notifications=i % 4,
+            elevated_notifications=i % 7,
+            cpu_usage=(i % 100) / 1.3,
+            memory_usage=(i % 100) / 1.7,
+            last_seen_online=now - timedelta(minutes=i),
+            antivirus_enabled="Enabled",
+            firewall_enabled=True,
+            local_ip_addresses=[{"Name": "Ethernet", "IPs": ["10.0.0.1"]}],
+            event_logs={"Errors": i % 5},
+        )
+        for i in range(count)
+    ])
+    session.commit()
+
+
+def original_path(service: DeviceService, filters: DeviceFilters, adapter: TypeAdapter) -> bytes:
+    dtos = [DeviceDTO.from_entity(device) for device in service.get_devices_with_filters(filters)]
+    # What FastAPI does with response_model=List[DeviceDTO] and the default JSONResponse
+    validated = adapter.validate_python(dtos, from_attributes=True)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_path(service: DeviceService, filters: DeviceFilters) -> bytes:
+    rows = service.get_device_rows_with_filters(filters)
+    return FastJSONResponse([DeviceDTO.row_to_dict(row) for row in rows]).body
+
+
+def bench(func, repeat: int, session) -> float:
+    """Returns the best wall time in seconds over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        session.expunge_all()  # Start each run with a cold identity map, like a fresh request
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    print(f"{'rows':>6} {'original ms':>12} {'fast ms':>9} {'orig rows/s':>12} {'fast rows/s':>12} {'speedup':>8}")
+
+    adapter = TypeAdapter(List[DeviceDTO])
+    for count in args.rows:
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        populate(session, count)
+        service = DeviceService(db=session, pulseway_client=None)
+        filters = DeviceFilters(limit=count)
+
+        original = bench(lambda: original_path(service, filters, adapter), args.repeat, session)
+        fast = bench(lambda: fast_path(service, filters), args.repeat, session)
+
+        print(f"{count:>6} {original * 1000:>12.1f} {fast * 1000:>9.1f} "
+              f"{count / original:>12,.0f} {count / fast:>12,.0f} {original / fast:>7.1f}x")
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
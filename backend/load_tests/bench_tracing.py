@@ -0,0 +1,107 @@
+"""
+Tracing overhead benchmark for a monitoring endpoint.
+
+Runs the same requests in-process with tracing off, with every transaction
+traced (the previous traces_sample_rate=1.0 setup) and with the adaptive
+sampler (TRACES_SAMPLE_RATE=0.05), with and without the forced recording of
+slow and failed requests. Transactions go to the noop exporter, so the numbers
+are the cost of recording, not of sending.
+
+Usage (from the repository root):
+    python backend/load_tests/bench_tracing.py [--requests 500] [--notifications 2000]
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import sentry_sdk
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import monitoring
+from app.main import app, verify_api_key
+from app.models.database import Base, Device, Notification
+from app.security import get_current_active_api_key
+from app.tracing import AdaptiveSampler, init_tracing
+
+URL = "/api/v1/monitoring/activity/recent?limit=50"
+
+
+def populate(session, count: int):
+    now = datetime.utcnow()
+    session.add_all([Device(identifier=f"device-{i:04d}", name=f"WORKSTATION-{i:04d}") for i in range(100)])
+    session.add_all([
+        Notification(id=i + 1, message=f"Alert {i}", priority="Critical" if i % 5 == 0 else "Normal",
+                     read=i % 3 == 0, device_identifier=f"device-{i % 100:04d}", datetime=now - timedelta(minutes=i))
+        for i in range(count)
+    ])
+    session.commit()
+
+
+def run(client: TestClient, requests: int) -> list:
+    response = client.get(URL)  # Warm up
+    response.raise_for_status()
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get(URL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--notifications", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    session = SessionLocal()
+    populate(session, args.notifications)
+    session.close()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[monitoring.get_db] = get_db
+    app.dependency_overrides[get_current_active_api_key] = lambda: None
+    app.dependency_overrides[verify_api_key] = lambda: None
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    client = TestClient(app)  # No lifespan: no scheduled sync
+
+    modes = [
+        ("off", lambda: sentry_sdk.init()),
+        ("trace all", lambda: init_tracing(exporter="noop", sampler=AdaptiveSampler(base_rate=1.0, keep_slow_and_errors=False))),
+        ("adaptive", lambda: init_tracing(exporter="noop", sampler=AdaptiveSampler(base_rate=0.05))),
+        ("head 5%", lambda: init_tracing(exporter="noop", sampler=AdaptiveSampler(base_rate=0.05, keep_slow_and_errors=False))),
+    ]
+    print(f"{'mode':>10} {'mean ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    baseline = None
+    for name, setup in modes:
+        setup()
+        timings = sorted(run(client, args.requests))
+        mean = statistics.mean(timings)
+        baseline = baseline or mean
+        print(f"{name:>10} {mean * 1000:>9.2f} {timings[len(timings) // 2] * 1000:>8.2f} "
+              f"{timings[int(len(timings) * 0.99)] * 1000:>8.2f} {1 / mean:>8.0f}  (+{(mean / baseline - 1) * 100:.0f}%)")
+    sentry_sdk.init()
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import MagicMock
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.main import app
+from backend.app.api import automation
+from backend.app.models.database import Base, Device, Task, Workflow
+from backend.app.pulseway.client import PulsewayAPIError
+from backend.app.security import get_current_active_api_key
+from backend.app.services import automation_runs
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+pulseway_client = MagicMock()
+
+@pytest.fixture(scope="function")
+def client(monkeypatch):
+    monkeypatch.setenv("API_KEY", "test-api-key")
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([Task(id=7, name="Patch"), Workflow(id=9, name="Onboard")])
+    for i in range(5):
+        db.add(Device(identifier=f"acme-{i}", name=f"ACME-{i}", organization_name="Acme", site_name="HQ",
+                      is_online=i != 4, critical_notifications=1 if i == 0 else 0))
+    db.add(Device(identifier="other-0", name="OTHER-0", organization_name="Other", is_online=True))
+    db.commit()
+    db.close()
+    pulseway_client.reset_mock(return_value=True, side_effect=True)
+    pulseway_client.run_task.return_value = {"Data": {}}
+    pulseway_client.run_workflow.return_value = {"Data": {}}
+    app.dependency_overrides[automation.get_db] = override_get_db
+    app.dependency_overrides[automation.get_pulseway_client] = lambda: pulseway_client
+    app.dependency_overrides[get_current_active_api_key] = lambda: None
+    try:
+        yield TestClient(app, headers={"X-API-Key": "test-api-key"})
+    finally:
+        for dependency in (automation.get_db, automation.get_pulseway_client, get_current_active_api_key):
+            app.dependency_overrides.pop(dependency, None)
+        Base.metadata.drop_all(bind=engine)
+
+def test_task_run_targets_filtered_devices_in_chunks(client: TestClient, monkeypatch):
+    monkeypatch.setattr(automation_runs, "DEFAULT_BATCH_SIZE", 2)
+
+    response = client.post("/api/v1/automation/tasks/7/run",
+                           json={"targets": {"organization": "acme", "online_only": True}})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["targeted"], body["submitted"], body["failed"]) == (4, 4, 0)
+    assert body["device_identifiers"] == ["acme-0", "acme-1", "acme-2", "acme-3"]
+    sent = sorted(call.kwargs["device_ids"] for call in pulseway_client.run_task.call_args_list)
+    assert sent == [["acme-0", "acme-1"], ["acme-2", "acme-3"]]
+
+def test_failed_chunk_is_reported(client: TestClient):
+    pulseway_client.run_workflow.side_effect = PulsewayAPIError(detail="Payload too large", status_code=413)
+
+    response = client.post("/api/v1/automation/workflows/9/run",
+                           json={"targets": {"has_alerts": True}, "variable_overrides": [{"Name": "x", "Value": "1"}]})
+
+    body = response.json()
+    assert (body["targeted"], body["submitted"], body["failed"]) == (1, 0, 1)
+    assert body["chunks"][0]["error"] == "Payload too large"
+    assert pulseway_client.run_workflow.call_args.kwargs["variable_overrides"] == [{"Name": "x", "Value": "1"}]
+
+def test_dry_run_and_explicit_identifiers(client: TestClient):
+    response = client.post("/api/v1/automation/tasks/7/run",
+                           json={"targets": {"site": "HQ"}, "device_identifiers": ["acme-1", "other-0"], "dry_run": True})
+
+    assert response.json()["device_identifiers"] == ["acme-1"]
+    pulseway_client.run_task.assert_not_called()
+
+    response = client.post("/api/v1/automation/tasks/7/run", json={"device_identifiers": ["acme-1", "missing"]})
+    assert response.status_code == 404
+
+def test_refuses_unscoped_or_empty_targets(client: TestClient):
+    assert client.post("/api/v1/automation/tasks/7/run", json={"targets": {}}).status_code == 400
+    assert client.post("/api/v1/automation/tasks/7/run", json={"targets": {"organization": "nobody"}}).status_code == 404
+    assert client.post("/api/v1/automation/tasks/8/run", json={"targets": {"site": "HQ"}}).status_code == 404
+    pulseway_client.run_task.assert_not_called()
+
+def test_online_only_false_targets_offline_devices(client: TestClient):
+    response = client.post("/api/v1/automation/tasks/7/run", json={"targets": {"online_only": False}, "dry_run": True})
+
+    assert response.status_code == 200
+    assert response.json()["device_identifiers"] == ["acme-4"]
+    assert client.post("/api/v1/automation/tasks/7/run", json={"targets": {"has_alerts": False}}).status_code == 400
+
+def test_chunked():
+    assert automation_runs.chunked(["a", "b", "c"], 2) == [["a", "b"], ["c"]]
+    assert automation_runs.chunked([], 2) == []
@@ -0,0 +1,93 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.main import app
+from backend.app.api import scripts
+from backend.app.models.database import Base, BulkExecutionItem, Execution, Script
+from backend.app.security import get_current_active_api_key
+from backend.app.services import bulk_execution
+from backend.app.services.bulk_execution import ITEM_STATUSES, ITEM_SUCCEEDED, create_bulk_job
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+pulseway_client = MagicMock()
+
+@pytest.fixture(scope="function")
+def client(monkeypatch):
+    monkeypatch.setenv("API_KEY", "test-api-key")
+    Base.metadata.create_all(bind=engine)
+    pulseway_client.reset_mock(return_value=True, side_effect=True)
+    app.dependency_overrides[scripts.get_db] = override_get_db
+    app.dependency_overrides[scripts.get_pulseway_client] = lambda: pulseway_client
+    app.dependency_overrides[get_current_active_api_key] = lambda: None
+    try:
+        yield TestClient(app, headers={"X-API-Key": "test-api-key"})
+    finally:
+        for dependency in (scripts.get_db, scripts.get_pulseway_client, get_current_active_api_key):
+            app.dependency_overrides.pop(dependency, None)
+        Base.metadata.drop_all(bind=engine)
+
+def test_job_items_can_be_filtered_on_every_item_status(client: TestClient):
+    db = TestingSessionLocal()
+    db.add(Script(id="scr-1", name="Restart Spooler"))
+    db.commit()
+    job_id = create_bulk_job(db, "scr-1", [f"dev-{status}" for status in ITEM_STATUSES]).id
+    for status in ITEM_STATUSES:
+        db.query(BulkExecutionItem).filter(BulkExecutionItem.device_identifier == f"dev-{status}").update(
+            {BulkExecutionItem.status: status})
+    db.commit()
+    db.close()
+
+    for status in ITEM_STATUSES:
+        response = client.get(f"/api/v1/scripts/jobs/{job_id}", params={"include_items": True, "item_status": status})
+        assert response.status_code == 200, status
+        assert [item["device_identifier"] for item in response.json()["items"]] == [f"dev-{status}"]
+
+    assert client.get(f"/api/v1/scripts/jobs/{job_id}", params={"item_status": "bogus"}).status_code == 422
+
+def test_stale_running_executions_are_refreshed_up_to_the_limit(client: TestClient, monkeypatch):
+    monkeypatch.setattr(bulk_execution, "JOB_EXECUTIONS_REFRESH_LIMIT", 1)
+    pulseway_client.get_script_execution_details.return_value = {"Data": {
+        "State": "Successful", "StartTime": "2026-10-01T12:00:00Z", "EndTime": "2026-10-01T12:00:05Z", "ExitCode": 0}}
+    now = datetime.now(timezone.utc)
+    # (state, details read at): never read, read long ago, read just now, finished
+    executions = {"dev-a": ("Running", None), "dev-b": ("Running", now - timedelta(hours=1)),
+                  "dev-c": ("Running", now), "dev-d": ("Successful", now - timedelta(hours=1))}
+    db = TestingSessionLocal()
+    db.add(Script(id="scr-1", name="Restart Spooler"))
+    db.commit()
+    job_id = create_bulk_job(db, "scr-1", list(executions)).id
+    for device_id, (state, details_fetched_at) in executions.items():
+        db.query(BulkExecutionItem).filter(BulkExecutionItem.device_identifier == device_id).update(
+            {BulkExecutionItem.status: ITEM_SUCCEEDED, BulkExecutionItem.execution_id: f"exec-{device_id}"})
+        db.add(Execution(kind="script", execution_id=f"exec-{device_id}", entity_id="scr-1", device_identifier=device_id,
+                         state=state, details_fetched_at=details_fetched_at))
+    db.commit()
+    db.close()
+
+    response = client.get(f"/api/v1/scripts/jobs/{job_id}/executions")
+
+    assert response.status_code == 200
+    rows = {row["device_identifier"]: (row["state"], row["stale"]) for row in response.json()["executions"]}
+    # Only the row never read is refreshed; the other stale one waits for the next poll
+    assert rows == {"dev-a": ("Successful", False), "dev-b": ("Running", True),
+                    "dev-c": ("Running", False), "dev-d": ("Successful", False)}
+    pulseway_client.get_script_execution_details.assert_called_once_with(
+        script_id="scr-1", device_id="dev-a", execution_id="exec-dev-a")
+
+    response = client.get(f"/api/v1/scripts/jobs/{job_id}/executions", params={"refresh": False})
+    assert response.json()["states"] == {"Successful": 2, "Running": 2}
+    assert pulseway_client.get_script_execution_details.call_count == 1
@@ -0,0 +1,123 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, Session
+
+from backend.app.models.database import Base, Device, Notification, ChangeLogEntry
+from backend.app.services.change_feed import (
+    CHANGE_LOG_ADVISORY_LOCK_KEY, ChangeFeedService, record_change, current_change_token, prune_change_log,
+    parse_change_token
+)
+
+TEST_DATABASE_URL = "sqlite:///:memory:"
+
+engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="function")
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+def _add_device(db: Session, identifier: str, name: str = "Device"):
+    db.add(Device(identifier=identifier, name=name))
+    record_change(db, "device", identifier)
+    db.commit()
+
+def test_missing_token_requests_reset(db_session: Session):
+    _add_device(db_session, "dev-1")
+
+    feed = ChangeFeedService(db_session).get_changes_since(None)
+
+    assert feed["reset"] is True
+    assert feed["token"] == current_change_token(db_session)
+
+def test_changes_since_token_returns_only_new_entities(db_session: Session):
+    _add_device(db_session, "dev-1")
+    token = current_change_token(db_session)
+    _add_device(db_session, "dev-2")
+    db_session.add(Notification(id=7, message="Disk full", priority="critical"))
+    record_change(db_session, "notification", 7)
+    db_session.commit()
+
+    feed = ChangeFeedService(db_session).get_changes_since(token)
+
+    upserted_devices, deleted_devices = feed["changes"]["device"]
+    upserted_notifications, _ = feed["changes"]["notification"]
+    assert feed["reset"] is False
+    assert [d.identifier for d in upserted_devices] == ["dev-2"]
+    assert deleted_devices == []
+    assert [n.id for n in upserted_notifications] == [7]
+    assert feed["token"] == current_change_token(db_session)
+
+def test_repeated_changes_collapse_and_deletes_win(db_session: Session):
+    _add_device(db_session, "dev-1")
+    token = current_change_token(db_session)
+    record_change(db_session, "device", "dev-1")
+    db_session.query(Device).filter(Device.identifier == "dev-1").delete()
+    record_change(db_session, "device", "dev-1", "delete")
+    db_session.commit()
+
+    feed = ChangeFeedService(db_session).get_changes_since(token)
+
+    assert feed["changes"]["device"] == ([], ["dev-1"])
+
+def test_entity_type_filter_and_paging(db_session: Session):
+    for i in range(3):
+        _add_device(db_session, f"dev-{i}")
+
+    service = ChangeFeedService(db_session)
+    first = service.get_changes_since(0, limit=2, entity_types=["device"])
+    second = service.get_changes_since(first["token"], limit=2, entity_types=["device"])
+
+    assert list(first["changes"]) == ["device"]
+    assert first["has_more"] is True
+    assert len(first["changes"]["device"][0]) == 2
+    assert second["has_more"] is False
+    assert [d.identifier for d in second["changes"]["device"][0]] == ["dev-2"]
+
+def test_pruned_token_requests_reset(db_session: Session):
+    for i in range(3):
+        _add_device(db_session, f"dev-{i}")
+    old = datetime.now(timezone.utc) - timedelta(days=30)
+    db_session.query(ChangeLogEntry).update({ChangeLogEntry.changed_at: old})
+    db_session.commit()
+
+    pruned = prune_change_log(db_session, retention_days=7)
+
+    assert pruned == 2 # The newest entry is always kept
+    assert ChangeFeedService(db_session).get_changes_since(0)["reset"] is True
+    assert ChangeFeedService(db_session).get_changes_since(current_change_token(db_session))["reset"] is False
+
+def test_parse_change_token():
+    assert parse_change_token("42") == 42
+    assert parse_change_token(None) is None
+    assert parse_change_token("abc") is None
+    assert parse_change_token("-1") is None
+
+def test_postgres_change_log_writers_hold_the_lock_until_commit():
+    # SQLite standing in for PostgreSQL, with the advisory lock function recorded
+    pg_engine = create_engine(TEST_DATABASE_URL)
+    pg_engine.dialect.name = "postgresql"
+    locks = []
+    event.listen(pg_engine, "connect",
+                 lambda connection, record: connection.create_function("pg_advisory_xact_lock", 1, locks.append))
+    Base.metadata.create_all(bind=pg_engine)
+    db = sessionmaker(bind=pg_engine)()
+    try:
+        record_change(db, "device", "dev-1")
+        record_change(db, "device", "dev-2")
+        db.commit()
+        record_change(db, "device", "dev-3")
+        db.commit()
+    finally:
+        db.close()
+        pg_engine.dispose()
+
+    # Once per transaction, before its first id is allocated
+    assert locks == [CHANGE_LOG_ADVISORY_LOCK_KEY] * 2
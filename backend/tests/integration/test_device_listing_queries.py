@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import pytest
+from unittest.mock import MagicMock
+from pydantic import ValidationError
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, Session
+
+from backend.app.models.database import Base, Device, DeviceAsset
+from backend.app.models.dto import (
+    DeviceDTO, DeviceDetailDTO, DeviceFilterCriteria, DeviceFilters, DeviceBatchRequest, DEVICE_BATCH_MAX_IDENTIFIERS
+)
+from backend.app.services.device_export import iter_csv, iter_ndjson
+from backend.app.services.device_service import DeviceService
+from backend.app.services.search_index import index_devices
+
+TEST_DATABASE_URL = "sqlite:///:memory:"
+
+engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="function")
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add_all([
+        Device(identifier="dev-1", name="Alpha Server", is_online=False, critical_notifications=2,
+               organization_name="Acme", site_name="HQ", event_logs={"Errors": 3}, updates={"Pending": 1},
+               local_ip_addresses=[{"Name": "eth0"}]),
+        Device(identifier="dev-2", name="Beta Laptop", is_online=True, elevated_notifications=1,
+               organization_name="Acme", site_name="Branch"),
+    ])
+    session.commit()
+    index_devices(session)
+    session.commit()
+    session.expunge_all()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def service(db_session: Session):
+    return DeviceService(db=db_session, pulseway_client=MagicMock())
+
+@pytest.fixture
+def statements():
+    captured = []
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+    event.listen(engine, "before_cursor_execute", _capture)
+    yield captured
+    event.remove(engine, "before_cursor_execute", _capture)
+
+def test_listing_queries_skip_json_blobs(service: DeviceService, statements):
+    service.get_device_rows_with_filters(DeviceFilters())
+    service.search_devices_by_term("Alpha")
+    service.get_devices_by_organization_name("Acme")
+    service.get_devices_by_site_name("HQ")
+    service.get_devices_with_critical_alerts()
+    service.get_devices_with_elevated_alerts()
+    service.get_offline_devices_list()
+    service.get_devices_with_filters(DeviceFilters())
+
+    device_selects = [s for s in statements if "FROM devices" in s]
+    assert len(device_selects) == 8
+    for statement in device_selects:
+        for column in ("event_logs", "updates", "local_ip_addresses"):
+            assert f"devices.{column}" not in statement
+
+def test_listing_rows_map_to_device_dto(service: DeviceService):
+    rows = service.get_devices_with_critical_alerts()
+
+    assert [DeviceDTO.row_to_dict(row)["identifier"] for row in rows] == ["dev-1"]
+    assert DeviceDTO.row_to_dict(rows[0]) == DeviceDTO.from_entity(service.get_device_details("dev-1")).model_dump()
+
+def test_device_details_loads_full_row(service: DeviceService):
+    device = service.get_device_details("dev-1")
+
+    assert device.event_logs == {"Errors": 3}
+    assert device.local_ip_addresses == [{"Name": "eth0"}]
+
+def test_export_streams_devices_with_assets(service: DeviceService, db_session: Session):
+    db_session.add(DeviceAsset(device_identifier="dev-1", tags=["prod"], disks=[{"Name": "C:"}]))
+    db_session.commit()
+
+    lines = b"".join(iter_ndjson(service.iter_device_export(DeviceFilterCriteria(organization="Acme")))).splitlines()
+    records = [json.loads(line) for line in lines]
+
+    assert [r["identifier"] for r in records] == ["dev-1", "dev-2"]
+    assert records[0]["event_logs"] == {"Errors": 3}
+    assert records[0]["assets"]["tags"] == ["prod"]
+    assert records[1]["assets"] is None
+
+def test_export_applies_filters_and_encodes_csv(service: DeviceService):
+    records = service.iter_device_export(DeviceFilterCriteria(online_only=True), include_assets=False)
+
+    rows = list(csv.reader(io.StringIO(b"".join(iter_csv(records, include_assets=False)).decode("utf-8"))))
+
+    assert rows[0][:2] == ["identifier", "name"]
+    assert "asset_tags" not in rows[0]
+    assert [row[0] for row in rows[1:]] == ["dev-2"]
+
+def test_csv_export_of_no_devices_has_header_only():
+    rows = list(csv.reader(io.StringIO(b"".join(iter_csv(iter([]))).decode("utf-8"))))
+
+    assert len(rows) == 1
+    assert rows[0][-1] == "asset_updated_at"
+
+def test_batch_lookup_uses_one_query_and_reports_missing(service: DeviceService, statements):
+    rows, missing = service.get_device_rows_by_identifiers(["dev-2", "unknown", "dev-1", "dev-2"])
+
+    assert len(statements) == 1
+    assert [DeviceDetailDTO.row_to_dict(row)["identifier"] for row in rows] == ["dev-2", "dev-1"]
+    assert missing == ["unknown"]
+    assert DeviceDetailDTO.row_to_dict(rows[1]) == DeviceDetailDTO.from_entity(service.get_device_details("dev-1")).model_dump()
+
+def test_batch_request_field_selection():
+    batch = DeviceBatchRequest(identifiers=["dev-1"], fields=["name", "identifier", "event_logs"])
+
+    assert batch.fields == ["identifier", "name", "event_logs"]
+    with pytest.raises(ValidationError):
+        DeviceBatchRequest(identifiers=["dev-1"], fields=["password"])
+    with pytest.raises(ValidationError):
+        DeviceBatchRequest(identifiers=[f"dev-{i}" for i in range(DEVICE_BATCH_MAX_IDENTIFIERS + 1)])
@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.main import app
+from backend.app.api import webhooks
+from backend.app.models.database import Base, Execution
+from backend.app.services.execution_webhooks import WEBHOOK_PATH, build_test_payload, default_webhook_url
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture(scope="function")
+def client(monkeypatch):
+    monkeypatch.setenv("PULSEWAY_WEBHOOK_TOKEN", "s3cret")
+    monkeypatch.setenv("API_KEY", "test-api-key")
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[webhooks.get_db] = override_get_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(webhooks.get_db, None)
+        Base.metadata.drop_all(bind=engine)
+
+def _executions():
+    db = TestingSessionLocal()
+    try:
+        return [(e.kind, e.execution_id, e.entity_id, e.device_identifier, e.state) for e in db.query(Execution).order_by(Execution.id)]
+    finally:
+        db.close()
+
+def test_rejects_missing_or_wrong_token(client: TestClient):
+    payload = build_test_payload("script", "scr-1", "dev-1")
+
+    assert client.post(WEBHOOK_PATH, json=payload).status_code == 401
+    assert client.post(f"{WEBHOOK_PATH}?token=wrong", json=payload).status_code == 401
+    assert _executions() == []
+
+def test_receiver_disabled_without_token(client: TestClient, monkeypatch):
+    monkeypatch.delenv("PULSEWAY_WEBHOOK_TOKEN")
+
+    assert client.post(f"{WEBHOOK_PATH}?token=", json=build_test_payload("task", "7", "dev-1")).status_code == 503
+
+def test_records_and_pushes_to_subscribers(client: TestClient):
+    with client.websocket_connect("/ws", headers={"X-API-Key": "test-api-key"}) as ws:
+        ws.send_json({"type": "SUBSCRIBE", "events": ["script_executions"]})
+        assert ws.receive_json()["type"] == "SUBSCRIPTION_CONFIRMED"
+
+        response = client.post(f"{WEBHOOK_PATH}?token=s3cret",
+                               json=build_test_payload("script", "scr-1", "dev-1", execution_id="exec-1"))
+        assert response.status_code == 200
+
+        message = ws.receive_json()
+        assert message["type"] == "SCRIPT_EXECUTION_UPDATE"
+        assert message["execution"] == {"kind": "script", "execution_id": "exec-1", "entity_id": "scr-1",
+                                         "device_identifier": "dev-1", "state": "Successful"}
+
+def test_redelivery_updates_the_same_row(client: TestClient):
+    for state in ("Successful", "Failed"):
+        client.post(f"{WEBHOOK_PATH}?token=s3cret",
+                    json=build_test_payload("task", "7", "dev-1", execution_id="42", state=state))
+    client.post(f"{WEBHOOK_PATH}?token=s3cret",
+                json=build_test_payload("workflow", "9", "dev-2", execution_id="42", state="Successful"))
+
+    assert _executions() == [("task", "42", "7", "dev-1", "Failed"), ("workflow", "42", "9", "dev-2", "Successful")]
+
+def test_unknown_event_type_is_rejected(client: TestClient):
+    response = client.post(f"{WEBHOOK_PATH}?token=s3cret", json={"EventType": "DeviceDeleted", "ExecutionId": "1"})
+
+    assert response.status_code == 422
+
+def test_default_webhook_url(monkeypatch):
+    monkeypatch.setenv("PULSEWAY_WEBHOOK_TOKEN", "s3cret")
+    monkeypatch.delenv("PULSEWAY_WEBHOOK_BASE_URL", raising=False)
+    assert default_webhook_url() is None
+
+    monkeypatch.setenv("PULSEWAY_WEBHOOK_BASE_URL", "https://pulseway.example.com/")
+    assert default_webhook_url() == f"https://pulseway.example.com{WEBHOOK_PATH}?token=s3cret"
@@ -0,0 +1,108 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.main import app
+from backend.app.api import monitoring
+from backend.app.models.database import Base, Device, Notification
+from backend.app.security import get_current_active_api_key
+from backend.app.services.change_feed import record_change
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+NOW = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture(scope="function")
+def client(monkeypatch):
+    monkeypatch.setenv("API_KEY", "test-api-key")
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    for i in range(3):
+        db.add(Device(identifier=f"dev-{i}", name=f"DEV-{i}", is_online=True))
+    for i in range(6):
+        db.add(Notification(id=i + 1, message=f"Alert {i}", priority="Critical" if i % 2 else "Normal",
+                            read=i == 5, device_identifier=f"dev-{i % 3}" if i < 4 else None,
+                            datetime=NOW - timedelta(minutes=10 * (5 - i))))
+        record_change(db, "notification", i + 1)
+    db.commit()
+    db.close()
+    app.dependency_overrides[monitoring.get_db] = override_get_db
+    app.dependency_overrides[get_current_active_api_key] = lambda: None
+    try:
+        yield TestClient(app, headers={"X-API-Key": "test-api-key"})
+    finally:
+        for dependency in (monitoring.get_db, get_current_active_api_key):
+            app.dependency_overrides.pop(dependency, None)
+        Base.metadata.drop_all(bind=engine)
+
+def test_recent_activity_is_one_query_with_device_names(client: TestClient):
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.get("/api/v1/monitoring/activity/recent")
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert response.status_code == 200
+    items = response.json()
+    assert [item["id"] for item in items] == [6, 5, 4, 3, 2, 1]
+    assert items[2] == {"id": 4, "message": "Alert 3", "datetime": items[2]["datetime"], "priority": "Critical",
+                        "read": False, "device_identifier": "dev-0", "device_name": "DEV-0"}
+    assert items[0]["device_name"] is None  # Not linked to a device
+    assert response.headers["X-Change-Token"] == "6"
+    assert len(statements) == 2  # The change token, then the feed
+
+def test_unread_feed_filters_on_priority_and_since(client: TestClient):
+    response = client.get("/api/v1/monitoring/notifications/unread", params={"priority_filter": "critical"})
+    assert [item["id"] for item in response.json()] == [4, 2]
+
+    since = (NOW - timedelta(minutes=25)).isoformat()
+    response = client.get("/api/v1/monitoring/notifications/unread", params={"since": since})
+    assert response.status_code == 200
+    assert [(item["id"], item["device_name"]) for item in response.json()] == [(5, None), (4, "DEV-0")]
+
+    # The same instant in another offset selects the same items
+    since_local = (NOW - timedelta(minutes=25)).astimezone(timezone(timedelta(hours=2))).isoformat()
+    response = client.get("/api/v1/monitoring/notifications/unread", params={"since": since_local})
+    assert [item["id"] for item in response.json()] == [5, 4]
+
+def test_polling_pages_forward_in_storage_order_without_losing_items(client: TestClient):
+    token = client.get("/api/v1/monitoring/activity/recent").headers["X-Change-Token"]
+
+    db = TestingSessionLocal()
+    # More new items than one page holds; a later sync stores events older than ones already received
+    for i in range(7):
+        db.add(Notification(id=100 + i, message=f"Burst {i}", priority="Normal", read=False,
+                            datetime=NOW - timedelta(days=1 if i % 2 else 0, minutes=i)))
+        record_change(db, "notification", 100 + i)
+    db.commit()
+    db.query(Notification).filter(Notification.id == 2).update({Notification.read: True})
+    record_change(db, "notification", 2)
+    db.commit()
+    db.close()
+
+    received = []
+    while True:
+        response = client.get("/api/v1/monitoring/activity/recent", params={"after_token": token, "limit": 3})
+        page, token = response.json(), response.headers["X-Change-Token"]
+        if not page:
+            break
+        received.extend(page)
+
+    # Each changed item once, in the order it was stored, whatever its event time
+    assert [item["id"] for item in received] == list(range(100, 107)) + [2]
+    assert received[-1]["read"] is True
+    assert client.get("/api/v1/monitoring/activity/recent", params={"after_token": token}).json() == []
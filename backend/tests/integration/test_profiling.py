@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.api.events import verify_stream_api_key
+
+
+@pytest.fixture(scope="function")
+def client(monkeypatch):
+    monkeypatch.setenv("API_KEY", "test-api-key")
+    monkeypatch.setenv("ADMIN_API_KEY", "test-admin-key")
+    return TestClient(app, headers={"X-API-Key": "test-api-key"})
+
+def test_profile_endpoint_requires_the_admin_key(client: TestClient):
+    assert client.get("/api/v1/admin/profile", params={"seconds": 0.05}).status_code == 403
+    response = client.get("/api/v1/admin/profile", params={"seconds": 0.05},
+                          headers={"X-Admin-Key": "wrong"})
+    assert response.status_code == 403
+
+def test_profile_endpoint_returns_speedscope_or_collapsed_stacks(client: TestClient):
+    admin = {"X-Admin-Key": "test-admin-key"}
+    response = client.get("/api/v1/admin/profile", params={"seconds": 0.05, "idle": True}, headers=admin)
+    assert response.status_code == 200
+    document = response.json()
+    assert document["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+    assert document["profiles"] and all(profile["type"] == "sampled" for profile in document["profiles"])
+    assert int(response.headers["X-Profile-Samples"]) > 0
+
+    response = client.get("/api/v1/admin/profile", params={"seconds": 0.05, "idle": True, "format": "collapsed"},
+                          headers=admin)
+    assert response.headers["content-type"].startswith("text/plain")
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.splitlines())
+
+    response = client.get("/api/v1/admin/profile", params={"seconds": 0.05, "format": "pprof"}, headers=admin)
+    assert response.status_code == 422
+
+def test_profile_flag_replaces_the_response_with_a_profile(client: TestClient):
+    assert client.get("/", params={"profile": 1}).status_code == 403
+
+    response = client.get("/", params={"profile": 1, "profile_format": "collapsed"},
+                          headers={"X-Admin-Key": "test-admin-key"})
+    assert response.status_code == 200
+    assert response.headers["X-Profiled-Status"] == "200"
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "X-Request-ID" in response.headers
+
+    # Without the flag the endpoint answers as usual
+    assert client.get("/").json()["status"] == "healthy"
+
+def test_profile_flag_refuses_event_streams(client: TestClient):
+    app.dependency_overrides[verify_stream_api_key] = lambda: None
+    try:
+        response = client.get("/api/v1/events/stream", params={"profile": 1}, headers={"X-Admin-Key": "test-admin-key"})
+    finally:
+        app.dependency_overrides.pop(verify_stream_api_key, None)
+
+    assert response.status_code == 400
+    # The profiler was released: the next request can be profiled
+    response = client.get("/", params={"profile": 1}, headers={"X-Admin-Key": "test-admin-key"})
+    assert response.status_code == 200
@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+
+from backend.app.models.database import Base, Script, ScriptFacet
+from backend.app.services.script_facets import (
+    CATEGORY, PLATFORM, index_script_facets, list_facet_values,
+    rebuild_script_facets_if_empty, scripts_with_facet
+)
+
+TEST_DATABASE_URL = "sqlite:///:memory:"
+
+engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="function")
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add_all([
+        Script(id="scr-1", name="Windows Utility", platforms=["Windows"], category_name="Utility"),
+        Script(id="scr-2", name="Linux Monitoring", platforms=["Linux"], category_name="Monitoring"),
+        Script(id="scr-3", name="Cross-Platform Script", platforms=["Windows", "Mac OS", "windows"],
+               category_name="Utility"),
+        Script(id="scr-4", name="Uncategorized"),
+    ])
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+def _matching_ids(db_session: Session, facet: str, value: str):
+    return sorted(row[0] for row in db_session.query(Script.id).filter(Script.id.in_(scripts_with_facet(facet, value))))
+
+def test_rebuild_if_empty_indexes_existing_scripts(db_session: Session):
+    # Duplicate platforms differing only in case are stored once
+    assert rebuild_script_facets_if_empty(db_session) == 7
+    assert rebuild_script_facets_if_empty(db_session) == 0
+
+def test_filters_are_case_insensitive_exact_matches(db_session: Session):
+    index_script_facets(db_session)
+    db_session.commit()
+
+    assert _matching_ids(db_session, PLATFORM, "windows") == ["scr-1", "scr-3"]
+    assert _matching_ids(db_session, PLATFORM, "Mac OS") == ["scr-3"]
+    assert _matching_ids(db_session, CATEGORY, "utility") == ["scr-1", "scr-3"]
+    assert _matching_ids(db_session, CATEGORY, "Util") == []
+
+def test_list_facet_values(db_session: Session):
+    index_script_facets(db_session)
+    db_session.commit()
+
+    assert list_facet_values(db_session, PLATFORM) == ["Linux", "Mac OS", "Windows"]
+    assert list_facet_values(db_session, CATEGORY) == ["Monitoring", "Utility"]
+
+def test_reindexing_a_script_replaces_its_facets(db_session: Session):
+    index_script_facets(db_session)
+    db_session.query(Script).filter(Script.id == "scr-2").update({Script.platforms: ["Windows"], Script.category_name: None})
+    index_script_facets(db_session, ["scr-2"])
+    db_session.commit()
+
+    assert db_session.query(ScriptFacet).filter(ScriptFacet.script_id == "scr-2").count() == 1
+    assert _matching_ids(db_session, PLATFORM, "linux") == []
+    assert _matching_ids(db_session, PLATFORM, "windows") == ["scr-1", "scr-2", "scr-3"]
+    assert list_facet_values(db_session, CATEGORY) == ["Utility"]
@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+
+from backend.app.models.database import Base, Device, DeviceAsset, DeviceSearchDocument
+from backend.app.services.device_service import DeviceService
+from backend.app.services.search_index import (
+    index_devices, rebuild_search_index_if_empty, search_backend, search_device_identifiers
+)
+
+TEST_DATABASE_URL = "sqlite:///:memory:"
+
+engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="function")
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add_all([
+        Device(identifier="dev-1", name="Alpha Server", description="Primary database host",
+               organization_name="Acme", site_name="HQ", group_name="Servers",
+               external_ip_address="203.0.113.10",
+               local_ip_addresses=[{"Name": "Ethernet", "IPs": ["10.0.0.15"]}]),
+        Device(identifier="dev-2", name="Beta Laptop", description="Alpha team laptop",
+               organization_name="Globex", site_name="Branch"),
+        Device(identifier="dev-3", name="Gamma Kiosk", organization_name="Acme"),
+    ])
+    session.add(DeviceAsset(device_identifier="dev-3", tags=["lobby", "touchscreen"]))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+def test_sqlite_uses_fts5(db_session: Session):
+    assert search_backend(db_session) == "fts5"
+
+def test_rebuild_if_empty_indexes_existing_devices(db_session: Session):
+    assert rebuild_search_index_if_empty(db_session) == 3
+    assert rebuild_search_index_if_empty(db_session) == 0
+
+def test_name_matches_rank_above_description_matches(db_session: Session):
+    index_devices(db_session)
+    db_session.commit()
+
+    assert search_device_identifiers(db_session, "alpha") == ["dev-1", "dev-2"]
+
+def test_search_covers_ips_locations_and_tags(db_session: Session):
+    index_devices(db_session)
+    db_session.commit()
+
+    assert search_device_identifiers(db_session, "10.0.0") == ["dev-1"]
+    assert search_device_identifiers(db_session, "globex") == ["dev-2"]
+    assert search_device_identifiers(db_session, "touchscr") == ["dev-3"]
+    assert search_device_identifiers(db_session, "acme kiosk") == ["dev-3"]
+
+def test_short_terms_fall_back_to_like(db_session: Session):
+    index_devices(db_session)
+    db_session.commit()
+
+    assert search_device_identifiers(db_session, "be") == ["dev-2"]
+
+def test_reindexing_a_device_replaces_its_document(db_session: Session):
+    index_devices(db_session)
+    db_session.query(Device).filter(Device.identifier == "dev-2").update({Device.name: "Delta Laptop"})
+    index_devices(db_session, ["dev-2"])
+    db_session.commit()
+
+    assert db_session.query(DeviceSearchDocument).count() == 3
+    assert search_device_identifiers(db_session, "beta") == []
+    assert search_device_identifiers(db_session, "delta") == ["dev-2"]
+
+def test_device_service_search_returns_ranked_rows(db_session: Session):
+    index_devices(db_session)
+    db_session.commit()
+
+    rows = DeviceService(db=db_session, pulseway_client=MagicMock()).search_devices_by_term("alpha", limit=1)
+
+    assert [row.identifier for row in rows] == ["dev-1"]
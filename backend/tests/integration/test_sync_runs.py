@@ -0,0 +1,157 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app import main
+from backend.app.main import app
+from backend.app.api import sync as sync_api
+from backend.app.models.database import Base, Organization, SyncRun
+from backend.app.pulseway.client import PulsewayClient, pulseway_api_breaker
+from backend.app.security import get_current_active_api_key
+from backend.app.services.data_sync import DataSyncService
+from backend.app.services.event_bus import EventBus
+from backend.app.services.leadership import SYNC_REQUEST_MESSAGE
+from backend.app.services.sync_journal import RUN_INTERRUPTED, mark_interrupted_runs, start_run
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+ORGANIZATIONS = [{"Id": 1, "Name": "Acme"}, {"Id": 2, "Name": "Globex"}]
+
+def fake_response(status_code: int, payload: dict):
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = json.dumps(payload).encode()
+    response.text = response.content.decode()
+    response.json.return_value = payload
+    return response
+
+def pulseway(failing_endpoint: str = None):
+    """A real client whose HTTP session answers from ORGANIZATIONS; everything else is empty"""
+    def request(method, url, params=None, **kwargs):
+        endpoint = url.rsplit("/v3/", 1)[-1]
+        if endpoint == failing_endpoint:
+            return fake_response(500, {"Message": "boom"})
+        if endpoint == "organizations" and params and params["$skip"] == 0:
+            return fake_response(200, {"Data": ORGANIZATIONS})
+        return fake_response(200, {"Data": []})
+
+    client = PulsewayClient("https://api.pulseway.com/v3/", "id", "secret")
+    client.min_request_interval = 0
+    client.session.request = MagicMock(side_effect=request)
+    return client
+
+@pytest.fixture(scope="function")
+def db_session():
+    pulseway_api_breaker.close()  # Other tests may leave the shared breaker open
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add(Organization(id=2, name="Globex"))  # Already synced, unchanged
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        pulseway_api_breaker.close()
+        Base.metadata.drop_all(bind=engine)
+
+def run_sync(client: PulsewayClient, **kwargs):
+    service = DataSyncService(client)
+    service.db_session = TestingSessionLocal
+    asyncio.run(service.sync_all_data(**kwargs))
+
+def test_each_run_and_stage_is_journaled(db_session):
+    run_sync(pulseway(), trigger="manual")
+
+    run = db_session.query(SyncRun).one()
+    assert (run.trigger, run.status, run.error) == ("manual", "succeeded", None)
+    assert run.finished_at is not None and run.duration_seconds >= 0
+    assert [stage.stage for stage in run.stages] == [
+        "organizations", "sites", "groups", "devices", "device_assets", "notifications", "scripts", "tasks", "workflows"]
+
+    organizations = run.stages[0]
+    assert (organizations.rows_fetched, organizations.rows_created, organizations.rows_updated,
+            organizations.rows_unchanged) == (2, 1, 0, 1)
+    assert organizations.api_calls == 2  # One page of data, then an empty page
+    assert organizations.bytes_received > 0
+    assert organizations.status == "succeeded"
+
+    # Run totals are the sum of the stages
+    assert run.rows_fetched == 2 and run.rows_created == 1
+    assert run.api_calls == sum(stage.api_calls for stage in run.stages) == 2 + 8
+    assert run.bytes_received == sum(stage.bytes_received for stage in run.stages)
+
+def test_failed_stage_fails_the_run(db_session):
+    with pytest.raises(Exception):
+        run_sync(pulseway(failing_endpoint="sites"))
+
+    run = db_session.query(SyncRun).one()
+    assert (run.trigger, run.status) == ("scheduled", "failed")
+    assert "500" in run.error
+    stages = {stage.stage: stage for stage in run.stages}
+    assert list(stages) == ["organizations", "sites"]
+    assert stages["sites"].status == "failed"
+    assert stages["sites"].api_errors == 1
+    assert run.api_errors == 1
+
+def test_runs_left_running_are_marked_interrupted(db_session):
+    run_id = start_run(db_session, "scheduled")
+    assert mark_interrupted_runs(db_session) == 1
+    db_session.expire_all()
+    assert db_session.get(SyncRun, run_id).status == RUN_INTERRUPTED
+
+def test_runs_endpoint_lists_newest_first_with_optional_stages(db_session, monkeypatch):
+    run_sync(pulseway(), trigger="startup")
+    run_sync(pulseway(), trigger="manual")
+
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setenv("API_KEY", "test-api-key")
+    app.dependency_overrides[sync_api.get_db] = override_get_db
+    app.dependency_overrides[get_current_active_api_key] = lambda: None
+    try:
+        client = TestClient(app, headers={"X-API-Key": "test-api-key"})
+        runs = client.get("/api/v1/sync/runs").json()
+        assert [run["trigger"] for run in runs] == ["manual", "startup"]
+        assert runs[0]["stages"] is None
+        assert runs[1]["rows_created"] == 1 and runs[0]["rows_created"] == 0
+
+        runs = client.get("/api/v1/sync/runs", params={"trigger": "startup", "include_stages": True}).json()
+        assert len(runs) == 1 and len(runs[0]["stages"]) == 9
+
+        run = client.get(f"/api/v1/sync/runs/{runs[0]['id']}").json()
+        assert run["stages"][0]["rows_unchanged"] == 1
+        assert client.get("/api/v1/sync/runs/999").status_code == 404
+        assert client.get("/api/v1/sync/runs", params={"status": "bogus"}).status_code == 422
+    finally:
+        for dependency in (sync_api.get_db, get_current_active_api_key):
+            app.dependency_overrides.pop(dependency, None)
+
+def test_manual_sync_on_a_follower_goes_to_the_leader(monkeypatch):
+    class FollowerLock:
+        is_leader = False
+
+    monkeypatch.setenv("API_KEY", "test-api-key")
+    monkeypatch.setattr(app.state, "sync_leader", FollowerLock(), raising=False)
+    client = TestClient(app, headers={"X-API-Key": "test-api-key"})
+
+    # The in-process bus cannot reach the leader
+    assert client.post("/api/sync").status_code == 409
+
+    bus = EventBus()
+    bus.crosses_workers = True
+    bus.publish_internal = AsyncMock()
+    monkeypatch.setattr(main, "event_bus", bus)
+    response = client.post("/api/sync")
+    assert response.status_code == 202 and response.json()["status"] == "accepted"
+    bus.publish_internal.assert_awaited_once_with({"type": SYNC_REQUEST_MESSAGE})
@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.models.database import Base, BulkExecutionItem, BulkExecutionJob, Script
+from backend.app.pulseway.client import PulsewayAPIError, PulsewayClient
+from backend.app.services.bulk_execution import (
+    JOB_LEASE_SECONDS, BulkExecutionRunner, create_bulk_job, get_job_status, mark_interrupted_jobs
+)
+
+
+class TestBulkExecutionRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.db = self.Session()
+        self.db.add(Script(id="scr-1", name="Restart Spooler"))
+        self.db.commit()
+
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.client = MagicMock()
+        self.client.run_script.side_effect = self._run_script
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def _run_script(self, script_id, device_id, variables=None, webhook_url=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        if device_id == "dev-3":
+            raise PulsewayAPIError("Device rejected the run", status_code=409)
+        if device_id == "dev-4":
+            return {"Data": {}}
+        return {"Data": {"ExecutionId": f"exec-{device_id}"}}
+
+    def test_dispatches_with_bounded_concurrency_and_records_results(self):
+        job = create_bulk_job(self.db, "scr-1", [f"dev-{i}" for i in range(12)] + ["dev-0"])
+        runner = BulkExecutionRunner(session_factory=self.Session, concurrency=3)
+
+        async def run():
+            await runner.run(job.id, self.client)
+            await runner.shutdown()
+        asyncio.run(run())
+        self.db.expire_all()
+
+        self.assertEqual(self.client.run_script.call_count, 12)  # Duplicate identifier dispatched once
+        self.assertLessEqual(self.max_in_flight, 3)
+        status = get_job_status(self.db, job.id, include_items=True, item_status="failed")
+        self.assertEqual((status["status"], status["total"], status["succeeded"], status["failed"], status["pending"]),
+                         ("completed", 12, 10, 2, 0))
+        errors = {item.device_identifier: (item.error, item.status_code) for item in status["items"]}
+        self.assertEqual(errors["dev-3"], ("Device rejected the run", 409))
+        self.assertEqual(errors["dev-4"], ("No execution ID returned", None))
+
+        succeeded = self.db.query(BulkExecutionItem).filter(BulkExecutionItem.device_identifier == "dev-1").one()
+        self.assertEqual(succeeded.execution_id, "exec-dev-1")
+
+    def test_mark_interrupted_jobs_fails_undispatched_items(self):
+        job = create_bulk_job(self.db, "scr-1", ["dev-1", "dev-2"], owner="web-1:42")
+        self.assertEqual(mark_interrupted_jobs(self.db), 0)  # Its worker may still pick it up
+
+        # The owner never renewed the lease
+        job.heartbeat_at = datetime.now(timezone.utc) - timedelta(seconds=JOB_LEASE_SECONDS + 1)
+        self.db.commit()
+        self.assertEqual(mark_interrupted_jobs(self.db), 1)
+        status = get_job_status(self.db, job.id)
+        self.assertEqual((status["status"], status["failed"], status["pending"]), ("interrupted", 2, 0))
+
+        # An interrupted job is never picked up again
+        asyncio.run(BulkExecutionRunner(session_factory=self.Session).run(job.id, self.client))
+        self.client.run_script.assert_not_called()
+
+    def test_restart_mid_job_reports_in_flight_items_as_unknown(self):
+        job = create_bulk_job(self.db, "scr-1", ["dev-1", "dev-2", "dev-5"])
+        dispatched, release = threading.Event(), threading.Event()
+
+        def run_script(script_id, device_id, variables=None, webhook_url=None):
+            if device_id == "dev-2":
+                dispatched.set()
+                release.wait(5)  # The server stops while this run request is in flight
+            return {"Data": {"ExecutionId": f"exec-{device_id}"}}
+        self.client.run_script.side_effect = run_script
+        runner = BulkExecutionRunner(session_factory=self.Session, concurrency=1)
+
+        async def stop_mid_job():
+            runner.submit(job.id, self.client)
+            await asyncio.get_running_loop().run_in_executor(None, dispatched.wait, 5)
+            executor = runner._executor
+            await runner.shutdown()
+            return executor
+        executor = asyncio.run(stop_mid_job())
+        try:
+            self.db.expire_all()
+            self.assertEqual(mark_interrupted_jobs(self.db), 1)
+            status = get_job_status(self.db, job.id, include_items=True)
+            self.assertEqual((status["status"], status["succeeded"], status["failed"], status["unknown"],
+                              status["pending"]), ("interrupted", 1, 1, 1, 0))
+            items = {item.device_identifier: item for item in status["items"]}
+            self.assertEqual(items["dev-1"].status, "succeeded")
+            self.assertEqual(items["dev-2"].status, "unknown")
+            self.assertIn("may have run", items["dev-2"].error)
+            self.assertEqual(items["dev-5"].status, "failed")
+            self.assertIn("Not dispatched", items["dev-5"].error)
+        finally:
+            release.set()
+            executor.shutdown(wait=True)
+
+        # The in-flight run's outcome arrived after all: it replaces the unknown, counted once
+        self.db.expire_all()
+        status = get_job_status(self.db, job.id)
+        self.assertEqual((status["status"], status["succeeded"], status["failed"], status["unknown"]),
+                         ("interrupted", 2, 1, 0))
+
+    def test_jobs_of_live_workers_are_left_alone(self):
+        job = create_bulk_job(self.db, "scr-1", ["dev-1", "dev-2", "dev-5"])
+        dispatched, release = threading.Event(), threading.Event()
+
+        def run_script(script_id, device_id, variables=None, webhook_url=None):
+            if device_id == "dev-2":
+                dispatched.set()
+                release.wait(5)
+            return {"Data": {"ExecutionId": f"exec-{device_id}"}}
+        self.client.run_script.side_effect = run_script
+        runner = BulkExecutionRunner(session_factory=self.Session, concurrency=1, lease_seconds=0.2)
+
+        async def sweep_mid_job():
+            task = runner.submit(job.id, self.client)
+            await asyncio.get_running_loop().run_in_executor(None, dispatched.wait, 5)
+            await asyncio.sleep(0.3)  # Longer than the lease: only renewals keep the job
+            swept_live = mark_interrupted_jobs(self.db, lease_seconds=0.2)
+            # A sweep that takes the job for abandoned anyway, e.g. after a missed renewal
+            swept_stale = mark_interrupted_jobs(self.db, lease_seconds=0)
+            release.set()
+            await task
+            await runner.shutdown()
+            return swept_live, swept_stale
+        self.assertEqual(asyncio.run(sweep_mid_job()), (0, 1))
+
+        self.db.expire_all()
+        job = self.db.query(BulkExecutionJob).filter(BulkExecutionJob.id == job.id).one()
+        self.assertEqual(job.owner, runner.worker_id)
+        # Not completed over the interruption, dev-5 never dispatched, each item counted once
+        status = get_job_status(self.db, job.id)
+        self.assertEqual((status["status"], status["succeeded"], status["failed"], status["unknown"]),
+                         ("interrupted", 2, 1, 0))
+        self.assertEqual(self.client.run_script.call_count, 2)
+
+
+class TestPulsewayClientRateLimit(unittest.TestCase):
+
+    def test_rate_limit_spaces_requests_across_threads(self):
+        client = PulsewayClient("https://example.invalid", "id", "secret")
+        client.min_request_interval = 0.02
+        starts = []
+
+        def call():
+            client._rate_limit()
+            starts.append(time.time())
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        starts.sort()
+        gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+        self.assertTrue(all(gap >= 0.015 for gap in gaps), gaps)
+
+
+if __name__ == '__main__':
+    unittest.main()
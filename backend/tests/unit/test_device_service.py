@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import MagicMock, patch, call, ANY
 from sqlalchemy import func # Required for func.count
-from backend.app.services.device_service import DeviceService
+from backend.app.services.device_service import DeviceService, DEVICE_SUMMARY_COLUMNS
 from backend.app.models.database import Device # Assuming Device model has these attributes
 from backend.app.models.dto import DeviceFilters
 
@@ -822,7 +822,7 @@ class TestDeviceService(unittest.TestCase):
         result = self.service.search_devices_by_term(search_term, limit=limit_val, offset=offset_val)
 
         self.assertEqual(result, mock_devices)
-        self.mock_db.query.assert_called_once_with(Device)
+        self.mock_db.query.assert_called_once_with(*DEVICE_SUMMARY_COLUMNS)
 
         # Check that filter was called with a condition involving the search term.
         # This requires knowledge of how the ILIKE/CONTAINS is constructed.
@@ -875,7 +875,7 @@ class TestDeviceService(unittest.TestCase):
         result = self.service.get_devices_by_organization_name(org_name, limit=limit_val, offset=offset_val)
 
         self.assertEqual(result, mock_devices)
-        self.mock_db.query.assert_called_once_with(Device)
+        self.mock_db.query.assert_called_once_with(*DEVICE_SUMMARY_COLUMNS)
         # mock_query_obj.filter.assert_called_once_with(Device.organization_name == org_name) # Requires Device.organization_name to be mockable
         mock_query_obj.filter.assert_called_once() # Basic check
         mock_filter_obj.offset.assert_called_once_with(offset_val)
@@ -903,7 +903,7 @@ class TestDeviceService(unittest.TestCase):
         result = self.service.get_devices_by_site_name(site_name, limit=limit_val, offset=offset_val)
 
         self.assertEqual(result, mock_devices)
-        self.mock_db.query.assert_called_once_with(Device)
+        self.mock_db.query.assert_called_once_with(*DEVICE_SUMMARY_COLUMNS)
         # mock_query_obj.filter.assert_called_once_with(Device.site_name == site_name)
         mock_query_obj.filter.assert_called_once() # Basic check
         mock_filter_obj.offset.assert_called_once_with(offset_val)
@@ -935,7 +935,7 @@ class TestDeviceService(unittest.TestCase):
         result = self.service.get_devices_with_critical_alerts(limit=limit_val, offset=offset_val)
 
         self.assertEqual(result, mock_devices)
-        self.mock_db.query.assert_called_once_with(Device)
+        self.mock_db.query.assert_called_once_with(*DEVICE_SUMMARY_COLUMNS)
         # mock_query_obj.filter.assert_called_once_with(Device.has_alerts == True, Device.alert_severity == 'critical')
         self.assertEqual(mock_query_obj.filter.call_count, 1) # Check filter was called (specific args are harder)
         mock_filter_obj.order_by.assert_called_once() # Check order_by was called
@@ -966,7 +966,7 @@ class TestDeviceService(unittest.TestCase):
         result = self.service.get_devices_with_elevated_alerts(limit=limit_val, offset=offset_val)
 
         self.assertEqual(result, mock_devices)
-        self.mock_db.query.assert_called_once_with(Device)
+        self.mock_db.query.assert_called_once_with(*DEVICE_SUMMARY_COLUMNS)
         # mock_query_obj.filter.assert_called_once_with(Device.has_alerts == True, Device.alert_severity == 'elevated')
         self.assertEqual(mock_query_obj.filter.call_count, 1) # Check filter was called
         mock_filter_obj.order_by.assert_called_once()
@@ -998,7 +998,7 @@ class TestDeviceService(unittest.TestCase):
         result = self.service.get_offline_devices_list(limit=limit_val, offset=offset_val)
 
         self.assertEqual(result, mock_devices)
-        self.mock_db.query.assert_called_once_with(Device)
+        self.mock_db.query.assert_called_once_with(*DEVICE_SUMMARY_COLUMNS)
         # mock_query_obj.filter.assert_called_once_with(Device.is_online == False)
         mock_query_obj.filter.assert_called_once() # Basic check
         mock_filter_obj.order_by.assert_called_once()
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import socket
+import tempfile
+import unittest
+
+from backend.app.services.event_bus import (
+    POSTGRES_MAX_PAYLOAD, EventBus, PostgresEventBus, UnixSocketEventBus, create_event_bus
+)
+from backend.app.services.leadership import FileLeaderLock
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, message, topics, coalesce_key):
+        self.events.append((message, topics, coalesce_key))
+
+
+class FakePostgres:
+    """The parts of a psycopg2 connection PostgresEventBus uses, over one shared fake server."""
+
+    def __init__(self, server=None):
+        self.server = server if server is not None else {"rows": {}, "notifies": []}
+
+    def cursor(self):
+        return FakeCursor(self.server)
+
+
+class FakeCursor:
+    def __init__(self, server):
+        self.server = server
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, statement, parameters):
+        rows = self.server["rows"]
+        if statement.startswith("INSERT"):
+            payload_id = len(rows) + 1
+            rows[payload_id] = parameters[0]
+            self.result = (payload_id,)
+        elif statement.startswith("SELECT pg_notify"):
+            self.server["notifies"].append(parameters[1])
+        elif statement.startswith("SELECT payload"):
+            self.result = (rows[parameters[0]],) if parameters[0] in rows else None
+
+    def fetchone(self):
+        return self.result
+
+
+class TestEventBus(unittest.TestCase):
+
+    def test_in_process_bus_delivers_to_local_handlers(self):
+        async def scenario():
+            bus, recorder = EventBus(), Recorder()
+            bus.add_handler(recorder)
+            await bus.publish({"type": "STATS_UPDATE"}, ["stats"], "STATS_UPDATE")
+            self.assertEqual(recorder.events, [({"type": "STATS_UPDATE"}, ["stats"], "STATS_UPDATE")])
+
+        asyncio.run(scenario())
+
+    def test_unix_socket_bus_reaches_other_workers_once(self):
+        async def scenario():
+            with tempfile.TemporaryDirectory() as socket_dir:
+                workers = [UnixSocketEventBus(socket_dir) for _ in range(3)]
+                recorders = [Recorder() for _ in workers]
+                for bus, recorder in zip(workers, recorders):
+                    bus.add_handler(recorder)
+                    await bus.start()
+                # A socket left behind by a crashed worker is skipped and removed
+                stale = os.path.join(socket_dir, "worker-dead.sock")
+                dead = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                dead.bind(stale)
+                dead.close()
+
+                await workers[0].publish({"type": "DEVICE_UPDATE", "id": "dev-1"}, ["device:dev-1"])
+                await asyncio.sleep(0.05)
+                for bus in workers:
+                    await bus.stop()
+
+                for recorder in recorders:
+                    self.assertEqual(recorder.events, [({"type": "DEVICE_UPDATE", "id": "dev-1"}, ["device:dev-1"], None)])
+                self.assertEqual(os.listdir(socket_dir), [])
+
+        asyncio.run(scenario())
+
+    def test_internal_messages_only_reach_other_workers_internal_handlers(self):
+        async def scenario():
+            with tempfile.TemporaryDirectory() as socket_dir:
+                workers = [UnixSocketEventBus(socket_dir) for _ in range(2)]
+                recorders, internal = [Recorder() for _ in workers], [[] for _ in workers]
+                for bus, recorder, received in zip(workers, recorders, internal):
+                    bus.add_handler(recorder)
+
+                    async def handler(message, received=received):
+                        received.append(message)
+                    bus.add_internal_handler(handler)
+                    await bus.start()
+
+                await workers[0].publish_internal({"type": "suggest_index.refresh", "types": ["script"]})
+                await asyncio.sleep(0.05)
+                for bus in workers:
+                    await bus.stop()
+
+                self.assertEqual(internal, [[], [{"type": "suggest_index.refresh", "types": ["script"]}]])
+                self.assertEqual([recorder.events for recorder in recorders], [[], []])  # Never sent to clients
+
+        asyncio.run(scenario())
+
+    def test_postgres_bus_stores_events_too_large_for_notify(self):
+        async def scenario():
+            sender, receiver = PostgresEventBus("postgresql://db"), PostgresEventBus("postgresql://db")
+            sender._notify_conn = FakePostgres()
+            receiver._listen_conn = FakePostgres(sender._notify_conn.server)
+            recorder = Recorder()
+            receiver.add_handler(recorder)
+
+            large = {"type": "DEVICE_UPDATE", "devices": ["x" * 100] * 200}
+            await sender.publish({"type": "STATS_UPDATE"}, ["stats"])
+            await sender.publish(large, ["device:*"])
+            notifies = sender._notify_conn.server["notifies"]
+            for payload in notifies:
+                receiver._receive(payload.encode("utf-8"))
+            await asyncio.sleep(0)
+
+            self.assertTrue(all(len(payload) <= POSTGRES_MAX_PAYLOAD for payload in notifies))
+            self.assertEqual(recorder.events, [({"type": "STATS_UPDATE"}, ["stats"], None), (large, ["device:*"], None)])
+
+        asyncio.run(scenario())
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            create_event_bus("carrier-pigeon")
+
+
+class TestFileLeaderLock(unittest.TestCase):
+
+    def test_only_one_holder_until_released(self):
+        with tempfile.TemporaryDirectory() as lock_dir:
+            path = os.path.join(lock_dir, "sync.lock")
+            first, second = FileLeaderLock(path), FileLeaderLock(path)
+
+            self.assertTrue(first.try_acquire())
+            self.assertFalse(second.try_acquire())
+
+            first.release()
+            self.assertTrue(second.try_acquire())
+            second.release()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import unittest
+
+from backend.app.services.event_bus import EventBus
+from backend.app.services.event_stream import EventStreamHub
+
+
+def _parse(chunk: str):
+    """(id, event, data) of each event in a text/event-stream chunk."""
+    events = []
+    for block in chunk.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestEventStreamHub(unittest.TestCase):
+
+    def test_stream_filters_topics_and_batches_bursts(self):
+        async def scenario():
+            bus = EventBus()
+            hub = EventStreamHub(bus=bus)
+            stream = hub.stream({"stats", "device:*"}, flush_interval=0.02)
+            self.assertEqual(await stream.__anext__(), "retry: 3000\n\n")
+
+            next_chunk = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0)
+            await bus.publish({"type": "STATS_UPDATE", "n": 1}, ["stats"])
+            await bus.publish({"type": "SCRIPT_EXECUTION_UPDATE"}, ["script_executions"])
+            await bus.publish({"type": "DEVICE_UPDATE", "n": 2}, ["device:dev-1", "org:5"])
+            chunk = await next_chunk
+            await stream.aclose()
+
+            self.assertEqual([(event, data.get("n")) for _, event, data in _parse(chunk)],
+                             [("STATS_UPDATE", 1), ("DEVICE_UPDATE", 2)])
+            self.assertEqual(hub.subscribers, set())
+
+        asyncio.run(scenario())
+
+    def test_resume_from_last_event_id(self):
+        async def scenario():
+            hub = EventStreamHub(replay_size=3)
+            for n in range(1, 6):
+                await hub.deliver({"type": "STATS_UPDATE", "n": n}, ["stats"])
+
+            _, replay, reset = hub.subscribe({"stats"}, f"{hub.epoch}-3")
+            self.assertFalse(reset)
+            self.assertEqual([json.loads(e.data)["n"] for e in replay], [4, 5])
+
+            # Older than the buffer, or issued by another process: the client must reload
+            self.assertTrue(hub.subscribe({"stats"}, f"{hub.epoch}-1")[2])
+            self.assertTrue(hub.subscribe({"stats"}, "0123456789ab-4")[2])
+
+            stream = hub.stream(None, f"{hub.epoch}-1")
+            head = await stream.__anext__()
+            await stream.aclose()
+            self.assertEqual([event for _, event, _ in _parse(head)], ["reset"])
+
+        asyncio.run(scenario())
+
+    def test_stream_that_falls_behind_is_closed(self):
+        async def scenario():
+            hub = EventStreamHub(max_queue=2)
+            subscriber, _, _ = hub.subscribe(None)
+            for n in range(3):
+                await hub.deliver({"type": "PUSH_NOTIFICATION", "n": n})
+
+            self.assertTrue(subscriber.closed)
+            self.assertNotIn(subscriber, hub.subscribers)
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.database import Base, BulkExecutionItem, Execution, Script
+from backend.app.services.bulk_execution import create_bulk_job, get_job_executions
+from backend.app.services.execution_cache import ExecutionCache, record_started_executions
+from backend.app.services.execution_webhooks import parse_execution_webhook, record_execution, build_test_payload
+
+
+def _details(state, output="done"):
+    return {"Data": {"Id": "exec-1", "StartTime": "2024-02-01T13:22:39.249457Z", "DurationInSeconds": 1.5,
+                     "State": state, "EndTime": "2024-02-01T13:22:40.7564551Z", "Output": output,
+                     "ExitCode": 0, "VariableOutputs": []}}
+
+
+class TestExecutionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine, autoflush=False)()
+        self.client = MagicMock()
+        self.cache = ExecutionCache(ttl_seconds=60)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_terminal_details_are_fetched_once(self):
+        self.client.get_script_execution_details.return_value = _details("Successful")
+
+        first = self.cache.get_script_execution_details(self.db, self.client, "scr-1", "dev-1", "exec-1")
+        second = self.cache.get_script_execution_details(self.db, self.client, "scr-1", "dev-1", "exec-1")
+
+        self.assertEqual(first, second)
+        self.assertEqual((second["state"], second["output"], second["exit_code"]), ("Successful", "done", "0"))
+        self.client.get_script_execution_details.assert_called_once()
+
+    def test_running_details_expire_after_ttl(self):
+        self.client.get_script_execution_details.return_value = _details("Running", output="")
+        cache = ExecutionCache(ttl_seconds=0)
+
+        cache.get_script_execution_details(self.db, self.client, "scr-1", "dev-1", "exec-1")
+        self.client.get_script_execution_details.return_value = _details("Successful")
+        result = cache.get_script_execution_details(self.db, self.client, "scr-1", "dev-1", "exec-1")
+
+        self.assertEqual(result["state"], "Successful")
+        self.assertEqual(self.client.get_script_execution_details.call_count, 2)
+
+    def test_webhook_state_change_refetches_stale_output(self):
+        self.client.get_script_execution_details.return_value = _details("Running", output="")
+        self.cache.get_script_execution_details(self.db, self.client, "scr-1", "dev-1", "exec-1")
+
+        record_execution(self.db, parse_execution_webhook(
+            build_test_payload("script", "scr-1", "dev-1", execution_id="exec-1", state="Successful")))
+        self.client.get_script_execution_details.return_value = _details("Successful")
+        result = self.cache.get_script_execution_details(self.db, self.client, "scr-1", "dev-1", "exec-1")
+
+        self.assertEqual(result["output"], "done")
+        self.assertEqual(self.client.get_script_execution_details.call_count, 2)
+
+    def test_list_pages_are_cached_and_render_local_state(self):
+        self.client.get_script_executions.return_value = {
+            "Data": [{"Id": "exec-1", "StartTime": "2024-02-01T13:22:39Z", "DurationInSeconds": None, "State": "Running"}],
+            "Meta": {"TotalCount": 1},
+        }
+        self.cache.list_script_executions(self.db, self.client, "scr-1", "dev-1", top=20, skip=0)
+        self.db.query(Execution).update({Execution.state: "Successful"})
+        self.db.commit()
+
+        executions, total = self.cache.list_script_executions(self.db, self.client, "scr-1", "dev-1", top=20, skip=0)
+
+        self.assertEqual(total, 1)
+        self.assertEqual([(e["Id"], e["State"]) for e in executions], [("exec-1", "Successful")])
+        self.client.get_script_executions.assert_called_once()
+
+        # Starting a new run on the device drops its cached pages
+        self.cache.invalidate("scr-1", "dev-1")
+        self.cache.list_script_executions(self.db, self.client, "scr-1", "dev-1", top=20, skip=0)
+        self.assertEqual(self.client.get_script_executions.call_count, 2)
+
+    def test_job_executions_join_dispatch_results_with_execution_state(self):
+        self.db.add(Script(id="scr-1", name="Restart Spooler"))
+        self.db.commit()
+        job = create_bulk_job(self.db, "scr-1", ["dev-1", "dev-2", "dev-3"])
+        items = {item.device_identifier: item for item in self.db.query(BulkExecutionItem)}
+        items["dev-1"].status, items["dev-1"].execution_id = "succeeded", "exec-1"
+        items["dev-2"].status, items["dev-2"].error = "failed", "Device offline"
+        record_started_executions(self.db, "scr-1", [("dev-1", "exec-1")])
+        self.db.commit()
+
+        executions = get_job_executions(self.db, job.id)
+
+        self.assertEqual([(e["device_identifier"], e["state"]) for e in executions],
+                         [("dev-1", "Running"), ("dev-2", "NotStarted"), ("dev-3", "Pending")])
+
+
+if __name__ == '__main__':
+    unittest.main()
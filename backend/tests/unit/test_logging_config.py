@@ -1,11 +1,13 @@
 import pytest
 import logging
+import queue
 import structlog
 from structlog.testing import capture_logs
 from pathlib import Path
 from unittest.mock import patch, mock_open
 
-from backend.app.logging_config import setup_logging
+from backend.app import logging_config
+from backend.app.logging_config import BoundedQueueHandler, flush_logging, setup_logging, stop_logging
 
 @pytest.fixture(autouse=True)
 def reset_structlog_and_logging():
@@ -21,6 +23,7 @@ def reset_structlog_and_logging():
     root_logger.setLevel(logging.WARNING)
     yield # Test runs here
     # Post-test cleanup (same as pre-test, to be safe)
+    stop_logging()
     structlog.reset_defaults()
     root_logger = logging.getLogger()
     for handler in root_logger.handlers[:]:
@@ -100,8 +103,34 @@ def test_setup_logging_configures_stdlib_logger(log_dir_mock):
     setup_logging(log_level="INFO")
     root_logger = logging.getLogger()
     assert root_logger.getEffectiveLevel() == logging.INFO
-    # Expected 3 handlers: console, file, error_file
-    assert len(root_logger.handlers) == 3
+    # The root logger only enqueues; console, file and error_file run on the listener thread
+    assert len(root_logger.handlers) == 1
+    assert isinstance(root_logger.handlers[0], BoundedQueueHandler)
+    assert len(logging_config._listener.handlers) == 3
+
+
+def test_full_queue_drops_and_counts_records():
+    log_queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue)
+    logger = logging.getLogger("overflow_test")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for n in range(4):
+            logger.warning("message %d", n)
+        assert log_queue.qsize() == 2
+        assert handler.dropped == {"WARNING": 2}
+
+        log_queue.get_nowait()
+        log_queue.get_nowait()
+        logger.warning("after the burst")
+        queued = [log_queue.get_nowait().getMessage() for _ in range(log_queue.qsize())]
+        assert queued[0] == "after the burst"
+        assert "dropped 2 records (WARNING: 2)" in queued[1]
+        assert not handler.dropped
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
 
 
 def test_log_output_and_levels(log_dir_mock, caplog):
@@ -181,6 +210,7 @@ def test_log_files_created_and_written(log_dir_mock, tmp_path):
     logger.debug("A debug message for the main log file.")
     logger.info("An info message for the main log file (and console).")
     logger.error("An error message for main, error logs (and console).")
+    flush_logging()  # Records are written by the listener thread
 
     # Check if files were created (log_dir_mock handles Path("logs"))
     main_log_file = log_dir_mock / "pulseway_backend.log"
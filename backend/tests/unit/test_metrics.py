@@ -0,0 +1,99 @@
+import os
+import tempfile
+import time
+import unittest
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from backend.app.metrics import (
+    DB_QUERY_DURATION, Counter, Histogram, MetricsSpool, RequestDbStats, Registry, instrument_engine,
+    request_db_stats, route_template
+)
+from backend.app.pulseway.client import _endpoint_label
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram_and_counter_render_in_exposition_format(self):
+        registry = Registry()
+        requests = Counter("test_requests_total", "Requests.", ("route",))
+        latency = Histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        registry.register(requests)
+        registry.register(latency)
+
+        requests.labels('/a"b').inc()
+        requests.labels('/a"b').inc(2)
+        for value in (0.05, 0.5, 3.0):
+            latency.observe(value)
+
+        lines = registry.render().splitlines()
+        self.assertIn("# TYPE test_requests_total counter", lines)
+        self.assertIn('test_requests_total{route="/a\\"b"} 3', lines)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 2', lines)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn("test_latency_seconds_sum 3.55", lines)
+        self.assertIn("test_latency_seconds_count 3", lines)
+
+    def test_labels_use_route_and_endpoint_templates(self):
+        app = FastAPI()
+
+        @app.get("/api/v1/devices/{device_id}")
+        def get_device(device_id: str):
+            return {}
+
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/devices/abc-123", "root_path": ""}
+        self.assertEqual(route_template(app.router.routes, scope), "/api/v1/devices/{device_id}")
+        self.assertEqual(route_template(app.router.routes, dict(scope, path="/nowhere")), "<unmatched>")
+
+        self.assertEqual(_endpoint_label("devices/abc-123/notifications"), "devices/{id}/notifications")
+        self.assertEqual(
+            _endpoint_label("automation/scripts/s1/device/d1/executions/e1"),
+            "automation/scripts/{id}/device/{id}/executions/{id}")
+
+    def test_statements_are_counted_against_the_current_request(self):
+        engine = create_engine("sqlite://")
+        instrument_engine(engine)
+        instrument_engine(engine)  # Idempotent
+        observed = sum(DB_QUERY_DURATION.labels().counts)
+
+        stats = RequestDbStats()
+        token = request_db_stats.set(stats)
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                connection.execute(text("SELECT 2"))
+        finally:
+            request_db_stats.reset(token)
+
+        self.assertEqual(stats.queries, 2)
+        self.assertGreater(stats.seconds, 0)
+        self.assertEqual(sum(DB_QUERY_DURATION.labels().counts), observed + 2)
+
+    def test_spool_merges_every_workers_series_under_one_header(self):
+        registries = {}
+        for worker, count in (("101", 2), ("102", 5)):
+            registry = registries[worker] = Registry()
+            requests = Counter("test_spooled_total", "Requests.", ("route",))
+            registry.register(requests)
+            requests.labels("/a").inc(count)
+
+        with tempfile.TemporaryDirectory() as directory:
+            spools = {worker: MetricsSpool(directory, registry, worker=worker, interval=1)
+                      for worker, registry in registries.items()}
+            spools["102"].write()
+            # A worker that died without removing its file
+            MetricsSpool(directory, Registry(), worker="99", interval=1).write()
+            os.utime(os.path.join(directory, "worker-99.json"), (time.time() - 10,) * 2)
+
+            lines = registries["101"].render("101", spools["101"].read_others()).splitlines()
+            self.assertFalse(os.path.exists(os.path.join(directory, "worker-99.json")))
+
+        self.assertEqual(lines.count("# TYPE test_spooled_total counter"), 1)
+        self.assertIn('test_spooled_total{worker="101",route="/a"} 2', lines)
+        self.assertIn('test_spooled_total{worker="102",route="/a"} 5', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import unittest
+
+from unittest import mock
+
+from backend.app.services import realtime
+from backend.app.services.realtime import CLOSE_TRY_AGAIN_LATER, ENCODING_JSON, ENCODING_MSGPACK, ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0, block: bool = False):
+        self.delay = delay
+        self.block = block
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        if self.block:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(payload))
+
+    async def send_bytes(self, payload: bytes):
+        self.sent.append(realtime.msgpack.unpackb(payload))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+class TestConnectionManager(unittest.TestCase):
+
+    def test_slow_client_does_not_delay_others(self):
+        async def scenario():
+            manager = ConnectionManager()
+            fast, slow = FakeWebSocket(), FakeWebSocket(delay=0.2)
+            for websocket in (fast, slow):
+                await manager.connect(websocket)
+                await manager.subscribe(websocket, ["sync"])
+
+            await manager.broadcast({"type": "DATA_SYNC_COMPLETE"}, "sync")
+            await asyncio.sleep(0.05)
+            self.assertEqual(fast.sent, [{"type": "DATA_SYNC_COMPLETE"}])
+            self.assertEqual(slow.sent, [])
+
+            await asyncio.sleep(0.3)
+            self.assertEqual(slow.sent, [{"type": "DATA_SYNC_COMPLETE"}])
+
+        asyncio.run(scenario())
+
+    def test_latest_state_messages_are_coalesced(self):
+        async def scenario():
+            manager = ConnectionManager()
+            websocket = FakeWebSocket(delay=0.05)
+            await manager.connect(websocket)
+            await manager.subscribe(websocket, ["stats"])
+
+            await manager.broadcast({"type": "STATS_UPDATE", "n": 1}, "stats", coalesce_key="STATS_UPDATE")
+            await asyncio.sleep(0.01)  # n=1 is being sent
+            for n in (2, 3, 4):
+                await manager.broadcast({"type": "STATS_UPDATE", "n": n}, "stats", coalesce_key="STATS_UPDATE")
+            await asyncio.sleep(0.2)
+
+            self.assertEqual([message["n"] for message in websocket.sent], [1, 4])
+
+        asyncio.run(scenario())
+
+    def test_client_overflowing_its_queue_is_dropped(self):
+        async def scenario():
+            manager = ConnectionManager(max_queue=2)
+            stuck, healthy = FakeWebSocket(block=True), FakeWebSocket()
+            for websocket in (stuck, healthy):
+                await manager.connect(websocket)
+
+            for n in range(5):
+                await manager.broadcast({"type": "PUSH_NOTIFICATION", "n": n})
+                await asyncio.sleep(0.01)  # Give the writers a turn between messages
+            await asyncio.sleep(0.05)
+
+            self.assertEqual(stuck.closed_with, CLOSE_TRY_AGAIN_LATER)
+            self.assertEqual(manager.active_connections, [healthy])
+            self.assertEqual(len(healthy.sent), 5)
+            self.assertEqual(manager._drop_tasks, set())  # Finished drop tasks are released
+
+        asyncio.run(scenario())
+
+    def test_stalled_client_is_dropped_after_send_timeout(self):
+        async def scenario():
+            manager = ConnectionManager(send_timeout=0.05)
+            stuck = FakeWebSocket(block=True)
+            await manager.connect(stuck)
+
+            await manager.send_personal_message({"type": "PONG"}, stuck)
+            await asyncio.sleep(0.2)
+
+            self.assertEqual(stuck.closed_with, CLOSE_TRY_AGAIN_LATER)
+            self.assertEqual(manager.active_connections, [])
+
+        asyncio.run(scenario())
+
+    def test_fan_out_uses_topic_index_and_wildcards(self):
+        async def scenario():
+            manager = ConnectionManager()
+            one, all_devices, org = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            for websocket in (one, all_devices, org):
+                await manager.connect(websocket)
+            await manager.subscribe(one, ["device:dev-1", "device:dev-1"])
+            await manager.subscribe(all_devices, ["device:*"])
+            await manager.subscribe(org, ["org:5", "device:dev-2"])
+
+            await manager.broadcast({"type": "DEVICE_UPDATE", "id": "dev-1"}, "device:dev-1")
+            await manager.broadcast({"type": "DEVICE_UPDATE", "id": "dev-2"}, ["device:dev-2", "org:5"])
+            await asyncio.sleep(0.05)
+
+            self.assertEqual([m["id"] for m in one.sent], ["dev-1"])
+            self.assertEqual([m["id"] for m in all_devices.sent], ["dev-1", "dev-2"])
+            self.assertEqual([m["id"] for m in org.sent], ["dev-2"])  # Once, though subscribed to both topics
+            self.assertEqual(manager.subscriptions[one], {"device:dev-1"})
+
+            await manager.unsubscribe(org, ["org:5"])
+            manager.disconnect(all_devices)
+            self.assertEqual(set(manager.subscribers), {"device:dev-1", "device:dev-2"})
+            self.assertEqual(manager.subscriber_count("device:dev-3"), 0)
+
+        asyncio.run(scenario())
+
+    @unittest.skipIf(realtime.msgpack is None, "msgpack is not installed")
+    def test_msgpack_clients_get_binary_frames_encoded_once(self):
+        async def scenario():
+            manager = ConnectionManager()
+            text, binary, binary_too = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            for websocket in (text, binary, binary_too):
+                await manager.connect(websocket)
+                await manager.subscribe(websocket, ["sync"])
+            self.assertEqual(manager.set_encoding(binary, ENCODING_MSGPACK), ENCODING_MSGPACK)
+            self.assertEqual(manager.set_encoding(binary_too, ENCODING_MSGPACK), ENCODING_MSGPACK)
+            self.assertEqual(manager.set_encoding(text, "cbor"), ENCODING_JSON)
+
+            with mock.patch.object(realtime, "encode_message", wraps=realtime.encode_message) as encode:
+                await manager.broadcast({"type": "DATA_SYNC_COMPLETE", "n": 1}, "sync")
+            await asyncio.sleep(0.05)
+
+            self.assertEqual(encode.call_count, 2)  # Once per encoding, not per client
+            for websocket in (text, binary, binary_too):
+                self.assertEqual(websocket.sent, [{"type": "DATA_SYNC_COMPLETE", "n": 1}])
+
+        asyncio.run(scenario())
+
+    def test_msgpack_request_falls_back_to_json_when_unavailable(self):
+        async def scenario():
+            manager = ConnectionManager()
+            websocket = FakeWebSocket()
+            await manager.connect(websocket)
+            with mock.patch.object(realtime, "msgpack", None):
+                self.assertEqual(manager.set_encoding(websocket, ENCODING_MSGPACK), ENCODING_JSON)
+            await manager.send_personal_message({"type": "PONG"}, websocket)
+            await asyncio.sleep(0.05)
+            self.assertEqual(websocket.sent, [{"type": "PONG"}])
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import backend.app.responses as responses
+from backend.app.models.dto import DeviceDTO, DEVICE_SUMMARY_FIELDS
+from backend.app.responses import FastJSONResponse, dumps
+
+
+class TestFastJSONResponse(unittest.TestCase):
+
+    def test_renders_datetimes_and_nested_values(self):
+        content = [{"identifier": "dev-1", "last_seen_online": datetime(2024, 1, 2, 3, 4, 5), "tags": {"a": 1}}]
+
+        body = FastJSONResponse(content).body
+
+        self.assertEqual(json.loads(body), [{"identifier": "dev-1", "last_seen_online": "2024-01-02T03:04:05", "tags": {"a": 1}}])
+
+    def test_stdlib_fallback_matches_orjson_output(self):
+        content = {"when": datetime(2024, 1, 2, 3, 4, 5), "name": "Zürich"}
+
+        with patch.object(responses, "orjson", None):
+            fallback = dumps(content)
+
+        self.assertEqual(json.loads(fallback), json.loads(dumps(content)))
+
+    def test_row_to_dict_matches_from_entity(self):
+        row = ("dev-1", "Device", None, "windows", True, None, "Group", "Site", "Org",
+               None, 2, 12.5, 40.0, datetime(2024, 1, 2, 3, 4, 5), "Enabled", True)
+        self.assertEqual(len(row), len(DEVICE_SUMMARY_FIELDS))
+
+        data = DeviceDTO.row_to_dict(row)
+
+        self.assertEqual(data["identifier"], "dev-1")
+        self.assertIs(data["is_agent_installed"], False)
+        self.assertEqual(data["critical_notifications"], 0)
+        # The fast path must produce what response_model validation would
+        self.assertEqual(json.loads(dumps(data)), DeviceDTO(**data).model_dump(mode="json"))
+
+
+if __name__ == '__main__':
+    unittest.main()
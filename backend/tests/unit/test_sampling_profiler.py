@@ -0,0 +1,66 @@
+import threading
+import time
+import unittest
+
+from backend.app.sampling_profiler import ProfilerBusyError, SamplingProfiler
+
+
+def spin(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSamplingProfiler(unittest.TestCase):
+
+    def profile_spinning_thread(self, **kwargs):
+        stop = threading.Event()
+        worker = threading.Thread(target=spin, args=(stop,), name="spinner")
+        worker.start()
+        try:
+            with SamplingProfiler(interval_ms=2, **kwargs) as profiler:
+                time.sleep(0.2)
+        finally:
+            stop.set()
+            worker.join()
+        return profiler.profile
+
+    def test_busy_thread_shows_up_in_collapsed_stacks(self):
+        profile = self.profile_spinning_thread()
+
+        self.assertGreater(profile.samples, 10)
+        spinner_lines = [line for line in profile.collapsed().splitlines() if line.startswith("spinner;")]
+        self.assertTrue(spinner_lines)
+        stack, count = spinner_lines[0].rsplit(" ", 1)
+        self.assertTrue(stack.endswith("spin (tests/unit/test_sampling_profiler.py:8)"))
+        self.assertGreater(int(count), 0)
+
+    def test_speedscope_output_has_one_sampled_profile_per_thread(self):
+        profile = self.profile_spinning_thread(include_idle=True)
+        document = profile.speedscope("test")
+
+        names = [thread["name"] for thread in document["profiles"]]
+        self.assertIn("spinner", names)
+        self.assertIn("MainThread", names)
+        frame_count = len(document["shared"]["frames"])
+        for thread in document["profiles"]:
+            self.assertEqual(thread["type"], "sampled")
+            self.assertEqual(len(thread["samples"]), len(thread["weights"]))
+            self.assertTrue(all(0 <= index < frame_count for stack in thread["samples"] for index in stack))
+            self.assertAlmostEqual(thread["endValue"], sum(thread["weights"]), places=2)
+
+    def test_only_one_profile_at_a_time(self):
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            with self.assertRaises(ProfilerBusyError) as raised:
+                SamplingProfiler().start()
+            self.assertEqual(raised.exception.status_code, 409)
+        finally:
+            profiler.stop()
+        again = SamplingProfiler()
+        again.start()  # Free again once the first one stopped
+        again.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from backend.app.sql_profiler import QueryProfile, current_profile, install_profiler, statement_shape
+
+
+class TestSqlProfiler(unittest.TestCase):
+
+    def test_statement_shape_ignores_literals_and_in_list_length(self):
+        self.assertEqual(
+            statement_shape("SELECT * FROM devices WHERE id = 'a''b' AND n > 10"),
+            statement_shape("SELECT *  FROM devices\nWHERE id = 'c' AND n > 2"))
+        self.assertEqual(
+            statement_shape("SELECT * FROM devices WHERE id IN (?, ?, ?)"),
+            statement_shape("SELECT * FROM devices WHERE id IN (?)"))
+
+    def test_repeated_statements_are_flagged_as_n_plus_one(self):
+        engine = create_engine("sqlite://")
+        install_profiler(engine)
+        install_profiler(engine)  # Idempotent
+
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                for n in range(6):
+                    connection.execute(text("SELECT :n + 1"), {"n": n})
+        finally:
+            current_profile.reset(token)
+
+        self.assertEqual(profile.queries, 7)
+        suspects = profile.suspects(threshold=5)
+        self.assertEqual([suspect["count"] for suspect in suspects], [6])
+        self.assertIn("+ ?", suspects[0]["statement"])
+        self.assertTrue(profile.server_timing().startswith("db;dur="))
+        self.assertTrue(profile.server_timing().endswith('desc="7 queries"'))
+
+    def test_statements_outside_a_profiled_request_are_ignored(self):
+        engine = create_engine("sqlite://")
+        install_profiler(engine)
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        self.assertIsNone(current_profile.get())
+
+
+if __name__ == '__main__':
+    unittest.main()
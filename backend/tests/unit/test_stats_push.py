@@ -0,0 +1,111 @@
+import asyncio
+import json
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.models.database import Base, Device, Notification
+from backend.app.services.change_feed import OPERATION_DELETE, record_change
+from backend.app.services.realtime import ConnectionManager
+from backend.app.services.stats_push import StatsPublisher
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        self.sent.append(json.loads(payload))
+
+
+class TestStatsPublisher(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine, autoflush=False)
+        db = self.Session()
+        db.add_all([
+            Device(identifier="dev-1", name="DEV-1", is_online=True, organization_id=5),
+            Device(identifier="dev-2", name="DEV-2", is_online=False, organization_id=6),
+        ])
+        record_change(db, "device", "dev-1")
+        db.commit()
+        db.close()
+        self.manager = ConnectionManager()
+        self.publisher = StatsPublisher(self.manager, self.Session)
+        self.publisher.register()
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def _sync(self, *changes):
+        db = self.Session()
+        for change in changes:
+            change(db)
+        db.commit()
+        db.close()
+
+    def test_pushes_only_changed_counters_after_a_sync_commit(self):
+        async def scenario():
+            websocket = FakeWebSocket()
+            await self.manager.connect(websocket)
+            await self.manager.subscribe(websocket, ["stats"])
+            await self.manager.send_snapshots(websocket, ["stats"])
+            await asyncio.sleep(0.01)
+            snapshot = websocket.sent[-1]
+            self.assertTrue(snapshot["full"])
+            self.assertEqual((snapshot["data"]["total_devices"], snapshot["data"]["online_devices"]), (2, 1))
+
+            # Nothing synced: no query beyond the generation check, nothing sent
+            self.assertFalse(await self.publisher.publish())
+
+            def bring_dev2_online(db):
+                db.query(Device).filter(Device.identifier == "dev-2").update({Device.is_online: True})
+                db.add(Notification(id=10, message="Disk full", priority="critical", device_identifier="dev-2"))
+                record_change(db, "device", "dev-2")
+                record_change(db, "notification", 10)
+            self._sync(bring_dev2_online)
+
+            self.assertTrue(await self.publisher.publish())
+            await asyncio.sleep(0.01)
+            delta = websocket.sent[-1]
+            self.assertFalse(delta["full"])
+            self.assertEqual(delta["data"]["online_devices"], 2)
+            self.assertEqual(delta["data"]["offline_devices"], 0)
+            self.assertNotIn("total_devices", delta["data"])
+            self.assertEqual([n["id"] for n in delta["data"]["new_notifications"]], [10])
+
+        asyncio.run(scenario())
+
+    def test_device_changes_go_to_device_and_org_subscribers(self):
+        async def scenario():
+            await self.publisher.publish()  # Baseline
+            device_watcher, org_watcher, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            for websocket, topic in ((device_watcher, "device:dev-1"), (org_watcher, "org:5"), (other, "org:6")):
+                await self.manager.connect(websocket)
+                await self.manager.subscribe(websocket, [topic])
+
+            def rename_and_delete(db):
+                db.query(Device).filter(Device.identifier == "dev-1").update({Device.name: "RENAMED"})
+                record_change(db, "device", "dev-1")
+                db.query(Device).filter(Device.identifier == "dev-2").delete()
+                record_change(db, "device", "dev-2", OPERATION_DELETE)
+            self._sync(rename_and_delete)
+
+            await self.publisher.publish()
+            await asyncio.sleep(0.01)
+
+            self.assertEqual([(m["type"], m["device"]["name"]) for m in device_watcher.sent], [("DEVICE_UPDATE", "RENAMED")])
+            self.assertEqual([m["type"] for m in org_watcher.sent], ["DEVICE_UPDATE"])
+            self.assertEqual(other.sent, [])  # dev-2's org; removals only go to device:<id>
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import asyncio
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.models.database import Base, Device, Organization, Script
+from backend.app.services.suggest_index import (
+    SuggestIndex, SuggestIndexSync, load_suggestions, refresh_device_suggestions, refresh_named_suggestions
+)
+
+
+class TestSuggestIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SuggestIndex()
+        self.index.bulk_load([
+            ("device", "dev-1", "Alpha Server", ["10.0.0.15"]),
+            ("device", "dev-2", "Alphabet Kiosk", []),
+            ("script", "scr-1", "Restart Print Spooler", ()),
+            ("organization", "1", "Acme", ()),
+        ])
+
+    def test_prefix_matches_shortest_first(self):
+        results = self.index.suggest("alp")
+
+        self.assertEqual([r["id"] for r in results], ["dev-1", "dev-2"])
+        self.assertEqual(results[0]["label"], "Alpha Server")
+
+    def test_matches_later_words_and_ips(self):
+        self.assertEqual([r["id"] for r in self.index.suggest("spool")], ["scr-1"])
+        self.assertEqual(self.index.suggest("10.0"), [{"type": "ip", "id": "dev-1", "label": "Alpha Server", "match": "10.0.0.15"}])
+
+    def test_type_filter(self):
+        self.assertEqual([r["type"] for r in self.index.suggest("a", types=["organization"])], ["organization"])
+
+    def test_type_filter_is_not_crowded_out_by_other_types(self):
+        index = SuggestIndex()
+        index.bulk_load([("device", f"dev-{n}", f"server-{n:05d}", []) for n in range(1000)]
+                        + [("script", "scr-1", "Serverz", [])])
+
+        self.assertEqual(index.suggest("server", types=["script"]),
+                         [{"type": "script", "id": "scr-1", "label": "Serverz", "match": "serverz"}])
+        self.assertEqual(len(index.suggest("server", limit=5)), 5)
+
+    def test_upsert_replaces_all_keys_of_an_item(self):
+        self.index.upsert("device", "dev-1", "Omega Server", ["10.0.0.16"])
+
+        self.assertEqual([r["id"] for r in self.index.suggest("alp")], ["dev-2"])
+        self.assertEqual([r["match"] for r in self.index.suggest("10.0")], ["10.0.0.16"])
+        self.assertEqual([r["label"] for r in self.index.suggest("omega")], ["Omega Server"])
+
+    def test_remove_and_replace_type(self):
+        self.index.remove("device", "dev-2")
+        self.index.replace_type("organization", [("2", "Globex")])
+
+        self.assertEqual([r["id"] for r in self.index.suggest("alp")], ["dev-1"])
+        self.assertEqual(self.index.suggest("acme"), [])
+        self.assertEqual([r["label"] for r in self.index.suggest("glo")], ["Globex"])
+
+    def test_max_entries_bounds_memory(self):
+        index = SuggestIndex(max_entries=3)
+        index.upsert("group", 1, "One Two")  # 2 keys
+        index.upsert("group", 2, "Three Four")  # Would exceed the bound
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.dropped, 1)
+        self.assertEqual(index.suggest("three"), [])
+
+
+class TestSuggestIndexLoading(unittest.TestCase):
+
+    def setUp(self):
+        # One connection shared with the worker thread SuggestIndexSync.apply reads on
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.db.add_all([
+            Device(identifier="dev-1", name="Alpha Server", external_ip_address="203.0.113.10"),
+            Organization(id=1, name="Acme"),
+            Script(id="scr-1", name="Clear Temp Files"),
+        ])
+        self.db.commit()
+        self.index = SuggestIndex()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_load_and_incremental_refresh(self):
+        load_suggestions(self.db, self.index)
+        self.assertEqual([r["type"] for r in self.index.suggest("a")], ["organization", "device"])
+
+        self.db.query(Device).filter(Device.identifier == "dev-1").update({Device.external_ip_address: "198.51.100.7"})
+        self.db.add(Script(id="scr-2", name="Clear Print Queue"))
+        self.db.commit()
+        refresh_device_suggestions(self.db, ["dev-1"], self.index)
+        refresh_named_suggestions(self.db, "script", self.index)
+
+        self.assertEqual(self.index.suggest("203."), [])
+        self.assertEqual([r["id"] for r in self.index.suggest("198.")], ["dev-1"])
+        self.assertEqual(len(self.index.suggest("clear", types=["script"])), 2)
+
+    def test_other_workers_apply_the_leaders_refreshes(self):
+        class Bus:
+            def __init__(self):
+                self.sent = []
+
+            def add_internal_handler(self, handler):
+                pass
+
+            async def publish_internal(self, message):
+                self.sent.append(message)
+
+        bus = Bus()
+        Session = sessionmaker(bind=self.engine)
+        leader = SuggestIndexSync(self.index, bus=bus, session_factory=Session)
+        follower = SuggestIndexSync(SuggestIndex(), session_factory=Session)
+        load_suggestions(self.db, leader.index)
+        load_suggestions(self.db, follower.index)
+
+        self.db.query(Device).filter(Device.identifier == "dev-1").update({Device.name: "Omega Server"})
+        self.db.add(Script(id="scr-2", name="Clear Print Queue"))
+        self.db.commit()
+        leader.refresh_devices(self.db, ["dev-1"])
+        leader.refresh_named(self.db, "script")
+
+        async def relay():
+            await leader.publish()
+            await leader.publish()  # Nothing refreshed since: nothing sent
+            for message in bus.sent:
+                await follower.apply(message)
+        asyncio.run(relay())
+
+        self.assertEqual(bus.sent, [{"type": "suggest_index.refresh", "types": ["script"], "devices": ["dev-1"]}])
+        for index in (leader.index, follower.index):
+            self.assertEqual([r["id"] for r in index.suggest("omega")], ["dev-1"])
+            self.assertEqual(len(index.suggest("clear", types=["script"])), 2)
+
+        # Many changed devices are sent as a full reload
+        leader.refresh_devices(self.db, [f"dev-{n}" for n in range(200)])
+        asyncio.run(leader.publish())
+        self.assertEqual(bus.sent[-1], {"type": "suggest_index.refresh", "types": [], "full": True})
+
+
+if __name__ == '__main__':
+    unittest.main()
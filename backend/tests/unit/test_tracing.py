@@ -0,0 +1,78 @@
+import unittest
+from datetime import datetime
+
+import sentry_sdk
+
+from backend.app import tracing
+from backend.app.tracing import (
+    AdaptiveSampler, InMemoryTransport, init_tracing, parse_route_rates, record_slow_or_failed_request, trace_span,
+    traced
+)
+
+
+class TestTracing(unittest.TestCase):
+
+    def test_route_rates_are_parsed_and_first_match_wins(self):
+        self.assertEqual(parse_route_rates(" /a/*=0.5, /b=0,broken,/c=2,=1,/d=x"),
+                         [("/a/*", 0.5), ("/b", 0.0), ("/c", 1.0)])
+
+        sampler = AdaptiveSampler(base_rate=0.1, route_rates=parse_route_rates("/api/v1/automation/*=1,/api/*=0"))
+        self.assertEqual(sampler.rate_for("/api/v1/automation/scripts"), 1.0)
+        self.assertEqual(sampler.rate_for("/api/health"), 0.0)
+        self.assertEqual(sampler.rate_for("/docs"), 0.1)
+
+    def test_transactions_are_head_sampled_at_their_rate(self):
+        sampler = AdaptiveSampler(base_rate=0.1, route_rates=[("/metrics", 0.0), ("/api/v1/automation/*", 1.0)])
+        self.assertEqual(sampler.traces_sampler({"asgi_scope": {"path": "/metrics"}}), 0.0)
+        self.assertEqual(sampler.traces_sampler({"asgi_scope": {"path": "/api/v1/devices"}}), 0.1)
+        self.assertEqual(sampler.traces_sampler({"asgi_scope": {"path": "/api/v1/automation/scripts"}}), 1.0)
+        self.assertEqual(sampler.traces_sampler({"transaction_context": {"name": "pulseway.sync"}}), 0.1)
+
+    def test_slow_and_failed_requests_are_forced(self):
+        sampler = AdaptiveSampler(base_rate=0.01, route_rates=[("/metrics", 0.0)], slow_seconds=1.0)
+        self.assertIsNone(sampler.forced_reason("/api/v1/devices", 0.1, 200))
+        self.assertIsNone(sampler.forced_reason("/api/v1/devices", 0.1, 404))
+        self.assertEqual(sampler.forced_reason("/api/v1/devices", 2.5, 200), "slow")
+        self.assertEqual(sampler.forced_reason("/api/v1/devices", 0.1, 500), "error")
+        self.assertIsNone(sampler.forced_reason("/metrics", 2.5, 500))  # Not traced at all
+        self.assertIsNone(AdaptiveSampler(keep_slow_and_errors=False).forced_reason("/api/v1/devices", 2.5, 500))
+
+    def test_unsampled_slow_or_failed_requests_are_recorded_without_spans(self):
+        InMemoryTransport.envelopes.clear()
+        init_tracing(exporter="memory", sampler=AdaptiveSampler(base_rate=0.0, slow_seconds=1.0))
+        try:
+            record_slow_or_failed_request("GET", "/api/v1/devices", "/api/v1/devices", 0.1, 200)
+            record_slow_or_failed_request("GET", "/api/v1/devices/x", "/api/v1/devices/{device_id}", 2.5, 200)
+            record_slow_or_failed_request("POST", "/api/v1/automation/run", "/api/v1/automation/run", 0.1, 503)
+            with sentry_sdk.start_transaction(name="sampled", op="http.server", sampled=True):
+                record_slow_or_failed_request("GET", "/api/v1/devices", "/api/v1/devices", 2.5, 500)  # Already kept
+
+            transactions = {event["transaction"]: event for event in InMemoryTransport.transactions()}
+            self.assertEqual(set(transactions), {"/api/v1/devices/{device_id}", "/api/v1/automation/run", "sampled"})
+            slow = transactions["/api/v1/devices/{device_id}"]
+            self.assertEqual(slow["tags"]["sampling.reason"], "slow")
+            self.assertEqual(slow["spans"], [])
+            duration = datetime.fromisoformat(slow["timestamp"]) - datetime.fromisoformat(slow["start_timestamp"])
+            self.assertAlmostEqual(duration.total_seconds(), 2.5, places=3)
+            failed = transactions["/api/v1/automation/run"]
+            self.assertEqual(failed["tags"]["sampling.reason"], "error")
+            self.assertEqual(failed["contexts"]["trace"]["status"], "unavailable")
+            self.assertEqual(transactions["sampled"]["tags"]["sampling.reason"], "rate")
+        finally:
+            sentry_sdk.init()
+            tracing._sampler = None
+            InMemoryTransport.envelopes.clear()
+
+    def test_spans_are_skipped_outside_a_transaction(self):
+        @traced("db.query")
+        def query(value):
+            return value * 2
+
+        self.assertEqual(query(21), 42)
+        self.assertEqual(query.__name__, "query")
+        with trace_span("db.query", "noop") as span:
+            self.assertIsNone(span)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,101 @@
 // Core application logic
 
+const textDecoder = new TextDecoder();
+
+/**
+ * Decodes a MessagePack binary frame (the subset the server emits: maps, arrays,
+ * strings, binary, numbers, booleans and nil).
+ * @param {Uint8Array} bytes - The frame contents.
+ * @returns {*} The decoded value.
+ */
+function decodeMsgpack(bytes) {
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    let offset = 0;
+
+    function str(length) {
+        const value = textDecoder.decode(bytes.subarray(offset, offset + length));
+        offset += length;
+        return value;
+    }
+    function bin(length) {
+        const value = bytes.slice(offset, offset + length);
+        offset += length;
+        return value;
+    }
+    function array(length) {
+        const value = new Array(length);
+        for (let i = 0; i < length; i++) value[i] = read();
+        return value;
+    }
+    function map(length) {
+        const value = {};
+        for (let i = 0; i < length; i++) {
+            const key = read();
+            value[key] = read();
+        }
+        return value;
+    }
+    function uint(size) {
+        let value;
+        if (size === 1) value = view.getUint8(offset);
+        else if (size === 2) value = view.getUint16(offset);
+        else if (size === 4) value = view.getUint32(offset);
+        else value = Number(view.getBigUint64(offset));
+        offset += size;
+        return value;
+    }
+    function int(size) {
+        let value;
+        if (size === 1) value = view.getInt8(offset);
+        else if (size === 2) value = view.getInt16(offset);
+        else if (size === 4) value = view.getInt32(offset);
+        else value = Number(view.getBigInt64(offset));
+        offset += size;
+        return value;
+    }
+
+    function read() {
+        const type = bytes[offset++];
+        if (type <= 0x7f) return type;                       // positive fixint
+        if (type <= 0x8f) return map(type & 0x0f);           // fixmap
+        if (type <= 0x9f) return array(type & 0x0f);         // fixarray
+        if (type <= 0xbf) return str(type & 0x1f);           // fixstr
+        if (type >= 0xe0) return type - 0x100;               // negative fixint
+        switch (type) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return bin(uint(1));
+            case 0xc5: return bin(uint(2));
+            case 0xc6: return bin(uint(4));
+            case 0xca: { const value = view.getFloat32(offset); offset += 4; return value; }
+            case 0xcb: { const value = view.getFloat64(offset); offset += 8; return value; }
+            case 0xcc: return uint(1);
+            case 0xcd: return uint(2);
+            case 0xce: return uint(4);
+            case 0xcf: return uint(8);
+            case 0xd0: return int(1);
+            case 0xd1: return int(2);
+            case 0xd2: return int(4);
+            case 0xd3: return int(8);
+            case 0xd9: return str(uint(1));
+            case 0xda: return str(uint(2));
+            case 0xdb: return str(uint(4));
+            case 0xdc: return array(uint(2));
+            case 0xdd: return array(uint(4));
+            case 0xde: return map(uint(2));
+            case 0xdf: return map(uint(4));
+            default: throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`);
+        }
+    }
+
+    return read();
+}
+
 /**
  * Sets up a WebSocket connection and registers handlers for different message types.
+ * Asks the server for MessagePack frames; the server confirms the encoding it uses
+ * (JSON when MessagePack is not available there) and both are decoded here.
  * @param {string[]} subscribeEvents - An array of event types to subscribe to.
  * @param {Object.<string, function>} messageHandlers - An object mapping message types to handler functions.
  *                                                     Example: { 'STATS_UPDATE': handleStatsUpdate, 'DEVICE_UPDATE': handleDeviceUpdate }
@@ -16,13 +110,15 @@ function setupWebSocket(subscribeEvents, messageHandlers, onOpen, onClose, onErr
 
     function connect() {
         ws = new WebSocket(wsUrl);
+        ws.binaryType = 'arraybuffer';
 
         ws.onopen = function() {
             console.log('WebSocket connected');
             if (subscribeEvents && subscribeEvents.length > 0) {
                 ws.send(JSON.stringify({
                     type: 'SUBSCRIBE',
-                    events: subscribeEvents
+                    events: subscribeEvents,
+                    encoding: 'msgpack'
                 }));
             }
             if (onOpen && typeof onOpen === 'function') {
@@ -32,7 +128,9 @@ function setupWebSocket(subscribeEvents, messageHandlers, onOpen, onClose, onErr
 
         ws.onmessage = function(event) {
             try {
-                const data = JSON.parse(event.data);
+                const data = typeof event.data === 'string'
+                    ? JSON.parse(event.data)
+                    : decodeMsgpack(new Uint8Array(event.data));
                 if (data.type && messageHandlers[data.type] && typeof messageHandlers[data.type] === 'function') {
                     messageHandlers[data.type](data);
                 } else {
@@ -0,0 +1,149 @@
+// Offline stores backed by IndexedDB, kept fresh with the /api/v1/changes delta feed.
+// Loaded by the pages (before app.js) and by the service worker via importScripts().
+
+const OFFLINE_DB_NAME = 'pulseway-offline';
+const OFFLINE_DB_VERSION = 1;
+const CHANGES_ENDPOINT = '/api/v1/changes';
+
+// Object store name (also the section name in the delta feed payload) -> key path
+const OFFLINE_STORES = {
+    devices: { keyPath: 'identifier' },
+    notifications: { keyPath: 'id' },
+    scripts: { keyPath: 'id' }
+};
+
+/**
+ * Opens (and on first use creates) the offline database.
+ * @returns {Promise<IDBDatabase>}
+ */
+function openOfflineDb() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(OFFLINE_DB_NAME, OFFLINE_DB_VERSION);
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            Object.entries(OFFLINE_STORES).forEach(([name, options]) => {
+                if (!db.objectStoreNames.contains(name)) {
+                    db.createObjectStore(name, { keyPath: options.keyPath });
+                }
+            });
+            if (!db.objectStoreNames.contains('meta')) {
+                db.createObjectStore('meta');
+            }
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function _txDone(tx) {
+    return new Promise((resolve, reject) => {
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => reject(tx.error);
+        tx.onabort = () => reject(tx.error);
+    });
+}
+
+function _requestResult(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Each store keeps its own token so stores can be filled and reset independently
+async function getChangeToken(db, storeName) {
+    const tx = db.transaction('meta', 'readonly');
+    return _requestResult(tx.objectStore('meta').get(`changeToken:${storeName}`));
+}
+
+async function getAllFromStore(db, storeName) {
+    const tx = db.transaction(storeName, 'readonly');
+    return _requestResult(tx.objectStore(storeName).getAll());
+}
+
+/**
+ * Applies one page of the delta feed to a store and advances its token in the same transaction.
+ */
+async function applyChanges(db, storeName, feed) {
+    const tx = db.transaction([storeName, 'meta'], 'readwrite');
+    const changes = feed[storeName] || { upserted: [], deleted: [] };
+    const store = tx.objectStore(storeName);
+    changes.upserted.forEach(record => store.put(record));
+    changes.deleted.forEach(key => {
+        // Notification ids are numeric in the store but strings in the feed
+        store.delete(storeName === 'notifications' ? Number(key) : key);
+    });
+    tx.objectStore('meta').put(feed.token, `changeToken:${storeName}`);
+    return _txDone(tx);
+}
+
+/**
+ * Pulls all pending deltas for one store.
+ * @returns {Promise<boolean>} false when the store was never filled or the server asked for a reset.
+ */
+async function syncOfflineDeltas(db, storeName) {
+    let token = await getChangeToken(db, storeName);
+    if (token === undefined) {
+        return false;
+    }
+    while (true) {
+        const response = await fetch(`${CHANGES_ENDPOINT}?types=${storeName}&since=${encodeURIComponent(token)}`);
+        if (!response.ok) {
+            throw new Error(`Delta feed request failed with status ${response.status}`);
+        }
+        const feed = await response.json();
+        if (feed.reset) {
+            return false;
+        }
+        await applyChanges(db, storeName, feed);
+        token = feed.token;
+        if (!feed.has_more) {
+            return true;
+        }
+    }
+}
+
+/**
+ * Reloads a store from its full collection endpoint.
+ * The token is taken before the full fetch so that changes made meanwhile are replayed next time.
+ */
+async function reloadOfflineStore(db, storeName, fullUrl) {
+    const tokenResponse = await fetch(`${CHANGES_ENDPOINT}?types=${storeName}`);
+    if (!tokenResponse.ok) {
+        throw new Error(`Delta feed request failed with status ${tokenResponse.status}`);
+    }
+    const { token } = await tokenResponse.json();
+    const response = await fetch(fullUrl);
+    if (!response.ok) {
+        throw new Error(`Full reload of ${storeName} failed with status ${response.status}`);
+    }
+    const records = await response.json();
+    const tx = db.transaction([storeName, 'meta'], 'readwrite');
+    const store = tx.objectStore(storeName);
+    store.clear();
+    records.forEach(record => store.put(record));
+    tx.objectStore('meta').put(token, `changeToken:${storeName}`);
+    return _txDone(tx);
+}
+
+/**
+ * Returns a collection from the offline store, refreshed with deltas when online.
+ * Falls back to a full reload of the store when it was never filled or the server asked for a reset.
+ * @param {string} storeName - One of 'devices', 'notifications', 'scripts'.
+ * @param {string} fullUrl - Collection URL used for the initial or reset load.
+ */
+async function loadCollection(storeName, fullUrl) {
+    const db = await openOfflineDb();
+    try {
+        if (navigator.onLine) {
+            const upToDate = await syncOfflineDeltas(db, storeName);
+            if (!upToDate) {
+                await reloadOfflineStore(db, storeName, fullUrl);
+            }
+        }
+    } catch (error) {
+        // Serve whatever is stored; the page shows stale data rather than nothing.
+        console.error(`Failed to refresh offline store ${storeName}:`, error);
+    }
+    return getAllFromStore(db, storeName);
+}
@@ -1,4 +1,6 @@
 // sw.js - Service Worker for Pulseway PWA
+importScripts('/js/offline-store.js');
+
 const CACHE_NAME = 'pulseway-dashboard-v1.0.0';
 const STATIC_CACHE = 'pulseway-static-v1.0.0';
 const API_CACHE = 'pulseway-api-v1.0.0';
@@ -16,6 +18,7 @@ const STATIC_FILES = [
     '/settings.html',
     '/css/main.css',
     '/js/utils.js',
+    '/js/offline-store.js',
     '/js/app.js'
 ];
 
@@ -74,6 +77,11 @@ self.addEventListener('fetch', event => {
     const { request } = event;
     const url = new URL(request.url);
     
+    // The delta feed is only meaningful live; offline stores already hold its results
+    if (url.pathname.startsWith(CHANGES_ENDPOINT)) {
+        return;
+    }
+
     // Handle API requests
     if (url.pathname.startsWith('/api/')) {
         event.respondWith(handleApiRequest(request));
@@ -282,6 +290,8 @@ self.addEventListener('sync', event => {
     
     if (event.tag === 'device-refresh') {
         event.waitUntil(refreshDeviceData());
+    } else if (event.tag === 'delta-sync') {
+        event.waitUntil(syncAllOfflineStores());
     } else if (event.tag === 'script-execution') {
         event.waitUntil(syncPendingScriptExecutions());
     }
@@ -309,6 +319,23 @@ async function refreshDeviceData() {
     }
 }
 
+// Apply pending deltas to every offline store that has been filled by a page
+async function syncAllOfflineStores() {
+    try {
+        const db = await openOfflineDb();
+        for (const storeName of Object.keys(OFFLINE_STORES)) {
+            // Stores that need a full reload are left for the page to reload on its next visit
+            await syncOfflineDeltas(db, storeName);
+        }
+        const clients = await self.clients.matchAll();
+        clients.forEach(client => {
+            client.postMessage({ type: 'DATA_UPDATED', endpoint: CHANGES_ENDPOINT });
+        });
+    } catch (error) {
+        console.log('[SW] Delta sync failed:', error);
+    }
+}
+
 // Sync pending script executions when back online
 async function syncPendingScriptExecutions() {
     try {